@@ -0,0 +1,427 @@
+"""
+Backup Repository Maintenance for VoraHub Bot
+Keeps the auto-backup repository small and fast as commits pile up
+
+Key Features:
+- gc / repack on a schedule, only while the backup queue is idle
+- Optional history compaction: auto-backup commits older than N days are
+  squashed into one checkpoint per day (single `git fast-import` run)
+- Pack size budget (aggressive repack, then shorter squash window)
+- Repository size and push time history with trend report
+"""
+
+import os
+import re
+import json
+import time
+import logging
+import statistics
+import subprocess
+import threading
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Deque, Dict, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Runs a git command, returns (success, output) - see GitBackupManager._run_git_command
+GitRunner = Callable[..., Tuple[bool, str]]
+
+# Commits written by the backup manager (anything else is never rewritten)
+BACKUP_PREFIXES = ("Auto-backup:", "Backup checkpoint:")
+CHECKPOINT_COUNT = re.compile(r"^Backup checkpoint: \S+ \((\d+) commits?\)")
+# Temporary branch the compacted history is built on
+REWRITE_REF = "refs/backup-maintenance/rewrite"
+
+
+class RepoStats(NamedTuple):
+    """One maintenance measurement (a line of the history file)"""
+    timestamp: float            # Epoch seconds
+    commits: int
+    loose_objects: int
+    loose_kb: int
+    packs: int
+    pack_kb: int
+    push_p50: Optional[float]   # Median push seconds since the previous run
+    push_max: Optional[float]
+    pushes: int
+    seconds: float = 0.0        # Duration of the maintenance run
+    action: str = ""            # What the run did ("gc", "squash+gc", ...)
+
+    @property
+    def total_kb(self) -> int:
+        return self.loose_kb + self.pack_kb
+
+
+class BackupCommit(NamedTuple):
+    sha: str
+    tree: str
+    author: str       # "Name <email> <epoch> <tz>"
+    committer: str
+    timestamp: int
+    message: str
+    merge: bool
+
+
+class RepoMaintainer:
+    """
+    Scheduled maintenance of the backup repository
+
+    The backup worker calls `due()` while its queue is idle and `run()`
+    while holding the git lock, so maintenance never races a commit.
+    """
+
+    def __init__(self, repo_path: str, interval: float = 6 * 3600, idle_after: float = 60.0,
+                 squash_after_days: Optional[int] = None, pack_budget_mb: Optional[float] = None,
+                 branch: str = "main", history_size: int = 500):
+        """
+        Args:
+            repo_path: Repository (bot directory)
+            interval: Seconds between maintenance runs
+            idle_after: Only run after this many seconds without a commit
+            squash_after_days: Squash auto-backup commits older than this into
+                daily checkpoints (None = never rewrite history)
+            pack_budget_mb: Target upper bound for the packed repository size
+            branch: Backup branch
+            history_size: Measurements kept in the history file
+        """
+        self.repo_path = Path(repo_path).resolve()
+        self.interval = interval
+        self.idle_after = idle_after
+        self.squash_after_days = squash_after_days
+        self.pack_budget_kb = int(pack_budget_mb * 1024) if pack_budget_mb else None
+        self.branch = branch
+        self.history_size = history_size
+        self.history_file = self.repo_path / ".git" / "backup-maintenance.jsonl"
+        self.run_git: Optional[GitRunner] = None
+        self.on_rewrite: Optional[Callable[[str, str], None]] = None
+        self._push_times: Deque[float] = deque(maxlen=1000)
+        self._push_lock = threading.Lock()
+        self.history: List[RepoStats] = []
+        self.last_run = 0.0
+        self.running = False
+
+    def start(self, run_git: GitRunner, on_rewrite: Optional[Callable[[str, str], None]] = None):
+        """
+        Attach to the initialized repository
+
+        Args:
+            run_git: Git command runner of the backup manager
+            on_rewrite: Called with (old_head, new_head) after history compaction
+        """
+        self.run_git = run_git
+        self.on_rewrite = on_rewrite
+        self.history = self._load_history()
+        if self.history:
+            self.last_run = self.history[-1].timestamp
+
+    # Scheduling ----------------------------------------------------------
+
+    def record_push(self, seconds: float):
+        """Push duration sample (called from push threads)"""
+        with self._push_lock:
+            self._push_times.append(seconds)
+
+    def due(self, idle_for: float) -> bool:
+        """True when a run is scheduled and the queue has been idle long enough"""
+        return (self.run_git is not None and idle_for >= self.idle_after
+                and time.time() - self.last_run >= self.interval)
+
+    # Measurements --------------------------------------------------------
+
+    def measure(self, action: str = "", seconds: float = 0.0) -> RepoStats:
+        """Current repository size plus push times since the last measurement"""
+        _, output = self.run_git(["git", "count-objects", "-v"])
+        counts = {}
+        for line in output.splitlines():
+            key, _, value = line.partition(":")
+            if value.strip().isdigit():
+                counts[key.strip()] = int(value)
+        success, commits = self.run_git(["git", "rev-list", "--count", self.branch])
+
+        with self._push_lock:
+            pushes = list(self._push_times)
+            self._push_times.clear()
+        return RepoStats(
+            timestamp=time.time(),
+            commits=int(commits) if success and commits.isdigit() else 0,
+            loose_objects=counts.get("count", 0),
+            loose_kb=counts.get("size", 0),
+            packs=counts.get("packs", 0),
+            pack_kb=counts.get("size-pack", 0),
+            push_p50=round(statistics.median(pushes), 3) if pushes else None,
+            push_max=round(max(pushes), 3) if pushes else None,
+            pushes=len(pushes),
+            seconds=round(seconds, 2),
+            action=action
+        )
+
+    def _load_history(self) -> List[RepoStats]:
+        if not self.history_file.exists():
+            return []
+        history = []
+        with open(self.history_file, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    history.append(RepoStats(**json.loads(line)))
+                except (ValueError, TypeError):
+                    continue
+        return history[-self.history_size:]
+
+    def _append_history(self, stats: RepoStats):
+        self.history.append(stats)
+        trimmed = len(self.history) > self.history_size
+        self.history = self.history[-self.history_size:]
+        try:
+            if trimmed:
+                tmp_path = self.history_file.with_suffix(".tmp")
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    f.writelines(json.dumps(entry._asdict()) + "\n" for entry in self.history)
+                os.replace(tmp_path, self.history_file)
+            else:
+                with open(self.history_file, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(stats._asdict()) + "\n")
+        except OSError as e:
+            logger.warning(f"Cannot write maintenance history: {e}")
+
+    def trends(self, days: float = 7.0) -> Dict[str, object]:
+        """
+        Size and push time now vs. `days` ago (oldest measurement in the window)
+
+        Returns:
+            Dict with current values, deltas and per-day growth
+        """
+        if not self.history:
+            return {}
+        latest = self.history[-1]
+        window = [s for s in self.history if s.timestamp >= latest.timestamp - days * 86400]
+        first = window[0]
+        span_days = max((latest.timestamp - first.timestamp) / 86400, 1 / 24)
+        push_samples = [s.push_p50 for s in window if s.push_p50 is not None]
+        return {
+            "size_kb": latest.total_kb,
+            "pack_kb": latest.pack_kb,
+            "loose_objects": latest.loose_objects,
+            "commits": latest.commits,
+            "size_delta_kb": latest.total_kb - first.total_kb,
+            "growth_kb_per_day": round((latest.total_kb - first.total_kb) / span_days, 1),
+            "commits_per_day": round((latest.commits - first.commits) / span_days, 1),
+            "push_p50_first": push_samples[0] if push_samples else None,
+            "push_p50_last": push_samples[-1] if push_samples else None,
+            "budget_kb": self.pack_budget_kb,
+            "last_run": latest.timestamp,
+            "last_action": latest.action,
+            "window_days": round(span_days, 1),
+        }
+
+    def format_report(self, days: float = 7.0) -> str:
+        """One-line trend summary for logs"""
+        trend = self.trends(days)
+        if not trend:
+            return "no maintenance history yet"
+        push = ""
+        if trend["push_p50_last"] is not None:
+            push = f", push p50 {trend['push_p50_first']:.2f}s -> {trend['push_p50_last']:.2f}s"
+        budget = f" / budget {trend['budget_kb'] / 1024:.1f} MB" if trend["budget_kb"] else ""
+        return (f"{trend['size_kb'] / 1024:.1f} MB{budget}, {trend['commits']} commits, "
+                f"{trend['growth_kb_per_day'] / 1024:+.2f} MB/day over {trend['window_days']}d{push}")
+
+    # Maintenance ---------------------------------------------------------
+
+    def run(self) -> Optional[RepoStats]:
+        """
+        One maintenance pass (caller holds the git lock)
+
+        Returns:
+            Measurement after maintenance, None if it failed
+        """
+        self.running = True
+        started = time.monotonic()
+        actions = []
+        try:
+            prune = False
+            if self.squash_after_days and self.squash(self.squash_after_days):
+                actions.append("squash")
+                prune = True
+
+            if not self._gc(prune):
+                return None
+            actions.append("gc")
+
+            stats = self.measure()
+            if self.pack_budget_kb and stats.pack_kb > self.pack_budget_kb:
+                actions += self._enforce_budget(stats)
+
+            stats = self.measure("+".join(actions), time.monotonic() - started)
+            self._append_history(stats)
+            logger.info(f"Repository maintenance ({stats.action}) in {stats.seconds:.1f}s: {self.format_report()}")
+            return stats
+        except Exception as e:
+            logger.error(f"Repository maintenance failed: {e}")
+            return None
+        finally:
+            # Failed runs wait for the next interval as well
+            self.last_run = time.time()
+            self.running = False
+
+    def _gc(self, prune: bool = False) -> bool:
+        """Pack loose objects; `prune` drops unreachable objects right away"""
+        command = ["git", "gc", "--quiet"]
+        if prune:
+            # Rewritten history must not stay reachable through reflogs
+            self.run_git(["git", "reflog", "expire", "--expire=now", "--all"])
+            command.append("--prune=now")
+        success, output = self.run_git(command, timeout=600)
+        if not success:
+            logger.error(f"git gc failed: {output}")
+        return success
+
+    def _enforce_budget(self, stats: RepoStats) -> List[str]:
+        """Shrink the pack: aggressive repack first, then a shorter squash window"""
+        actions = ["repack"]
+        logger.warning(f"Pack size {stats.pack_kb / 1024:.1f} MB over budget "
+                       f"{self.pack_budget_kb / 1024:.1f} MB, repacking")
+        self.run_git(["git", "repack", "-a", "-d", "-f", "--window=250", "--depth=50", "--quiet"], timeout=1800)
+        pack_kb = self.measure().pack_kb
+
+        days = self.squash_after_days
+        while days and days > 1 and pack_kb > self.pack_budget_kb:
+            days = max(1, days // 2)
+            if self.squash(days):
+                actions.append(f"squash{days}d")
+                self._gc(prune=True)
+                pack_kb = self.measure().pack_kb
+
+        if pack_kb > self.pack_budget_kb:
+            logger.warning(f"Pack size {pack_kb / 1024:.1f} MB still over budget "
+                           f"(enable or shorten squash_after_days)")
+        return actions
+
+    # History compaction --------------------------------------------------
+
+    def _read_history(self) -> List[BackupCommit]:
+        """First-parent history of the branch, oldest first"""
+        success, output = self.run_git([
+            "git", "log", "--first-parent", "--reverse", "--date=raw",
+            "--format=%H%x1f%T%x1f%an <%ae> %ad%x1f%cn <%ce> %cd%x1f%P%x1f%B%x1e",
+            self.branch
+        ], timeout=300)
+        if not success:
+            return []
+        commits = []
+        for record in output.split("\x1e"):
+            fields = record.lstrip("\n").split("\x1f")
+            if len(fields) != 6:
+                continue
+            sha, tree, author, committer, parents, message = fields
+            commits.append(BackupCommit(sha, tree, author, committer, int(committer.rsplit(" ", 2)[1]),
+                                        message, " " in parents.strip()))
+        return commits
+
+    def squash(self, days: int) -> bool:
+        """
+        Squash auto-backup commits older than `days` into one commit per day
+
+        Only the run of backup commits after the newest non-backup commit is
+        touched; newer commits are replayed unchanged on top, so the final
+        tree (and the index / working tree) stay exactly the same.
+
+        Returns:
+            True if the branch was rewritten
+        """
+        commits = self._read_history()
+        if not commits:
+            return False
+        cutoff = time.time() - days * 86400
+
+        # Start after the newest commit that must be kept as it is
+        base_index = -1
+        split = len(commits)
+        for i, commit in enumerate(commits):
+            if commit.timestamp >= cutoff:
+                split = i
+                break
+            if commit.merge or not commit.message.startswith(BACKUP_PREFIXES):
+                base_index = i
+        old = commits[base_index + 1:split]
+        recent = commits[split:]
+
+        # Group by local calendar day; the last commit of a day holds its state
+        days_groups: Dict[str, List[BackupCommit]] = {}
+        for commit in old:
+            days_groups.setdefault(datetime.fromtimestamp(commit.timestamp).strftime("%Y-%m-%d"), []).append(commit)
+        if all(len(group) == 1 for group in days_groups.values()):
+            return False
+        if any(c.merge for c in recent):
+            logger.warning("Merge commit in recent backup history, compaction skipped")
+            return False
+
+        old_head = commits[-1].sha
+        # The temporary branch starts at the base; every commit chains on the previous one
+        base = f"from {commits[base_index].sha}\n" if base_index >= 0 else ""
+        stream = [f"reset {REWRITE_REF}\n{base}\n".encode()]
+        for day, group in days_groups.items():
+            count = sum(self._weight(c) for c in group)
+            message = f"Backup checkpoint: {day} ({count} commit{'s' if count != 1 else ''})\n"
+            stream.append(self._fast_import_commit(group[-1]._replace(message=message)))
+        for commit in recent:
+            stream.append(self._fast_import_commit(commit))
+        if not self._fast_import(b"".join(stream)):
+            return False
+
+        success, new_head = self.run_git(["git", "rev-parse", "--verify", REWRITE_REF])
+        if not success:
+            return False
+        # Compare-and-swap: fails if a commit slipped in meanwhile
+        success, output = self.run_git(["git", "update-ref", "-m", f"backup: squash history older than {days}d",
+                                        f"refs/heads/{self.branch}", new_head, old_head])
+        self.run_git(["git", "update-ref", "-d", REWRITE_REF])
+        if not success:
+            logger.error(f"Compaction not applied: {output}")
+            return False
+
+        logger.info(f"Squashed {len(old)} backup commits into {len(days_groups)} daily checkpoints "
+                    f"({old_head[:8]} -> {new_head[:8]})")
+        if self.on_rewrite:
+            self.on_rewrite(old_head, new_head)
+        return True
+
+    @staticmethod
+    def _weight(commit: BackupCommit) -> int:
+        """Commits represented by `commit` (checkpoints carry their count)"""
+        match = CHECKPOINT_COUNT.match(commit.message)
+        return int(match.group(1)) if match else 1
+
+    @staticmethod
+    def _fast_import_commit(commit: BackupCommit) -> bytes:
+        """fast-import command re-creating `commit` with its original tree and dates"""
+        message = commit.message.encode("utf-8")
+        lines = [
+            f"commit {REWRITE_REF}".encode(),
+            f"author {commit.author}".encode("utf-8"),
+            f"committer {commit.committer}".encode("utf-8"),
+            b"data %d" % len(message),
+            message,
+        ]
+        # Whole root tree by id, no blob is re-read
+        lines.append(f'M 040000 {commit.tree} ""'.encode())
+        return b"\n".join(lines) + b"\n\n"
+
+    def _fast_import(self, stream: bytes) -> bool:
+        try:
+            result = subprocess.run(
+                ["git", "fast-import", "--quiet", "--force"],
+                cwd=self.repo_path,
+                input=stream,
+                capture_output=True,
+                timeout=600,
+                env={**os.environ, "GIT_TERMINAL_PROMPT": "0"}
+            )
+        except (OSError, subprocess.TimeoutExpired) as e:
+            logger.error(f"git fast-import failed: {e}")
+            return False
+        if result.returncode != 0:
+            logger.error(f"git fast-import failed: {result.stderr.decode(errors='replace').strip()}")
+            return False
+        return True
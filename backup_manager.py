@@ -4,21 +4,44 @@ Fixes: Git concurrency issues, branch mismatch, token authentication
 
 Key Features:
 - Queue-based backup (no parallel git operations)
-- File-based locking mechanism
+- Local commits decoupled from pushes (retrying push scheduler with backoff)
+- Pluggable targets: GitHub, local bare repo, rotating snapshots (backup_targets)
+- Kernel advisory locking (flock), released automatically if the process dies
 - Batched commits (multiple files in 1 commit)
+- Event-driven worker: flush on max delay / files / bytes, scaled by push latency
 - Proper token authentication in remote URL
 - Uses 'main' branch (not 'master')
+- Non-blocking startup: git setup runs in the background, queued files are buffered
+- In-process commits (git_writer): `git push` is the only subprocess per batch
+- Content fingerprints: unchanged files are never staged (no-op batches are free)
+- In-memory snapshots: commit exactly the bytes captured at save time
+- Asyncio API (backup_now_async / flush_async / flush_on_exit) resolved via futures
+- Idle-time repository maintenance: gc, daily checkpoints, pack budget (backup_maintenance)
+- Metrics: queue depth, batch sizes, per-phase latency, failures (get_stats / export_metrics)
 """
 
 import os
+import json
+import fcntl
+import socket
 import subprocess
 import threading
 import queue
+import asyncio
 import time
+import hashlib
 import logging
+import statistics
+from collections import deque
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Optional, Set
+from typing import Any, Callable, Deque, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple, Union
 from pathlib import Path
+from concurrent.futures import Future, InvalidStateError, TimeoutError as FutureTimeoutError
+
+from git_writer import CommitWriter, CliWriter, WriterError, create_writer
+from backup_targets import BackupTarget, GitPushTarget, PushScheduler, PushState
+from backup_maintenance import RepoMaintainer
 
 # Setup logging
 logging.basicConfig(
@@ -28,63 +51,200 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# In-memory file content: serialized bytes, or a thread-safe callable returning them
+Snapshot = Union[bytes, Callable[[], bytes]]
+# Files to back up: filenames (read from disk) or filename -> snapshot
+BackupFiles = Union[List[str], Dict[str, Optional[Snapshot]]]
+
+
+class _FlockWaiter:
+    """
+    Blocks in flock() on its own thread for one lock file
+
+    Timed GitLock waits on the same file share one waiter. When the kernel
+    grants the lock, the locked file is handed to a caller that is still
+    waiting; if they have all timed out, the lock is released again at
+    once. However many waits time out, at most one thread and one file
+    descriptor per lock file are parked in the kernel.
+    """
+
+    _waiters: Dict[str, "_FlockWaiter"] = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, path: str):
+        self.path = path
+        self.cond = threading.Condition()
+        self.pending = 0                 # Callers waiting on this waiter
+        self.fd: Optional[int] = None    # Locked fd not yet taken by a caller
+        self.error: Optional[OSError] = None
+        self.finished = False
+
+    @classmethod
+    def join(cls, path: str) -> "_FlockWaiter":
+        """Register as waiting for `path`, starting a waiter thread if none is running"""
+        with cls._registry_lock:
+            waiter = cls._waiters.get(path)
+            if waiter is None:
+                waiter = cls._waiters[path] = cls(path)
+                threading.Thread(target=waiter._run, name="flock-waiter", daemon=True).start()
+            with waiter.cond:
+                waiter.pending += 1
+        return waiter
+
+    def _run(self):
+        fd, error = None, None
+        try:
+            fd = os.open(self.path, os.O_CREAT | os.O_RDWR, 0o644)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        except OSError as e:
+            if fd is not None:
+                os.close(fd)
+            fd, error = None, e
+
+        with self._registry_lock:
+            self._waiters.pop(self.path, None)  # Callers arriving from now on start a new wait
+        with self.cond:
+            if fd is not None and not self.pending:
+                os.close(fd)  # Everyone gave up: hand the lock straight back
+                fd = None
+            self.fd, self.error = fd, error
+            self.finished = True
+            self.cond.notify_all()
+
+    def take(self, deadline: float) -> Tuple[bool, Optional[int]]:
+        """
+        Wait (as a joined caller) until the waiter finishes or `deadline` passes
+
+        Returns:
+            (finished, fd): fd is the locked file if this caller got it
+
+        Raises:
+            OSError: The waiter could not open or lock the file
+        """
+        with self.cond:
+            while not self.finished:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.cond.wait(remaining)
+            self.pending -= 1
+            if not self.finished:
+                return False, None
+            if self.error is not None:
+                raise self.error
+            fd, self.fd = self.fd, None
+            return True, fd
+
 
 class GitLock:
-    """File-based lock to prevent concurrent Git operations"""
+    """
+    Kernel advisory lock (flock) to prevent concurrent Git operations
+
+    The lock is held on an open file description, so the kernel releases
+    it as soon as the holder closes the file or its process dies - there
+    is no stale-lock cleanup. Waiters block in the kernel (no polling) and
+    get the lock as soon as it is released; a timed wait is given up at
+    its deadline and leaves nothing holding the lock (see _FlockWaiter).
+    The lock file itself is never deleted (that would let two holders
+    lock different inodes); it only carries a PID/host record of the
+    current holder for diagnostics.
+    """
     
-    def __init__(self, lock_file: str):
+    def __init__(self, lock_file: str, purpose: str = "backup"):
         self.lock_file = lock_file
+        self.purpose = purpose
         self.lock_fd = None
     
-    def acquire(self, timeout: int = 30) -> bool:
-        """Acquire lock with timeout"""
-        start_time = time.time()
-        
+    def _holder(self) -> str:
+        """Who holds the lock, according to the record in the lock file"""
+        try:
+            with open(self.lock_file, "r", encoding="utf-8") as f:
+                info = json.loads(f.read() or "{}")
+            return f"pid {info.get('pid')} on {info.get('host')} ({info.get('purpose')}, since {info.get('acquired_at')})"
+        except (OSError, ValueError):
+            return "unknown holder"
+
+    def _wait_for_lock(self, timeout: float) -> Optional[int]:
+        """Blocking flock with a deadline; returns the locked fd (None on timeout)"""
+        deadline = time.monotonic() + timeout
+        path = os.path.abspath(self.lock_file)
         while True:
+            finished, fd = _FlockWaiter.join(path).take(deadline)
+            if fd is not None:
+                return fd
+            if not finished or time.monotonic() >= deadline:
+                return None
+            # Another caller took that grant: wait for the next one
+
+    def acquire(self, timeout: Optional[float] = 30) -> bool:
+        """
+        Acquire lock
+
+        Args:
+            timeout: Max seconds to wait (None = wait forever)
+
+        Returns:
+            True if the lock is held (False on timeout or any lock file error)
+        """
+        try:
+            fd = os.open(self.lock_file, os.O_CREAT | os.O_RDWR, 0o644)
+        except OSError as e:
+            logger.error(f"Cannot open lock file {self.lock_file}: {e}")
+            return False
+
+        acquired = False
+        try:
             try:
-                # Try to create lock file exclusively
-                self.lock_fd = os.open(
-                    self.lock_file,
-                    os.O_CREAT | os.O_EXCL | os.O_WRONLY
-                )
-                # Write PID to lock file
-                os.write(self.lock_fd, str(os.getpid()).encode())
-                logger.debug(f"Lock acquired: {self.lock_file}")
-                return True
-            except FileExistsError:
-                # Lock file exists, check if stale
-                if os.path.exists(self.lock_file):
-                    # Check lock age
-                    lock_age = time.time() - os.path.getmtime(self.lock_file)
-                    if lock_age > 300:  # 5 minutes = stale lock
-                        logger.warning(f"Removing stale lock (age: {lock_age:.0f}s)")
-                        try:
-                            os.remove(self.lock_file)
-                        except:
-                            pass
-                
-                # Check timeout
-                if time.time() - start_time > timeout:
-                    logger.error(f"Failed to acquire lock after {timeout}s")
-                    return False
-                
-                # Wait and retry
-                time.sleep(0.5)
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                logger.debug(f"Waiting for lock held by {self._holder()}")
+                started = time.monotonic()
+                if timeout is None:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                else:
+                    os.close(fd)
+                    fd = self._wait_for_lock(timeout)
+                    if fd is None:
+                        logger.error(f"Failed to acquire lock after {timeout}s (held by {self._holder()})")
+                        return False
+                logger.debug(f"Lock acquired after {time.monotonic() - started:.3f}s")
+
+            # Record the holder for diagnostics
+            record = {
+                "pid": os.getpid(),
+                "host": socket.gethostname(),
+                "purpose": self.purpose,
+                "acquired_at": datetime.now().isoformat(timespec="seconds")
+            }
+            os.ftruncate(fd, 0)
+            os.pwrite(fd, json.dumps(record).encode(), 0)
+            self.lock_fd = fd
+            acquired = True
+            logger.debug(f"Lock acquired: {self.lock_file}")
+            return True
+        except OSError as e:
+            logger.error(f"Failed to acquire lock {self.lock_file}: {e}")
+            return False
+        finally:
+            if not acquired and fd is not None:
+                os.close(fd)  # Also drops the lock if it was taken before the error
     
     def release(self):
         """Release lock"""
         if self.lock_fd is not None:
             try:
-                os.close(self.lock_fd)
-                os.remove(self.lock_file)
+                os.ftruncate(self.lock_fd, 0)
+                fcntl.flock(self.lock_fd, fcntl.LOCK_UN)
                 logger.debug(f"Lock released: {self.lock_file}")
             except Exception as e:
                 logger.error(f"Error releasing lock: {e}")
             finally:
+                os.close(self.lock_fd)
                 self.lock_fd = None
     
     def __enter__(self):
-        self.acquire()
+        if not self.acquire():
+            raise TimeoutError(f"Could not acquire {self.lock_file}")
         return self
     
     def __exit__(self, exc_type, exc_val, exc_tb):
@@ -92,45 +252,352 @@ class GitLock:
 
 
 class BackupQueue:
-    """Queue for batching backup requests"""
+    """
+    Queue for batching backup requests
+
+    The worker blocks on a condition variable (no polling) and a batch is
+    flushed as soon as one threshold is hit:
+        - max_delay seconds since the oldest queued change
+        - max_files distinct files queued
+        - max_bytes of queued file data
+    Thresholds scale up while pushes are slow, so a slow remote gets
+    fewer, bigger batches.
+    """
     
-    def __init__(self, batch_interval: float = 5.0):
-        self.files_to_backup: Set[str] = set()
+    def __init__(self, max_delay: float = 5.0, max_files: int = 4, max_bytes: int = 512 * 1024,
+                 target_push_latency: float = 2.0, max_scale: float = 12.0):
+        """
+        Args:
+            max_delay: Max seconds a change waits before its batch is flushed
+            max_files: Flush once this many files are queued
+            max_bytes: Flush once queued files add up to this many bytes
+            target_push_latency: Push time (seconds) at which thresholds start to grow
+            max_scale: Upper bound for threshold scaling
+        """
+        self.files_to_backup: Dict[str, int] = {}  # filename -> size in bytes
+        self.snapshots: Dict[str, Snapshot] = {}   # filename -> newest in-memory content
+        self.waiters: List[Tuple[Future, bool]] = []  # (future, wait for push) resolved with the next batch
         self.lock = threading.Lock()
-        self.batch_interval = batch_interval
+        self.changed = threading.Condition(self.lock)
+        self.base_delay = max_delay
+        self.base_files = max_files
+        self.base_bytes = max_bytes
+        self.target_push_latency = target_push_latency
+        self.max_scale = max_scale
+        self.push_latency = 0.0   # EWMA of push duration (seconds)
+        self.scale = 1.0
+        self.first_queued_at = 0.0
+        self.queued_bytes = 0
+        self.retry_at = 0.0       # Monotonic time before which a failed batch is not retried
         self.last_backup_time = 0
     
-    def add_file(self, filename: str):
-        """Add file to backup queue"""
-        with self.lock:
-            self.files_to_backup.add(filename)
-            logger.debug(f"Added to queue: {filename}")
+    @property
+    def max_delay(self) -> float:
+        return self.base_delay * self.scale
+
+    @property
+    def max_files(self) -> int:
+        return int(self.base_files * self.scale)
+
+    @property
+    def max_bytes(self) -> int:
+        return int(self.base_bytes * self.scale)
+
+    def add_file(self, filename: str, size: int = 0, snapshot: Optional[Snapshot] = None):
+        """
+        Add file to backup queue and wake the worker
+
+        Args:
+            filename: File to back up (relative to the repository)
+            size: Size in bytes (for the max_bytes threshold)
+            snapshot: Content to commit instead of reading the file (latest wins)
+        """
+        self.add_files({filename: (size, snapshot)})
+
+    def add_files(self, entries: Dict[str, Tuple[int, Optional[Snapshot]]]):
+        """
+        Add several files at once (the worker never sees only part of them)
+
+        Args:
+            entries: filename -> (size, snapshot or None)
+        """
+        with self.changed:
+            if not self.files_to_backup:
+                self.first_queued_at = time.monotonic()
+            for filename, (size, snapshot) in entries.items():
+                self.queued_bytes += size - self.files_to_backup.get(filename, 0)
+                self.files_to_backup[filename] = size
+                if snapshot is not None:
+                    self.snapshots[filename] = snapshot
+                else:
+                    self.snapshots.pop(filename, None)
+                logger.debug(f"Added to queue: {filename}")
+            self.changed.notify()
     
-    def get_pending_files(self) -> List[str]:
-        """Get and clear pending files"""
+    def requeue(self, files: Dict[str, Optional[Snapshot]], delay: float):
+        """
+        Put a failed batch back, to be retried after `delay` seconds
+
+        Files queued again since the batch was drained are newer and win.
+        A flush request (waiter) still retries right away.
+
+        Args:
+            files: The drained batch (filename -> snapshot or None)
+            delay: Seconds before the next attempt
+        """
+        with self.changed:
+            if not self.files_to_backup:
+                self.first_queued_at = time.monotonic()
+            for filename, snapshot in files.items():
+                if filename in self.files_to_backup:
+                    continue
+                size = len(snapshot) if isinstance(snapshot, bytes) else 0
+                self.files_to_backup[filename] = size
+                self.queued_bytes += size
+                if snapshot is not None:
+                    self.snapshots[filename] = snapshot
+            self.retry_at = time.monotonic() + delay
+            self.changed.notify()
+
+    def add_waiter(self, future: Future, push: bool = False):
+        """Flush now; `future` resolves when the batch holding everything queued so far is done"""
+        with self.changed:
+            self.waiters.append((future, push))
+            self.changed.notify()
+
+    def drain_batch(self) -> Tuple[Dict[str, Optional[Snapshot]], List[Tuple[Future, bool]]]:
+        """Get and clear pending files together with their waiters"""
         with self.lock:
-            files = list(self.files_to_backup)
-            self.files_to_backup.clear()
-            return files
+            waiters, self.waiters = self.waiters, []
+            return self._drain(), waiters
+
+    def _drain(self) -> Dict[str, Optional[Snapshot]]:
+        files = {filename: self.snapshots.get(filename) for filename in self.files_to_backup}
+        self.files_to_backup.clear()
+        self.snapshots.clear()
+        self.queued_bytes = 0
+        return files
+
+    def get_pending_files(self) -> Dict[str, Optional[Snapshot]]:
+        """Get and clear pending files (filename -> snapshot or None)"""
+        with self.lock:
+            return self._drain()
     
+    def _due_in(self) -> Optional[float]:
+        """Seconds until the pending batch must be flushed (None = queue empty)"""
+        if self.waiters:
+            return 0.0
+        if not self.files_to_backup:
+            return None
+        retry_in = self.retry_at - time.monotonic()
+        if retry_in > 0:
+            return retry_in
+        if len(self.files_to_backup) >= self.max_files or self.queued_bytes >= self.max_bytes:
+            return 0.0
+        return self.first_queued_at + self.max_delay - time.monotonic()
+
     def should_backup(self) -> bool:
-        """Check if enough time has passed or queue is full"""
+        """Check if a flush threshold has been reached"""
         with self.lock:
-            if not self.files_to_backup:
-                return False
-            
-            time_since_last = time.time() - self.last_backup_time
-            return time_since_last >= self.batch_interval or len(self.files_to_backup) >= 4
+            due_in = self._due_in()
+            return due_in is not None and due_in <= 0
+    
+    def wait_for_batch(self, running: Callable[[], bool],
+                       idle_timeout: Optional[float] = None) -> Tuple[Dict[str, Optional[Snapshot]], List[Tuple[Future, bool]]]:
+        """
+        Block until a batch is due, then drain it
+
+        Args:
+            running: Returns False when the worker should stop
+            idle_timeout: Also return after this many seconds with an empty
+                queue (None = sleep until something is queued)
+
+        Returns:
+            (files, waiters): filename -> snapshot or None, plus the futures
+            to resolve once the batch is done (both empty on shutdown / idle)
+        """
+        idle_deadline = time.monotonic() + idle_timeout if idle_timeout is not None else None
+        with self.changed:
+            while running():
+                due_in = self._due_in()
+                if due_in is not None and due_in <= 0:
+                    waiters, self.waiters = self.waiters, []
+                    return self._drain(), waiters
+                if due_in is None and idle_deadline is not None:
+                    due_in = idle_deadline - time.monotonic()
+                    if due_in <= 0:
+                        return {}, []
+                self.changed.wait(due_in)
+            return {}, []
+
+    def wake(self):
+        """Wake the worker (e.g. for shutdown)"""
+        with self.changed:
+            self.changed.notify_all()
+
+    def record_push_latency(self, seconds: float):
+        """Feed a measured push duration into the threshold scaling"""
+        with self.lock:
+            self.push_latency = seconds if not self.push_latency else 0.7 * self.push_latency + 0.3 * seconds
+            self.scale = max(1.0, min(self.max_scale, self.push_latency / self.target_push_latency))
     
     def mark_backup_done(self):
         """Mark backup as completed"""
         self.last_backup_time = time.time()
 
+    def depth(self) -> Dict[str, Any]:
+        """Pending files, bytes, age of the oldest pending change and waiters"""
+        with self.lock:
+            return {
+                "pending_files": len(self.files_to_backup),
+                "pending_bytes": self.queued_bytes,
+                "oldest_pending_age": time.monotonic() - self.first_queued_at if self.files_to_backup else 0.0,
+                "waiters": len(self.waiters),
+                "max_delay": self.max_delay,
+                "max_files": self.max_files,
+                "max_bytes": self.max_bytes,
+                "push_latency_ewma": self.push_latency,
+            }
+
+
+class FileFingerprint(NamedTuple):
+    """Size, mtime and content hash of a file as last committed"""
+    size: int
+    mtime_ns: int
+    digest: bytes
+    taken_ns: int  # When the fingerprint was taken
+
+    # Writes within this window of taking the fingerprint may share its mtime
+    RACY_WINDOW_NS = 2_000_000_000
+
+    @staticmethod
+    def digest_of(data: bytes) -> bytes:
+        return hashlib.blake2b(data, digest_size=16).digest()
+
+    def matches_stat(self, stat: os.stat_result) -> bool:
+        """True if the file is certainly unchanged without reading it"""
+        return (
+            stat.st_size == self.size
+            and stat.st_mtime_ns == self.mtime_ns
+            and self.taken_ns - self.mtime_ns > self.RACY_WINDOW_NS
+        )
+
+
+class RollingStat:
+    """Count / total / max plus a window of recent values for percentiles"""
+
+    def __init__(self, window: int = 200):
+        self.count = 0
+        self.total = 0.0
+        self.last: Optional[float] = None
+        self.max = 0.0
+        self.recent: Deque[float] = deque(maxlen=window)
+
+    def add(self, value: float):
+        self.count += 1
+        self.total += value
+        self.last = value
+        self.max = max(self.max, value)
+        self.recent.append(value)
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        recent = sorted(self.recent)
+        return {
+            "count": self.count,
+            "last": self.last,
+            "avg": self.total / self.count if self.count else None,
+            "p50": statistics.median(recent) if recent else None,
+            "p95": recent[min(len(recent) - 1, int(len(recent) * 0.95))] if recent else None,
+            "max": self.max if self.count else None,
+        }
+
+
+class BackupMetrics:
+    """Thread-safe counters and timings of the backup pipeline"""
+
+    # stage: diff against fingerprints + read files, lock_wait: git lock,
+    # commit: objects + ref + index, push: one push attempt (GitHub)
+    PHASES = ("stage", "lock_wait", "commit", "push")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.timings = {phase: RollingStat() for phase in self.PHASES}
+        self.batch_files = RollingStat()    # Files per batch (as queued)
+        self.batch_bytes = RollingStat()    # Bytes per commit (changed files)
+        self.batches = 0
+        self.commits = 0
+        self.noop_batches = 0               # Nothing changed (fingerprints matched)
+        self.files_committed = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_success: Optional[float] = None   # Epoch timestamps
+        self.last_failure: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time a block as one sample of `name`"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def record(self, name: str, seconds: float):
+        with self.lock:
+            self.timings[name].add(seconds)
+
+    def record_batch(self, queued: int, changed: int = 0, size: int = 0, committed: bool = False):
+        """A batch finished without error (committed, or nothing to commit)"""
+        with self.lock:
+            self.batches += 1
+            self.batch_files.add(queued)
+            if committed:
+                self.commits += 1
+                self.files_committed += changed
+                self.batch_bytes.add(size)
+            else:
+                self.noop_batches += 1
+            self.consecutive_failures = 0
+            self.last_success = time.time()
+
+    def record_failure(self, error: str):
+        with self.lock:
+            self.batches += 1
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.last_failure = time.time()
+            self.last_error = error
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "batches": self.batches,
+                "commits": self.commits,
+                "noop_batches": self.noop_batches,
+                "files_committed": self.files_committed,
+                "batch_files": self.batch_files.summary(),
+                "batch_bytes": self.batch_bytes.summary(),
+                "latency": {phase: timing.summary() for phase, timing in self.timings.items()},
+                "failures": self.failures,
+                "consecutive_failures": self.consecutive_failures,
+                "last_success": self.last_success,
+                "last_failure": self.last_failure,
+                "last_error": self.last_error,
+            }
+
 
 class GitBackupManager:
     """Thread-safe Git backup manager with queue-based batching"""
     
-    def __init__(self, repo_path: str, remote_url: str, auth_token: str):
+    AUTHOR_NAME = "VoraHub Bot"
+    AUTHOR_EMAIL = "bot@vorahub.local"
+    RETRY_DELAY = 5.0        # First retry of a failed batch (seconds), doubled per failure
+    RETRY_MAX_DELAY = 300.0
+
+    def __init__(self, repo_path: str, remote_url: str, auth_token: str, writer_backend: str = "auto",
+                 max_delay: float = 5.0, max_files: int = 4, max_bytes: int = 512 * 1024,
+                 targets: Optional[List[BackupTarget]] = None, maintenance: Optional[RepoMaintainer] = None):
         """
         Initialize backup manager
         
@@ -138,17 +605,48 @@ class GitBackupManager:
             repo_path: Path to repository (bot directory)
             remote_url: GitHub repository URL (https://github.com/user/repo.git)
             auth_token: GitHub Personal Access Token
+            writer_backend: Commit writer ("auto", "pygit2", "python" or "cli")
+            max_delay: Batch flush threshold in seconds (see BackupQueue)
+            max_files: Batch flush threshold in files
+            max_bytes: Batch flush threshold in bytes
+            targets: Extra backup targets (local bare repo, snapshots); the
+                GitHub remote is added automatically when remote_url is set
+            maintenance: Repository maintenance policy (default: gc every 6h when idle)
         """
         self.repo_path = Path(repo_path).resolve()
         self.remote_url = remote_url
         self.auth_token = auth_token
         self.lock_file = self.repo_path / ".git" / "backup.lock"
-        self.backup_queue = BackupQueue(batch_interval=5.0)
+        self.backup_queue = BackupQueue(max_delay=max_delay, max_files=max_files, max_bytes=max_bytes)
         self.worker_thread = None
         self.running = False
-        
-        # Initialize Git repository
-        self._init_git()
+        self.batch_failures = 0  # Consecutive failed batches (retry backoff)
+        self._git_env = {**os.environ, 'GIT_TERMINAL_PROMPT': '0'}  # Disable interactive prompts
+        self._fingerprints: Dict[str, FileFingerprint] = {}  # filename -> content as last committed
+        # One batch at a time from collect to commit (worker, backup_now,
+        # shutdown), so fingerprints are never read and written concurrently
+        self._batch_lock = threading.Lock()
+        self.writer_backend = writer_backend
+        self.writer: Optional[CommitWriter] = None
+        self.maintenance = maintenance or RepoMaintainer(repo_path)
+        self._worker_started = time.time()  # Idle time is counted from here until the first commit
+        self._maintenance_pending = False  # A commit was made since the last maintenance run
+        self.metrics = BackupMetrics()
+
+        # Every local commit fans out to the targets; pushes run on their
+        # own threads so a slow GitHub never blocks commits
+        self.targets: List[BackupTarget] = list(targets or [])
+        self.remote_target: Optional[GitPushTarget] = None
+        if remote_url:
+            self.remote_target = GitPushTarget(
+                "github", "origin", mask=auth_token or None, on_push=self._record_push
+            )
+            self.targets.append(self.remote_target)
+
+        # Git setup runs on the worker thread; files queued before it
+        # finishes are buffered in backup_queue
+        self.ready = threading.Event()
+        self.init_error: Optional[str] = None
         
         # Start background worker
         self._start_worker()
@@ -171,7 +669,7 @@ class GitBackupManager:
                 capture_output=True,
                 text=True,
                 timeout=timeout,
-                env={**os.environ, 'GIT_TERMINAL_PROMPT': '0'}  # Disable interactive prompts
+                env=self._git_env
             )
             
             if result.returncode == 0:
@@ -188,8 +686,42 @@ class GitBackupManager:
             logger.error(f"Error running git command: {e}")
             return False, str(e)
     
+    def _initialize(self) -> bool:
+        """Git setup, commit writer and push scheduler (runs on the worker thread)"""
+        started = time.monotonic()
+        try:
+            self._init_git()
+
+            # Commit writer (in-process unless the repository needs the CLI)
+            self.writer = create_writer(
+                self.repo_path, self.AUTHOR_NAME, self.AUTHOR_EMAIL, self._run_git_command, self.writer_backend
+            )
+            logger.info(f"Commit writer: {self.writer.name}")
+
+            for target in self.targets:
+                target.start(self._run_git_command, self.repo_path)
+                logger.info(f"Backup target ready: {target.name}")
+
+            self.maintenance.start(self._run_git_command, on_rewrite=self._on_rewrite)
+        except Exception as e:
+            self.init_error = str(e)
+            logger.error(f"Backup initialization failed, backups disabled: {e}")
+            return False
+        finally:
+            self.ready.set()
+
+        logger.info(f"Backup manager ready in {time.monotonic() - started:.2f}s")
+        return True
+
+    def _read_config(self) -> Dict[str, str]:
+        """Local git config as a flat dict (one subprocess)"""
+        success, output = self._run_git_command(["git", "config", "--local", "--list"])
+        if not success:
+            return {}
+        return dict(line.split("=", 1) for line in output.splitlines() if "=" in line)
+
     def _init_git(self):
-        """Initialize Git repository with proper configuration"""
+        """Initialize Git repository with proper configuration (only what is missing)"""
         git_dir = self.repo_path / ".git"
         
         # Initialize if needed
@@ -202,16 +734,20 @@ class GitBackupManager:
             # Set initial branch to main
             self._run_git_command(["git", "branch", "-M", "main"])
         
-        # Configure Git user
-        self._run_git_command(["git", "config", "user.name", "VoraHub Bot"])
-        self._run_git_command(["git", "config", "user.email", "bot@vorahub.local"])
+        config = self._read_config()
+
+        # Configure Git user; automatic gc is replaced by idle-time maintenance
+        for key, value in (("user.name", self.AUTHOR_NAME), ("user.email", self.AUTHOR_EMAIL), ("gc.auto", "0")):
+            if config.get(key) != value:
+                self._run_git_command(["git", "config", key, value])
         
         # Configure remote with token authentication
-        self._configure_remote()
+        if self.remote_url:
+            self._configure_remote(config)
         
         logger.info("Git repository initialized successfully")
     
-    def _configure_remote(self):
+    def _configure_remote(self, config: Dict[str, str]):
         """Configure remote with token authentication"""
         # Build authenticated URL
         if self.auth_token and "github.com" in self.remote_url:
@@ -225,9 +761,11 @@ class GitBackupManager:
             auth_url = self.remote_url
         
         # Check if remote exists
-        success, _ = self._run_git_command(["git", "remote", "get-url", "origin"])
+        current_url = config.get("remote.origin.url")
         
-        if success:
+        if current_url == auth_url:
+            pass
+        elif current_url is not None:
             # Update existing remote
             self._run_git_command(["git", "remote", "set-url", "origin", auth_url])
             logger.info("Remote 'origin' updated with token authentication")
@@ -237,101 +775,306 @@ class GitBackupManager:
             logger.info("Remote 'origin' added with token authentication")
         
         # Set upstream branch to main
-        self._run_git_command(["git", "branch", "--set-upstream-to=origin/main", "main"])
+        if config.get("branch.main.remote") != "origin" or config.get("branch.main.merge") != "refs/heads/main":
+            self._run_git_command(["git", "branch", "--set-upstream-to=origin/main", "main"])
     
-    def _perform_backup(self, files: List[str]) -> bool:
+    def _perform_backup(self, files: BackupFiles) -> bool:
         """
         Perform actual backup with file locking
+
+        A batch that fails (lock timeout, commit error) goes back into the
+        queue and is retried with backoff, so no change is ever dropped.
         
         Args:
-            files: List of filenames to backup
+            files: Filenames to backup, or filename -> in-memory snapshot (None = read file)
             
         Returns:
             True if successful, False otherwise
         """
         if not files:
             return True
+        if not isinstance(files, dict):
+            files = dict.fromkeys(files)
+
+        try:
+            with self._batch_lock:
+                success = self._commit_batch(files)
+        except Exception as e:
+            logger.error(f"Error during backup: {e}")
+            success = False
+        if success:
+            self.batch_failures = 0
+        else:
+            self.batch_failures += 1
+            delay = min(self.RETRY_DELAY * 2 ** (self.batch_failures - 1), self.RETRY_MAX_DELAY)
+            logger.warning(f"Backup failed, retrying {len(files)} file(s) in {delay:.0f}s")
+            self.backup_queue.requeue(files, delay)
+        return success
+
+    def _commit_batch(self, files: BackupFiles) -> bool:
+        """Commit one batch under the git lock (False on lock timeout / commit failure)"""
+        # Skip files whose content matches the last commit (no lock, no git)
+        with self.metrics.phase("stage"):
+            changed = self._collect_changes(files)
+        if not changed:
+            logger.debug("No changes to commit (fingerprints match)")
+            self.metrics.record_batch(len(files))
+            return True
         
         lock = GitLock(str(self.lock_file))
         
         # Acquire lock
-        if not lock.acquire(timeout=30):
+        with self.metrics.phase("lock_wait"):
+            acquired = lock.acquire(timeout=30)
+        if not acquired:
             logger.error("Failed to acquire Git lock, skipping backup")
+            self.metrics.record_failure("git lock timeout")
             return False
         
         try:
-            # Verify files exist
-            existing_files = []
-            for filename in files:
-                filepath = self.repo_path / filename
-                if filepath.exists():
-                    existing_files.append(filename)
-                else:
-                    logger.warning(f"File not found: {filename}")
-            
-            if not existing_files:
-                logger.info("No files to backup")
-                return True
-            
-            # Stage files
-            for filename in existing_files:
-                success, output = self._run_git_command(["git", "add", filename])
-                if not success:
-                    logger.error(f"Failed to stage {filename}: {output}")
+            # Build blobs, tree and commit in one step
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            files_str = ", ".join(changed)
+            commit_msg = f"Auto-backup: {files_str} - {timestamp}"
+            contents = {Path(filename).as_posix(): data for filename, (data, _) in changed.items()}
+
+            started = time.perf_counter()
+            try:
+                commit_sha = self.writer.commit(contents, commit_msg)
+            except WriterError as e:
+                if isinstance(self.writer, CliWriter):
+                    logger.error(f"Failed to commit: {e}")
+                    self.metrics.record_failure(f"commit: {e}")
                     return False
-            
-            # Check if there are changes to commit
-            success, output = self._run_git_command(["git", "diff", "--cached", "--quiet"])
-            if success:
+                logger.warning(f"{self.writer.name} writer failed ({e}), falling back to git CLI")
+                self.writer = CliWriter(self.repo_path, self.AUTHOR_NAME, self.AUTHOR_EMAIL, self._run_git_command)
+                commit_sha = self.writer.commit(contents, commit_msg)
+
+            self.metrics.record("commit", time.perf_counter() - started)
+
+            # Content is now in HEAD either way
+            for filename, (_, fingerprint) in changed.items():
+                self._fingerprints[filename] = fingerprint
+
+            self.metrics.record_batch(len(files), len(changed), sum(len(data) for data in contents.values()),
+                                      committed=commit_sha is not None)
+            if commit_sha is None:
                 logger.info("No changes to commit")
                 return True
-            
-            # Create commit
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            files_str = ", ".join(existing_files)
-            commit_msg = f"Auto-backup: {files_str} - {timestamp}"
-            
-            success, output = self._run_git_command(["git", "commit", "-m", commit_msg])
-            if not success:
-                logger.error(f"Failed to commit: {output}")
-                return False
+            self._maintenance_pending = True
+            logger.debug(f"Commit {commit_sha[:8]} written in {(time.perf_counter() - started) * 1000:.1f}ms")
             
             logger.info(f"Committed: {commit_msg}")
-            
-            # Push to remote (main branch)
-            success, output = self._run_git_command(["git", "push", "origin", "main"], timeout=60)
-            if not success:
-                logger.error(f"Failed to push to GitHub: {output}")
-                # Try to set upstream and push again
-                self._run_git_command(["git", "push", "-u", "origin", "main"], timeout=60)
-                return False
-            
-            logger.info(f"Successfully pushed to GitHub: {files_str}")
+            for target in self.targets:
+                try:
+                    target.on_commit(commit_sha, contents)
+                except Exception as e:
+                    logger.error(f"Backup target {target.name} failed: {e}")
             return True
         
         except Exception as e:
             logger.error(f"Error during backup: {e}")
+            self.metrics.record_failure(str(e))
             return False
         
         finally:
             lock.release()
     
+    def _collect_changes(self, files: BackupFiles) -> Dict[str, Tuple[bytes, "FileFingerprint"]]:
+        """
+        Collect content that differs from its last committed fingerprint
+
+        Snapshots are committed straight from memory (no disk read). For
+        files on disk, unchanged size + mtime skips the read entirely;
+        otherwise the content hash decides (touched-but-identical files
+        are skipped too).
+
+        Returns:
+            filename -> (content, new fingerprint)
+        """
+        if not isinstance(files, dict):
+            files = dict.fromkeys(files)
+
+        changed = {}
+        for filename, snapshot in files.items():
+            known = self._fingerprints.get(filename)
+            if snapshot is not None:
+                data = snapshot() if callable(snapshot) else snapshot
+                # mtime -1: a later disk-based backup of this file always hashes
+                fingerprint = FileFingerprint(len(data), -1, FileFingerprint.digest_of(data), time.time_ns())
+                if not known or known.digest != fingerprint.digest:
+                    changed[filename] = (data, fingerprint)
+                continue
+
+            filepath = self.repo_path / filename
+            try:
+                stat = filepath.stat()
+            except OSError:
+                logger.warning(f"File not found: {filename}")
+                continue
+
+            known = self._fingerprints.get(filename)
+            if known and known.matches_stat(stat):
+                continue
+
+            data = filepath.read_bytes()
+            fingerprint = FileFingerprint(len(data), stat.st_mtime_ns, FileFingerprint.digest_of(data), time.time_ns())
+            if known and known.digest == fingerprint.digest:
+                self._fingerprints[filename] = fingerprint
+                continue
+            changed[filename] = (data, fingerprint)
+        return changed
+
+    def _sync_targets(self) -> Future:
+        """Future resolved with True once every target holds every commit so far"""
+        futures = [target.sync_future() for target in self.targets]
+        combined = Future()
+        if not futures:
+            combined.set_result(True)
+            return combined
+
+        remaining = [len(futures)]
+        results = []
+        guard = threading.Lock()
+
+        def done(future):
+            with guard:
+                results.append(future.result())
+                remaining[0] -= 1
+                finished = remaining[0] == 0
+            if finished:
+                combined.set_result(all(results))
+
+        for future in futures:
+            future.add_done_callback(done)
+        return combined
+
+    def flush_targets(self, timeout: float = 30.0) -> bool:
+        """Push / snapshot everything committed so far, waiting up to `timeout`"""
+        try:
+            return self._sync_targets().result(timeout)
+        except FutureTimeoutError:
+            return False
+
+    def push_state(self) -> Optional[PushState]:
+        """Current GitHub push status (ahead count, last success, last error, ...)"""
+        return self.remote_target.pusher.state() if self.remote_target else None
+
+    def target_states(self) -> Dict[str, dict]:
+        """Status of every backup target"""
+        return {target.name: target.state() for target in self.targets}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Backup pipeline status
+
+        Returns:
+            Dict with "state", "queue" (depth), "batches" / "latency" /
+            failure counters (see BackupMetrics), "targets" and "maintenance"
+        """
+        stats = self.metrics.snapshot()
+        stats["state"] = "failed" if self.init_error else "ready" if self.ready.is_set() else "starting"
+        stats["init_error"] = self.init_error
+        stats["queue"] = self.backup_queue.depth()
+        stats["writer"] = self.writer.name if self.writer else None
+        stats["targets"] = self.target_states()
+        stats["maintenance"] = self.maintenance.trends()
+        return stats
+
+    def export_metrics(self) -> Dict[str, float]:
+        """
+        Flat numeric metrics (Prometheus-style names) for exporting
+
+        Durations are in seconds, timestamps in epoch seconds; missing
+        values are left out.
+        """
+        stats = self.get_stats()
+        queue = stats["queue"]
+        values = {
+            "backup_up": 1.0 if stats["state"] == "ready" else 0.0,
+            "backup_pending_files": queue["pending_files"],
+            "backup_pending_bytes": queue["pending_bytes"],
+            "backup_oldest_pending_seconds": queue["oldest_pending_age"],
+            "backup_batches_total": stats["batches"],
+            "backup_commits_total": stats["commits"],
+            "backup_noop_batches_total": stats["noop_batches"],
+            "backup_files_committed_total": stats["files_committed"],
+            "backup_failures_total": stats["failures"],
+            "backup_consecutive_failures": stats["consecutive_failures"],
+            "backup_last_success_timestamp": stats["last_success"],
+            "backup_batch_files_avg": stats["batch_files"]["avg"],
+            "backup_batch_bytes_avg": stats["batch_bytes"]["avg"],
+        }
+        for phase, summary in stats["latency"].items():
+            for key in ("avg", "p95", "max"):
+                values[f"backup_{phase}_seconds_{key}"] = summary[key]
+        for name, state in stats["targets"].items():
+            values[f"backup_target_{name}_ahead"] = state.get("ahead")
+            values[f"backup_target_{name}_failures"] = state.get("failures")
+            values[f"backup_target_{name}_last_success_timestamp"] = state.get("last_success")
+        if stats["maintenance"]:
+            values["backup_repo_size_bytes"] = stats["maintenance"]["size_kb"] * 1024
+        return {name: float(value) for name, value in values.items() if value is not None}
+
+    def _record_push(self, seconds: float):
+        """GitHub push duration: batch threshold scaling and maintenance trends"""
+        self.backup_queue.record_push_latency(seconds)
+        self.maintenance.record_push(seconds)
+        self.metrics.record("push", seconds)
+
+    def _on_rewrite(self, old_head: str, new_head: str):
+        for target in self.targets:
+            try:
+                target.on_rewrite(old_head, new_head)
+            except Exception as e:
+                logger.error(f"Backup target {target.name} failed: {e}")
+
+    def _maybe_maintain(self):
+        """Run repository maintenance if it is due and the queue is idle"""
+        idle_for = time.time() - max(self.backup_queue.last_backup_time, self._worker_started)
+        if not self.maintenance.due(idle_for):
+            return
+        lock = GitLock(str(self.lock_file), purpose="maintenance")
+        if not lock.acquire(timeout=5):
+            return  # Another process is using the repository; retry when idle again
+        try:
+            self.maintenance.run()
+            self._maintenance_pending = False
+        finally:
+            lock.release()
+
+    def _idle_timeout(self) -> Optional[float]:
+        """How long the worker may sleep on an empty queue (None = until something is queued)"""
+        if not self._maintenance_pending:
+            return None  # Nothing committed since the last run: no maintenance to wake up for
+        next_run = self.maintenance.last_run + self.maintenance.interval - time.time()
+        return max(self.maintenance.idle_after, next_run)
+
     def _worker_loop(self):
         """Background worker that processes backup queue"""
         logger.info("Backup worker thread started")
+
+        if not self._initialize():
+            self.running = False
+            dropped, waiters = self.backup_queue.drain_batch()
+            if dropped:
+                logger.warning(f"Dropping {len(dropped)} queued file(s): backups unavailable")
+            self._resolve_waiters(waiters, False)
         
         while self.running:
             try:
-                # Check if backup is needed
-                if self.backup_queue.should_backup():
-                    files = self.backup_queue.get_pending_files()
-                    if files:
-                        logger.info(f"Processing backup queue: {len(files)} file(s)")
-                        self._perform_backup(files)
-                        self.backup_queue.mark_backup_done()
-                
-                # Sleep to avoid busy waiting
-                time.sleep(1)
+                # Blocks until a flush threshold is hit, the queue idles or shutdown
+                files, waiters = self.backup_queue.wait_for_batch(
+                    lambda: self.running, idle_timeout=self._idle_timeout()
+                )
+                success = True
+                if files:
+                    logger.info(f"Processing backup queue: {len(files)} file(s)")
+                    success = self._perform_backup(files)
+                    self.backup_queue.mark_backup_done()
+                elif not waiters and self.running:
+                    self._maybe_maintain()
+                self._resolve_waiters(waiters, success)
             
             except Exception as e:
                 logger.error(f"Error in worker loop: {e}")
@@ -339,6 +1082,39 @@ class GitBackupManager:
         
         logger.info("Backup worker thread stopped")
     
+    def _resolve_waiters(self, waiters: List[Tuple[Future, bool]], committed: bool):
+        """Complete futures of a finished batch (chained to the push when requested)"""
+        for future, push in waiters:
+            if push and committed:
+                self._sync_targets().add_done_callback(
+                    lambda done, future=future: _set_result(future, done.result())
+                )
+            else:
+                _set_result(future, committed)
+
+    def submit(self, files: Optional[BackupFiles] = None, push: bool = True) -> Future:
+        """
+        Queue files and flush immediately, without blocking
+
+        Args:
+            files: Filenames or filename -> snapshot (None = just flush the queue)
+            push: Resolve only after the commit has been pushed
+
+        Returns:
+            Future resolved with True once committed (and pushed), False on failure
+        """
+        future = Future()
+        if self.init_error:
+            future.set_result(False)
+            return future
+        if not self.running:
+            # Already shut down: nothing left to flush
+            future.set_result(not self.remote_target or self.remote_target.pusher.state().ahead == 0)
+            return future
+        self.queue_files(files or [])
+        self.backup_queue.add_waiter(future, push)
+        return future
+
     def _start_worker(self):
         """Start background worker thread"""
         if self.worker_thread is None or not self.worker_thread.is_alive():
@@ -347,50 +1123,112 @@ class GitBackupManager:
             self.worker_thread.start()
             logger.info("Background backup worker started")
     
-    def queue_backup(self, filename: str):
+    def queue_backup(self, filename: str, snapshot: Optional[Snapshot] = None):
         """
         Queue a file for backup (non-blocking)
         
         Args:
             filename: Name of file to backup (relative to repo_path)
+            snapshot: Serialized content captured at save time (bytes), or a
+                thread-safe callable returning it; None = read the file
         """
-        self.backup_queue.add_file(filename)
+        self.queue_files({filename: snapshot})
+
+    def queue_files(self, files: BackupFiles):
+        """
+        Queue several files as one unit: they always land in the same commit
+
+        Args:
+            files: Filenames (read from disk) or filename -> snapshot
+        """
+        if self.init_error:
+            return
+        if not isinstance(files, dict):
+            files = dict.fromkeys(files)
+        entries = {}
+        for filename, snapshot in files.items():
+            if isinstance(snapshot, bytes):
+                size = len(snapshot)
+            else:
+                try:
+                    size = (self.repo_path / filename).stat().st_size
+                except OSError:
+                    size = 0
+            entries[filename] = (size, snapshot)
+        if entries:
+            self.backup_queue.add_files(entries)
     
-    def backup_now(self, files: List[str]) -> bool:
+    def backup_now(self, files: BackupFiles, push_timeout: float = 60.0) -> bool:
         """
         Perform immediate backup (blocking)
+
+        The files are handed to the worker and committed there in queue
+        order, never on the caller's thread.
         
         Args:
-            files: List of filenames to backup
+            files: Filenames to backup, or filename -> snapshot
+            push_timeout: Max seconds to wait for the commit and push
             
         Returns:
-            True if successful
+            True if committed and pushed
         """
-        return self._perform_backup(files)
+        future = self.submit(files, push=True)
+        try:
+            return future.result(timeout=push_timeout)
+        except FutureTimeoutError:
+            logger.error(f"Immediate backup not pushed within {push_timeout}s")
+            return False
     
-    def shutdown(self):
-        """Shutdown backup manager gracefully"""
+    def shutdown(self, timeout: float = 60.0) -> bool:
+        """
+        Shutdown backup manager gracefully: one final commit, then push
+
+        Args:
+            timeout: Overall time budget in seconds
+
+        Returns:
+            True if everything committed has been pushed
+        """
         logger.info("Shutting down backup manager...")
+        deadline = time.monotonic() + timeout
+        remaining = lambda: max(0.0, deadline - time.monotonic())
+        # Let a pending initialization finish so buffered files are not lost
+        initialized = self.ready.wait(timeout=min(15, remaining())) and not self.init_error
         self.running = False
-        
-        # Process remaining queue
-        files = self.backup_queue.get_pending_files()
-        if files:
-            logger.info(f"Processing final backup: {len(files)} file(s)")
-            self._perform_backup(files)
+        self.backup_queue.wake()
         
         # Wait for worker thread
         if self.worker_thread and self.worker_thread.is_alive():
-            self.worker_thread.join(timeout=10)
+            self.worker_thread.join(timeout=min(10, remaining()))
+        
+        # Process remaining queue
+        files, waiters = self.backup_queue.drain_batch()
+        success = initialized
+        if files and initialized:
+            logger.info(f"Processing final backup: {len(files)} file(s)")
+            success = self._perform_backup(files)
+            if not success:
+                logger.error(f"Final backup failed, {len(files)} file(s) not committed")
+        self._resolve_waiters(waiters, success)
+
+        # One final push / snapshot for everything committed
+        pushed = self.flush_targets(timeout=remaining())
+        if not pushed:
+            logger.warning(f"Backup targets not up to date: {self.target_states()}")
+        for target in self.targets:
+            target.stop()
         
         logger.info("Backup manager shutdown complete")
+        return pushed
 
 
 # Global instance
 _backup_manager: Optional[GitBackupManager] = None
 
 
-def init_backup_manager(repo_path: str, remote_url: str, auth_token: str) -> GitBackupManager:
+def init_backup_manager(repo_path: str, remote_url: str, auth_token: str,
+                        writer_backend: str = "auto", targets: Optional[List[BackupTarget]] = None,
+                        maintenance: Optional[RepoMaintainer] = None, **queue_options) -> GitBackupManager:
     """
     Initialize global backup manager
     
@@ -398,6 +1236,10 @@ def init_backup_manager(repo_path: str, remote_url: str, auth_token: str) -> Git
         repo_path: Path to bot directory
         remote_url: GitHub repository URL
         auth_token: GitHub Personal Access Token
+        writer_backend: Commit writer ("auto", "pygit2", "python" or "cli")
+        targets: Extra backup targets (see backup_targets)
+        maintenance: Repository maintenance policy (see backup_maintenance)
+        **queue_options: max_delay / max_files / max_bytes batch thresholds
         
     Returns:
         GitBackupManager instance
@@ -405,7 +1247,8 @@ def init_backup_manager(repo_path: str, remote_url: str, auth_token: str) -> Git
     global _backup_manager
     
     if _backup_manager is None:
-        _backup_manager = GitBackupManager(repo_path, remote_url, auth_token)
+        _backup_manager = GitBackupManager(repo_path, remote_url, auth_token, writer_backend, targets=targets,
+                                           maintenance=maintenance, **queue_options)
         logger.info("Backup manager initialized")
     
     return _backup_manager
@@ -416,12 +1259,23 @@ def get_backup_manager() -> Optional[GitBackupManager]:
     return _backup_manager
 
 
-def backup_to_github(files: List[str], async_mode: bool = True):
+def get_backup_stats() -> Optional[Dict[str, Any]]:
+    """Status of the global backup manager (None if not initialized)"""
+    return _backup_manager.get_stats() if _backup_manager else None
+
+
+def export_backup_metrics() -> Dict[str, float]:
+    """Flat backup metrics for the bot's metrics surface (empty if not initialized)"""
+    return _backup_manager.export_metrics() if _backup_manager else {}
+
+
+def backup_to_github(files: BackupFiles, async_mode: bool = True):
     """
     Backup files to GitHub
     
     Args:
-        files: List of filenames to backup
+        files: List of filenames to backup (read from disk by the worker), or
+            filename -> snapshot (bytes / callable) to commit exactly that content
         async_mode: If True, queue for async backup. If False, backup immediately.
     """
     if _backup_manager is None:
@@ -429,15 +1283,91 @@ def backup_to_github(files: List[str], async_mode: bool = True):
         return
     
     if async_mode:
-        # Queue files for batched backup
-        for filename in files:
-            _backup_manager.queue_backup(filename)
+        # Queue files for batched backup (all of them in the same commit)
+        _backup_manager.queue_files(files)
     else:
         # Immediate backup
         _backup_manager.backup_now(files)
 
 
-def shutdown_backup():
-    """Shutdown backup manager gracefully"""
+def shutdown_backup(timeout: float = 60.0) -> bool:
+    """
+    Shutdown backup manager gracefully
+
+    Args:
+        timeout: Overall time budget in seconds
+
+    Returns:
+        True if everything committed has been pushed
+    """
     if _backup_manager is not None:
-        _backup_manager.shutdown()
+        return _backup_manager.shutdown(timeout)
+    return True
+
+
+# ---------------------------
+# ASYNCIO API
+# ---------------------------
+def _set_result(future: Future, result: bool):
+    """Resolve a batch future unless its async caller already gave up on it"""
+    try:
+        future.set_result(result)
+    except InvalidStateError:
+        pass  # Cancelled when an awaiting coroutine timed out
+
+
+async def backup_now_async(files: BackupFiles, push: bool = True, timeout: Optional[float] = None) -> bool:
+    """
+    Back up files right away without blocking the event loop
+
+    Args:
+        files: Filenames or filename -> snapshot
+        push: Wait for the push as well as the commit
+        timeout: Max seconds to wait (None = until the batch is done)
+
+    Returns:
+        True if committed (and pushed) in time
+    """
+    if _backup_manager is None:
+        logger.warning("Backup manager not initialized, skipping backup")
+        return False
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(_backup_manager.submit(files, push)), timeout)
+    except asyncio.TimeoutError:
+        logger.error(f"Immediate backup not {'pushed' if push else 'committed'} within {timeout}s")
+        return False
+
+
+async def flush_async(push: bool = True) -> bool:
+    """Commit everything queued so far (and push it) without blocking the event loop"""
+    if _backup_manager is None:
+        return True
+    return await asyncio.wrap_future(_backup_manager.submit(None, push))
+
+
+class BackupFlushContext:
+    """Async context manager that flushes queued backups when the block exits"""
+
+    def __init__(self, timeout: float = 60.0):
+        self.timeout = timeout
+
+    async def __aenter__(self) -> Optional[GitBackupManager]:
+        return _backup_manager
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        try:
+            if not await asyncio.wait_for(flush_async(), self.timeout):
+                logger.warning("Final backup flush failed")
+        except asyncio.TimeoutError:
+            logger.warning(f"Final backup flush timed out after {self.timeout}s")
+        return False
+
+
+def flush_on_exit(timeout: float = 60.0) -> BackupFlushContext:
+    """
+    `async with flush_on_exit(): await client.start(token)`
+
+    Args:
+        timeout: Max seconds to wait for the final commit + push
+    """
+    return BackupFlushContext(timeout)
@@ -0,0 +1,628 @@
+"""
+Backup Targets for VoraHub Bot
+Destinations that receive each local backup commit
+
+Key Features:
+- One interface for every destination, all fed by the BackupQueue batches
+- GitHub (or any git remote) with its own retrying push scheduler
+- Local bare repository: cheap, always reachable, works offline
+- Rotating snapshots as directories (hard-linked) or tar.gz archives
+- Compacted history is force-pushed with a lease on the last pushed commit
+"""
+
+import os
+import time
+import random
+import shutil
+import io
+import tarfile
+import logging
+import threading
+import subprocess
+from pathlib import Path
+from datetime import datetime
+from concurrent.futures import Future
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Runs a git command, returns (success, output) - see GitBackupManager._run_git_command
+GitRunner = Callable[..., Tuple[bool, str]]
+
+
+# ---------------------------
+# PUSH SCHEDULING
+# ---------------------------
+class PushState(NamedTuple):
+    """Snapshot of the push scheduler"""
+    ahead: int                      # Local commits not yet on the remote
+    pushing: bool
+    failures: int                   # Consecutive failed pushes
+    last_success: Optional[float]   # Epoch timestamps
+    last_error: Optional[str]
+    last_error_at: Optional[float]
+    last_duration: Optional[float]  # Seconds
+    next_attempt_in: float          # Seconds until the next (re)try, 0 = idle/now
+
+
+class PushScheduler:
+    """
+    Pushes the branch head on its own thread, independent of commits
+
+    Commits only call `request_push`; requests arriving while a push is
+    waiting or running collapse into one push of the newest head. Failed
+    pushes are retried with exponential backoff and jitter.
+    """
+
+    def __init__(self, push_fn: Callable[[], Tuple[bool, str]], name: str = "GitHub", settle_delay: float = 1.0,
+                 base_backoff: float = 5.0, max_backoff: float = 600.0, jitter: float = 0.25,
+                 on_push: Optional[Callable[[float], None]] = None):
+        """
+        Args:
+            push_fn: Pushes the current head, returns (success, output)
+            name: Destination name for logs
+            settle_delay: Wait after a request so back-to-back commits share a push
+            base_backoff: First retry delay in seconds
+            max_backoff: Retry delay cap in seconds
+            jitter: Random +/- fraction applied to retry delays
+            on_push: Called with the duration of every push attempt
+        """
+        self.push_fn = push_fn
+        self.name = name
+        self.settle_delay = settle_delay
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.on_push = on_push
+        self.cond = threading.Condition()
+        self.committed = 0      # Commits made locally
+        self.pushed = 0         # Commits known to be on the remote
+        self.pending = False
+        self.pushing = False
+        self.failures = 0
+        self.next_attempt = 0.0  # time.monotonic()
+        self.last_success: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.last_error_at: Optional[float] = None
+        self.last_duration: Optional[float] = None
+        self.running = False
+        self.thread: Optional[threading.Thread] = None
+        self._waiters: List[Tuple[int, Future]] = []  # (commit target, future)
+
+    def start(self, ahead: int = 0):
+        """Start the push thread (`ahead` = commits already waiting at startup)"""
+        with self.cond:
+            self.committed += ahead
+            self.pending = ahead > 0
+            self.running = True
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def request_push(self, new_commits: int = 1):
+        """Record local commits and schedule a push"""
+        with self.cond:
+            self.committed += new_commits
+            if not self.pending:
+                self.pending = True
+                self.next_attempt = max(self.next_attempt, time.monotonic() + self.settle_delay)
+            self.cond.notify_all()
+
+    def _backoff(self) -> float:
+        delay = min(self.max_backoff, self.base_backoff * 2 ** (self.failures - 1))
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _loop(self):
+        while True:
+            with self.cond:
+                while self.running and (not self.pending or time.monotonic() < self.next_attempt):
+                    timeout = self.next_attempt - time.monotonic() if self.pending else None
+                    self.cond.wait(timeout)
+                if not self.running:
+                    return
+                self.pending = False
+                self.pushing = True
+                target = self.committed
+
+            self._attempt(target)
+
+    def _attempt(self, target: int) -> bool:
+        """Run one push of everything committed up to `target`"""
+        started = time.monotonic()
+        try:
+            success, output = self.push_fn()
+        except Exception as e:
+            success, output = False, str(e)
+        duration = time.monotonic() - started
+        if self.on_push:
+            self.on_push(duration)
+
+        with self.cond:
+            self.pushing = False
+            self.last_duration = duration
+            if success:
+                self.pushed = max(self.pushed, target)
+                self.failures = 0
+                self.last_success = time.time()
+                logger.info(f"Pushed to {self.name} in {duration:.1f}s")
+            else:
+                self.failures += 1
+                self.last_error = output
+                self.last_error_at = time.time()
+                self.pending = True
+                self.next_attempt = time.monotonic() + self._backoff()
+                logger.error(f"Push to {self.name} failed ({self.failures}x), retrying in "
+                             f"{self.next_attempt - time.monotonic():.0f}s: {output}")
+            # Resolve futures: covered by this push, or all of them on failure
+            resolved = [(f, success) for t, f in self._waiters if not success or t <= self.pushed]
+            self._waiters = [(t, f) for t, f in self._waiters if success and t > self.pushed]
+            self.cond.notify_all()
+        for future, result in resolved:
+            future.set_result(result)
+        return success
+
+    def push_future(self) -> Future:
+        """
+        Push now (ignoring backoff) without blocking
+
+        Returns:
+            Future resolved with True once everything committed so far is
+            on the remote, or False if that push fails
+        """
+        future = Future()
+        with self.cond:
+            if self.committed == self.pushed:
+                future.set_result(True)
+                return future
+            if self.running:
+                self._waiters.append((self.committed, future))
+                self.pending = True
+                self.next_attempt = 0.0
+                self.cond.notify_all()
+                return future
+            target = self.committed
+        future.set_result(self._attempt(target))
+        return future
+
+    def flush(self, timeout: float = 30.0) -> bool:
+        """
+        Push now (ignoring backoff) and wait until the remote is up to date
+
+        Returns:
+            True if nothing is left to push
+        """
+        deadline = time.monotonic() + timeout
+        with self.cond:
+            if self.committed == self.pushed:
+                return True
+            if not self.running:
+                target = self.committed
+            else:
+                self.pending = True
+                self.next_attempt = 0.0
+                self.cond.notify_all()
+                while self.committed > self.pushed and time.monotonic() < deadline:
+                    # Stop waiting on failure instead of sitting through the backoff
+                    if self.pending and not self.pushing and self.next_attempt > time.monotonic():
+                        return False
+                    self.cond.wait(deadline - time.monotonic())
+                return self.committed == self.pushed
+        return self._attempt(target)
+
+    def stop(self):
+        """Stop the push thread (pending commits stay local)"""
+        with self.cond:
+            self.running = False
+            waiters, self._waiters = self._waiters, []
+            self.cond.notify_all()
+        for _, future in waiters:
+            future.set_result(False)
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=5)
+
+    def state(self) -> PushState:
+        with self.cond:
+            next_in = max(0.0, self.next_attempt - time.monotonic()) if self.pending else 0.0
+            return PushState(
+                ahead=self.committed - self.pushed,
+                pushing=self.pushing,
+                failures=self.failures,
+                last_success=self.last_success,
+                last_error=self.last_error,
+                last_error_at=self.last_error_at,
+                last_duration=self.last_duration,
+                next_attempt_in=next_in
+            )
+
+
+# ---------------------------
+# TARGETS
+# ---------------------------
+class BackupTarget:
+    """
+    Base class for backup destinations
+
+    The manager commits every batch locally, then calls `on_commit` on each
+    target from the worker thread - targets must return quickly and do any
+    slow work on their own schedule.
+    """
+
+    name = "target"
+
+    def start(self, run_git: GitRunner, repo_path: Path):
+        """Called once the local repository is ready"""
+
+    def on_commit(self, commit_sha: str, contents: Dict[str, bytes]):
+        """A new local commit holding `contents` (repo-relative path -> bytes)"""
+
+    def on_rewrite(self, old_head: str, new_head: str):
+        """Local history was compacted: the branch moved from `old_head` to `new_head`"""
+
+    def sync_future(self) -> Future:
+        """Future resolved with True once every commit so far is stored by this target"""
+        future = Future()
+        future.set_result(True)
+        return future
+
+    def state(self) -> dict:
+        return {}
+
+    def stop(self):
+        """Release threads/resources (pending work may stay local)"""
+
+
+class GitPushTarget(BackupTarget):
+    """Pushes the branch to a git remote with backoff (e.g. GitHub)"""
+
+    def __init__(self, name: str, remote: str, branch: str = "main", mask: Optional[str] = None,
+                 on_push: Optional[Callable[[float], None]] = None, **scheduler_options):
+        """
+        Args:
+            name: Target name (for logs / stats)
+            remote: Remote name ("origin") or URL / path
+            branch: Branch to push
+            mask: Secret to hide in error messages (auth token)
+            on_push: Called with the duration of every push attempt
+            **scheduler_options: PushScheduler settings (settle_delay, base_backoff, ...)
+        """
+        self.name = name
+        self.remote = remote
+        self.branch = branch
+        self.mask = mask
+        self.run_git: Optional[GitRunner] = None
+        self.rewritten = False  # Next push replaces the remote history
+        self.pusher = PushScheduler(self._push, name=name, on_push=on_push, **scheduler_options)
+
+    def _push(self) -> Tuple[bool, str]:
+        command = ["git", "push", self.remote, self.branch]
+        forced = self.rewritten
+        if forced:
+            # Only overwrite what this bot pushed last (never someone else's commits)
+            expected = self._remote_sha()
+            if expected:
+                command.insert(2, f"--force-with-lease=refs/heads/{self.branch}:{expected}")
+        success, output = self.run_git(command, timeout=60)
+        if success and forced:
+            self.rewritten = False
+        if self.mask:
+            output = output.replace(self.mask, "***")  # Push errors are exposed via state()
+        return success, output
+
+    def _remote_head(self) -> Optional[str]:
+        """Commit the remote is known to have (remote-tracking ref)"""
+        return f"{self.remote}/{self.branch}"
+
+    def _remote_sha(self) -> Optional[str]:
+        """Commit id of `_remote_head`"""
+        remote_head = self._remote_head()
+        if not remote_head:
+            return None
+        success, output = self.run_git(["git", "rev-parse", "--verify", "-q", remote_head])
+        return output if success else None
+
+    def _count_unpushed(self) -> int:
+        """Local commits missing on the remote at startup"""
+        remote_head = self._remote_head()
+        if remote_head:
+            success, output = self.run_git(["git", "rev-list", "--count", f"{remote_head}..{self.branch}"])
+            if success and output.isdigit():
+                return int(output)
+        # Remote branch unknown (first run): push whatever exists
+        success, _ = self.run_git(["git", "rev-parse", "--verify", "-q", self.branch])
+        return 1 if success else 0
+
+    def start(self, run_git: GitRunner, repo_path: Path):
+        self.run_git = run_git
+        # A compaction not pushed before the last restart leaves the remote diverged
+        expected = self._remote_sha()
+        if expected:
+            success, _ = run_git(["git", "merge-base", "--is-ancestor", expected, self.branch])
+            self.rewritten = not success
+        self.pusher.start(ahead=self._count_unpushed())
+
+    def on_commit(self, commit_sha: str, contents: Dict[str, bytes]):
+        self.pusher.request_push()
+
+    def on_rewrite(self, old_head: str, new_head: str):
+        self.rewritten = True
+        self.pusher.request_push()
+
+    def sync_future(self) -> Future:
+        return self.pusher.push_future()
+
+    def state(self) -> dict:
+        return self.pusher.state()._asdict()
+
+    def stop(self):
+        self.pusher.stop()
+
+
+class BareRepoTarget(GitPushTarget):
+    """Local bare repository: fast, offline-safe first copy of every commit"""
+
+    def __init__(self, path: str, branch: str = "main", name: str = "local"):
+        """
+        Args:
+            path: Bare repository directory (created if missing)
+            branch: Branch to push
+            name: Target name
+        """
+        path = str(Path(path).resolve())
+        super().__init__(name, path, branch, settle_delay=0.0, base_backoff=1.0, max_backoff=60.0)
+
+    def _remote_head(self) -> Optional[str]:
+        # No remote-tracking ref for a path remote: read the bare repo's ref directly
+        ref_path = Path(self.remote) / "refs" / "heads" / self.branch
+        if ref_path.exists():
+            return ref_path.read_text().strip() or None
+        packed = Path(self.remote) / "packed-refs"
+        if packed.exists():
+            for line in packed.read_text().splitlines():
+                if line.endswith(f" refs/heads/{self.branch}"):
+                    return line.split(" ", 1)[0]
+        return None
+
+    def _remote_sha(self) -> Optional[str]:
+        # Already a commit id (and may be pruned locally after a rewrite)
+        return self._remote_head()
+
+    def start(self, run_git: GitRunner, repo_path: Path):
+        if not (Path(self.remote) / "HEAD").exists():
+            os.makedirs(self.remote, exist_ok=True)
+            success, output = run_git(["git", "init", "--bare", "-q", self.remote])
+            if not success:
+                raise RuntimeError(f"Cannot create bare repository {self.remote}: {output}")
+            logger.info(f"Created local bare backup repository: {self.remote}")
+        super().start(run_git, repo_path)
+
+
+class SnapshotTarget(BackupTarget):
+    """
+    Rotating point-in-time copies of every backed-up file
+
+    Keeps the newest content of each file in memory (seeded from HEAD at
+    startup) and writes a full snapshot at most every `min_interval`
+    seconds (the next commit after the interval triggers it). Snapshots are
+    written on the target's own thread, never while the git lock is held.
+    Directory snapshots hard-link files that did not change since the
+    previous snapshot.
+    """
+
+    def __init__(self, root: str, keep: int = 24, min_interval: float = 3600.0,
+                 fmt: str = "dir", name: str = "snapshots"):
+        """
+        Args:
+            root: Directory holding the snapshots
+            keep: Number of snapshots to retain
+            min_interval: Minimum seconds between snapshots
+            fmt: "dir" (hard-linked directories) or "tar" (tar.gz archives)
+            name: Target name
+        """
+        if fmt not in ("dir", "tar"):
+            raise ValueError(f"Unknown snapshot format: {fmt}")
+        self.name = name
+        self.root = Path(root)
+        self.keep = keep
+        self.min_interval = min_interval
+        self.fmt = fmt
+        self.repo_path: Optional[Path] = None
+        self.files: Dict[str, bytes] = {}
+        self.changed_since: Dict[str, bytes] = {}  # Files changed since the last snapshot
+        self.dirty = False
+        self.last_snapshot = 0.0
+        self.last_path: Optional[str] = None
+        self.lock = threading.Lock()
+        self.cond = threading.Condition(self.lock)
+        self.running = False
+        self.thread: Optional[threading.Thread] = None
+        self._waiters: List[Future] = []  # Resolved by the next snapshot
+
+    def start(self, run_git: GitRunner, repo_path: Path):
+        self.repo_path = repo_path
+        self.root.mkdir(parents=True, exist_ok=True)
+        existing = self._existing()
+        if existing:
+            # Later snapshots must stay complete: start from the newest one
+            self.last_path = str(existing[-1])
+            self.files = self._read_snapshot(existing[-1])
+        # Commits since that snapshot (or all of them, without one) are in HEAD
+        for name, data in self._read_head(repo_path).items():
+            if self.files.get(name) != data:
+                self.files[name] = data
+                self.changed_since[name] = data
+                self.dirty = True
+        with self.cond:
+            self.running = True
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    @staticmethod
+    def _read_head(repo_path: Path) -> Dict[str, bytes]:
+        """Every file in HEAD (empty without commits)"""
+        def git(*args: str, data: Optional[bytes] = None) -> subprocess.CompletedProcess:
+            return subprocess.run(["git", *args], cwd=repo_path, input=data, capture_output=True, timeout=60)
+
+        try:
+            listing = git("ls-tree", "-r", "-z", "--full-tree", "HEAD")
+            if listing.returncode != 0:
+                return {}
+            blobs = []  # (path, sha)
+            for record in listing.stdout.split(b"\0"):
+                if not record:
+                    continue
+                meta, path = record.split(b"\t", 1)
+                _, obj_type, sha = meta.split(b" ")
+                if obj_type == b"blob":
+                    blobs.append((path.decode(), sha))
+            if not blobs:
+                return {}
+            output = git("cat-file", "--batch", data=b"".join(sha + b"\n" for _, sha in blobs)).stdout
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.warning(f"Cannot read HEAD for snapshots: {e}")
+            return {}
+
+        files = {}
+        pos = 0
+        for path, _ in blobs:
+            header_end = output.index(b"\n", pos)
+            size = int(output[pos:header_end].split(b" ")[2])
+            pos = header_end + 1
+            files[path] = output[pos:pos + size]
+            pos += size + 1
+        return files
+
+    @staticmethod
+    def _read_snapshot(path: Path) -> Dict[str, bytes]:
+        files = {}
+        if path.is_dir():
+            for file in path.rglob("*"):
+                if file.is_file():
+                    files[file.relative_to(path).as_posix()] = file.read_bytes()
+        else:
+            with tarfile.open(path, "r:gz") as tar:
+                for member in tar.getmembers():
+                    if member.isfile():
+                        files[member.name] = tar.extractfile(member).read()
+        return files
+
+    def _existing(self) -> List[Path]:
+        """Snapshots, oldest first"""
+        paths = [p for p in self.root.iterdir() if p.name.startswith("snap-") and not p.name.endswith(".tmp")]
+        return sorted(paths, key=self._snapshot_order)
+
+    @staticmethod
+    def _snapshot_order(path: Path) -> Tuple[str, int]:
+        """snap-<stamp>[-<n>][.tar.gz] -> (stamp, n): same-second snapshots in creation order"""
+        stem = path.name[len("snap-"):].replace(".tar.gz", "")
+        return stem[:15], int(stem[16:] or 0)
+
+    def on_commit(self, commit_sha: str, contents: Dict[str, bytes]):
+        with self.cond:
+            self.files.update(contents)
+            self.changed_since.update(contents)
+            self.dirty = True
+            self.cond.notify_all()
+
+    def sync_future(self) -> Future:
+        future = Future()
+        with self.cond:
+            if self.running:
+                self._waiters.append(future)
+                self.cond.notify_all()
+                return future
+        future.set_result(not self.dirty)
+        return future
+
+    def _due(self) -> bool:
+        return bool(self._waiters) or (self.dirty and time.time() - self.last_snapshot >= self.min_interval)
+
+    def _loop(self):
+        while True:
+            with self.cond:
+                while self.running and not self._due():
+                    self.cond.wait()
+                if not self.running:
+                    return
+                waiters, self._waiters = self._waiters, []
+                if not self.dirty:
+                    success = True
+                    files = None
+                else:
+                    files, changed = dict(self.files), self.changed_since
+                    self.changed_since = {}
+                    self.dirty = False
+
+            if files is not None:
+                try:
+                    self._write_snapshot(files, changed)
+                    success = True
+                except Exception as e:
+                    logger.error(f"Snapshot failed: {e}")
+                    success = False
+                    with self.cond:
+                        # Retry with the next commit after the interval (or the next sync)
+                        self.changed_since = {**changed, **self.changed_since}
+                        self.dirty = True
+                        self.last_snapshot = time.time()
+            for future in waiters:
+                future.set_result(success)
+
+    def _write_snapshot(self, files: Dict[str, bytes], changed: Dict[str, bytes]):
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        suffix = ".tar.gz" if self.fmt == "tar" else ""
+        # Same-second snapshots are numbered after the newest one (rotation may have freed lower names)
+        taken = [n for s, n in map(self._snapshot_order, self._existing()) if s == stamp]
+        path = self.root / (f"snap-{stamp}-{max(taken) + 1}{suffix}" if taken else f"snap-{stamp}{suffix}")
+        previous = Path(self.last_path) if self.last_path else None
+        if self.fmt == "tar":
+            tmp_path = path.with_name(path.name + ".tmp")
+            with tarfile.open(tmp_path, "w:gz") as tar:
+                for name, data in sorted(files.items()):
+                    info = tarfile.TarInfo(name)
+                    info.size = len(data)
+                    info.mtime = int(time.time())
+                    tar.addfile(info, io.BytesIO(data))
+            os.replace(tmp_path, path)
+        else:
+            tmp_path = path.with_name(path.name + ".tmp")
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            for name, data in files.items():
+                target = tmp_path / name
+                target.parent.mkdir(parents=True, exist_ok=True)
+                source = previous / name if previous and previous.is_dir() else None
+                if name not in changed and source is not None and source.exists():
+                    os.link(source, target)  # Unchanged: share the previous copy
+                else:
+                    target.write_bytes(data)
+            os.replace(tmp_path, path)
+
+        with self.cond:
+            self.last_path = str(path)
+            self.last_snapshot = time.time()
+        logger.info(f"Snapshot written: {path.name} ({len(files)} file(s))")
+
+        # Rotate
+        for old in self._existing()[:-self.keep]:
+            if old.is_dir():
+                shutil.rmtree(old, ignore_errors=True)
+            else:
+                old.unlink(missing_ok=True)
+
+    def stop(self):
+        """Stop the snapshot thread (a pending snapshot is written by the final sync)"""
+        with self.cond:
+            self.running = False
+            waiters, self._waiters = self._waiters, []
+            self.cond.notify_all()
+        for future in waiters:
+            future.set_result(False)
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=30)
+
+    def state(self) -> dict:
+        with self.lock:
+            return {
+                "snapshots": len(self._existing()) if self.root.exists() else 0,
+                "last_snapshot": self.last_snapshot or None,
+                "last_path": self.last_path,
+                "pending": self.dirty
+            }
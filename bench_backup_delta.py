@@ -0,0 +1,112 @@
+"""
+Push size benchmark: indent=4 JSON vs canonical layout for backed-up state
+
+Replays the same sequence of bot saves (sales rollups, claims, done tickets,
+cooldowns) into two scratch git repositories, one commit per save, and
+measures what `git push` would send for each commit (thin pack) and the
+packed repository size afterwards.
+
+Usage:
+    python bench_backup_delta.py [COMMITS] [HISTORY_DAYS]   (default: 200 90)
+"""
+
+import os
+import sys
+import json
+import random
+import shutil
+import statistics
+import subprocess
+import tempfile
+import datetime
+
+import canonical_json
+from sales_store import SalesRollups
+
+STAFF_COUNT = 20
+SALES_PER_DAY = 40
+
+
+def git(repo, *args, data=None):
+    return subprocess.run(["git", "-C", repo, *args], input=data, capture_output=True, check=True).stdout
+
+
+def legacy_dumps(data):
+    return json.dumps(data, indent=4).encode("utf-8")
+
+
+class State:
+    """Bot state files, mutated the way the bot mutates them"""
+
+    def __init__(self, history_days):
+        self.rng = random.Random(7)
+        self.rollups = SalesRollups()
+        self.claims = {}
+        self.done_tickets = []
+        self.cooldowns = {"policies": {"fixed": {}}}
+        self.now = datetime.datetime(2026, 1, 1)
+        self.channel = 10 ** 18
+        for _ in range(history_days * SALES_PER_DAY):
+            self.step()
+
+    def step(self):
+        """One claimed + finished premium ticket; returns the files it saved"""
+        self.now += datetime.timedelta(seconds=86400 // SALES_PER_DAY)
+        staff = 1000 + self.rng.randrange(STAFF_COUNT)
+        self.channel += self.rng.randrange(1, 10 ** 6)
+        self.claims[str(self.channel)] = str(staff)
+        if len(self.claims) > 30:
+            self.claims.pop(next(iter(self.claims)))
+        self.done_tickets.append(self.channel)
+        self.rollups.add(staff, 20000, self.now)
+        self.cooldowns["policies"]["fixed"][str(staff)] = [int(self.now.timestamp()), self.rng.randrange(1, 6)]
+        return {
+            "claims.json": self.claims,
+            "done_tickets.json": self.done_tickets,
+            "sales_rollups.json": self.rollups.to_json(),
+            "cooldowns.json": self.cooldowns,
+        }
+
+
+def run(commits, history_days, dumps, label):
+    repo = tempfile.mkdtemp(prefix="bench-delta-")
+    try:
+        git(repo, "init", "-q")
+        git(repo, "config", "user.name", "bench")
+        git(repo, "config", "user.email", "bench@localhost")
+        state = State(history_days)
+        sizes = []
+        for i in range(commits + 1):
+            for name, data in state.step().items():
+                with open(os.path.join(repo, name), "wb") as f:
+                    f.write(dumps(data))
+            git(repo, "add", "-A")
+            git(repo, "commit", "-q", "-m", f"Auto-backup {i}")
+            if i:
+                # Objects a push of this commit sends (deltas against the remote's copy)
+                pack = git(repo, "pack-objects", "--stdout", "--revs", "--thin", "-q", data=b"HEAD\n^HEAD~1\n")
+                sizes.append(len(pack))
+        file_bytes = sum(os.path.getsize(os.path.join(repo, name)) for name in os.listdir(repo) if name.endswith(".json"))
+        git(repo, "gc", "-q")
+        counts = dict(line.split(": ") for line in git(repo, "count-objects", "-v").decode().splitlines())
+        return label, sizes, file_bytes, int(counts["size-pack"])
+    finally:
+        shutil.rmtree(repo, ignore_errors=True)
+
+
+def main():
+    commits = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    history_days = int(sys.argv[2]) if len(sys.argv) > 2 else 90
+    print(f"{commits} commits after {history_days} days of history\n")
+    print(f"{'layout':<12} {'state (KB)':>11} {'push p50 (B)':>13} {'push mean (B)':>14} {'pushed (KB)':>12} {'repo (KB)':>10}")
+    results = [run(commits, history_days, legacy_dumps, "indent=4"),
+               run(commits, history_days, canonical_json.dumps, "canonical")]
+    for label, sizes, file_bytes, pack_kb in results:
+        print(f"{label:<12} {file_bytes / 1024:>11.1f} {statistics.median(sizes):>13.0f} "
+              f"{statistics.mean(sizes):>14.0f} {sum(sizes) / 1024:>12.1f} {pack_kb:>10}")
+    before, after = (sum(sizes) for _, sizes, _, _ in results)
+    print(f"\npush bytes: {after / before:.2f}x of indent=4")
+
+
+if __name__ == "__main__":
+    main()
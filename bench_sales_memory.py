@@ -0,0 +1,66 @@
+"""
+Memory benchmark: dict-based sales records vs compact SalesBook columns
+
+Usage:
+    python bench_sales_memory.py [N ...]   (default: 10000 100000 1000000)
+"""
+
+import sys
+import datetime
+import tracemalloc
+
+from sales_store import SalesBook
+
+STAFF_COUNT = 20
+
+
+def sample_sales(n):
+    """Yield (staff_id, amount, description, timestamp) like real premium sales"""
+    start = datetime.datetime(2026, 1, 1)
+    for i in range(n):
+        yield (
+            1000 + i % STAFF_COUNT,
+            20000,
+            f"Premium Sale - Ticket ticket-{i % 10000:04}",
+            start + datetime.timedelta(seconds=37 * i)
+        )
+
+
+def build_dicts(n):
+    """Old layout: {staff_key: {"total", "sales": [{"amount", "description", "timestamp"}]}}"""
+    data = {}
+    for staff_id, amount, description, ts in sample_sales(n):
+        entry = data.setdefault(str(staff_id), {"total": 0, "sales": []})
+        entry["sales"].append({"amount": amount, "description": description, "timestamp": ts.isoformat()})
+        entry["total"] += amount
+    return data
+
+
+def build_book(n):
+    book = SalesBook()
+    for staff_id, amount, description, ts in sample_sales(n):
+        book.add(staff_id, amount, description, ts)
+    return book
+
+
+def measure(builder, n):
+    """Bytes still allocated after building n sales"""
+    tracemalloc.start()
+    obj = builder(n)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del obj
+    return current
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    print(f"{'sales':>10} {'dicts (MB)':>12} {'columns (MB)':>13} {'ratio':>7}")
+    for n in sizes:
+        dict_bytes = measure(build_dicts, n)
+        book_bytes = measure(build_book, n)
+        print(f"{n:>10,} {dict_bytes / 1e6:>12.1f} {book_bytes / 1e6:>13.1f} {dict_bytes / book_bytes:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,10 @@
 import os
 import json
 import io
+import contextlib
+import time
+import asyncio
+import tempfile
 import aiohttp
 import datetime
 import discord as dc
@@ -10,28 +14,45 @@ from discord import app_commands
 from discord import ui, Interaction, ButtonStyle, Embed
 from PIL import Image, ImageDraw, ImageFont
 from typing import Literal
+from collections import Counter, deque
+from dotenv import load_dotenv
+from ticket_scheduler import AssignmentScheduler, Score
+from quota_engine import (
+    PolicyEngine, HybridPolicy, FixedWindowPolicy, SlidingWindowPolicy,
+    TokenBucketPolicy, UnlimitedPolicy
+)
+from sales_store import SalesBook, SalesLedger, SalesHistory, LeaderboardIndex, SalesRollups, period_key
+from shutdown import ShutdownCoordinator
+from exporter import SALES_FIELDS, TICKET_FIELDS, iter_ledger_rows, iter_event_log, write_export
+from state_restore import restore_state_files, restore_missing_tree
+import canonical_json
+from state_registry import StoreRegistry
+from tracing import traced, span, trace_discord_rest, tracer, SPAN_KINDS
+
+# .env settings are read while the module loads (AUTO_ASSIGN_MODE) and at startup
+load_dotenv()
 
 # Import backup manager for automatic GitHub backups
 try:
-    from backup_manager import init_backup_manager, backup_to_github
+    from backup_manager import (
+        init_backup_manager, backup_to_github, backup_now_async, flush_on_exit, shutdown_backup,
+        get_backup_stats, export_backup_metrics
+    )
+    from backup_targets import BareRepoTarget, SnapshotTarget
+    from backup_maintenance import RepoMaintainer
     BACKUP_ENABLED = True
 except ImportError:
     print("[WARNING] backup_manager.py not found, GitHub backups disabled")
     BACKUP_ENABLED = False
     backup_to_github = lambda *args, **kwargs: None  # No-op function
+    flush_on_exit = lambda *args, **kwargs: contextlib.nullcontext()
+    shutdown_backup = lambda *args, **kwargs: True
+    get_backup_stats = lambda: None
+    export_backup_metrics = lambda: {}
 
+    async def backup_now_async(*args, **kwargs):  # No-op coroutine
+        return False
 
-WARN_FILE = "warns.json"
-
-if os.path.exists(WARN_FILE):
-    with open(WARN_FILE, "r") as f:
-        warns = json.load(f)
-else:
-    warns = {}
-
-def save_warns():
-    with open(WARN_FILE, "w") as f:
-        json.dump(warns, f, indent=4)
 
 TICKET_PANEL_CHANNEL_ID = 1434769506798010480
 TICKET_LOG_CHANNEL_ID = 1452681875029102624
@@ -43,6 +64,9 @@ TICKET_CATEGORY_ID_MIDMAN = 1462046059143630984
 TICKET_PANEL_CHANNEL_ID_MIDMAN = 1462045328550133780
 MIDMAN_ROLE_ID = 1462063370189537280
 
+# Admin role for salary payment (also bypasses claim quota)
+ADMIN_ROLE_ID = 1458390940959117356
+
 TICKET_PANEL_CHANNEL_ID_X8 = 1461688996081176628
 TICKET_CATEGORY_ID_X8 = 1461709088118407412
 
@@ -56,7 +80,13 @@ TICKET_DATA_FILE = os.path.join(BASE_DIR, "tickets.json")
 MIDMAN_TICKET_FILE = os.path.join(BASE_DIR, "midmanticket.json")
 X8_TICKET_FILE = os.path.join(BASE_DIR, "x8ticket.json")
 CLAIMS_FILE = os.path.join(BASE_DIR, "claims.json")
+DONE_TICKETS_FILE = os.path.join(BASE_DIR, "done_tickets.json")
+COOLDOWN_FILE = os.path.join(BASE_DIR, "cooldowns.json")
+WARN_FILE = os.path.join(BASE_DIR, "warns.json")
 SALES_FILE = os.path.join(BASE_DIR, "sales.json")
+SALES_ROLLUP_FILE = os.path.join(BASE_DIR, "sales_rollups.json")
+SALES_LEDGER_DIR = os.path.join(BASE_DIR, "ledger")
+TICKET_EVENTS_FILE = os.path.join(BASE_DIR, "ticket_events.jsonl")
 
 # Initialize GitHub backup manager
 if BACKUP_ENABLED:
@@ -68,18 +98,54 @@ if BACKUP_ENABLED:
                 github_config = json.load(f)
                 repo_url = github_config.get("github", {}).get("repository_url", "")
                 auth_token = github_config.get("github", {}).get("auth_token", "")
+
+                # Optional local targets, e.g.
+                # "targets": {"bare_repo": "/srv/vorahub-backup.git",
+                #             "snapshots": {"path": "/srv/vorahub-snapshots", "keep": 24, "interval": 3600, "format": "dir"}}
+                target_config = github_config.get("targets", {})
+                backup_targets = []
+                if target_config.get("bare_repo"):
+                    backup_targets.append(BareRepoTarget(target_config["bare_repo"]))
+                if target_config.get("snapshots"):
+                    snap = target_config["snapshots"]
+                    backup_targets.append(SnapshotTarget(
+                        snap["path"],
+                        keep=snap.get("keep", 24),
+                        min_interval=snap.get("interval", 3600),
+                        fmt=snap.get("format", "dir")
+                    ))
+
+                # Optional repository maintenance, e.g.
+                # "maintenance": {"interval_hours": 6, "idle_seconds": 60,
+                #                 "squash_after_days": 14, "pack_budget_mb": 200}
+                maintenance_config = github_config.get("maintenance", {})
+                maintenance = RepoMaintainer(
+                    BASE_DIR,
+                    interval=maintenance_config.get("interval_hours", 6) * 3600,
+                    idle_after=maintenance_config.get("idle_seconds", 60),
+                    squash_after_days=maintenance_config.get("squash_after_days"),
+                    pack_budget_mb=maintenance_config.get("pack_budget_mb")
+                )
                 
-                if repo_url and auth_token:
-                    # Initialize with token (new system requires all 3 params)
+                if (repo_url and auth_token) or backup_targets:
+                    # GitHub remote is only added when configured (local targets work offline)
                     backup_manager = init_backup_manager(
                         repo_path=BASE_DIR,
-                        remote_url=repo_url,
-                        auth_token=auth_token
+                        remote_url=repo_url if auth_token else "",
+                        auth_token=auth_token,
+                        targets=backup_targets,
+                        maintenance=maintenance
                     )
-                    print("[BACKUP] ✓ GitHub backup system initialized")
+                    # Git setup continues in the background; saves are buffered until ready
+                    print("[BACKUP] ✓ GitHub backup system starting (background init)")
                     print("[BACKUP] ✓ Queue-based batching enabled")
                     print("[BACKUP] ✓ Thread-safe locking active")
-                    print(f"[BACKUP] ✓ Remote: {repo_url.replace(auth_token, '***')}")
+                    if repo_url and auth_token:
+                        print(f"[BACKUP] ✓ Remote: {repo_url.replace(auth_token, '***')}")
+                    for target in backup_targets:
+                        print(f"[BACKUP] ✓ Local target: {target.name}")
+                    if maintenance.squash_after_days:
+                        print(f"[BACKUP] ✓ History older than {maintenance.squash_after_days} days squashed into daily checkpoints")
                 else:
                     print("[BACKUP] ✗ Missing repository_url or auth_token in config")
                     print("[BACKUP] ✗ Please edit github_config.json")
@@ -93,6 +159,91 @@ if BACKUP_ENABLED:
         traceback.print_exc()
         BACKUP_ENABLED = False
 
+# ---------------------------
+# STATE STORES
+# ---------------------------
+# Every persisted structure registers here; saves write the file at once and
+# all stores changed together are backed up in one commit.
+def queue_state_backup(files):
+    # Auto-backup to GitHub (committed from memory, never a half-written file)
+    if BACKUP_ENABLED:
+        backup_to_github(files, async_mode=True)
+
+state_stores = StoreRegistry(BASE_DIR, backup_sink=queue_state_backup)
+state_stores.register("tickets", TICKET_DATA_FILE, lambda: {
+    "counter": ticket_count,
+    "tickets": {str(k): v for k, v in active_tickets.items()}
+})
+state_stores.register("midman_tickets", MIDMAN_TICKET_FILE, lambda: {
+    "counter": midman_ticket_count,
+    "tickets": {str(k): v for k, v in midman_tickets.items()}
+})
+state_stores.register("x8_tickets", X8_TICKET_FILE, lambda: {
+    "counter": x8_ticket_count,
+    "tickets": {str(k): v for k, v in x8_tickets.items()}
+})
+state_stores.register("claims", CLAIMS_FILE, lambda: {str(k): str(v) for k, v in ticket_claims.items()})
+state_stores.register("done_tickets", DONE_TICKETS_FILE, lambda: done_tickets, json_type=list)
+state_stores.register("cooldowns", COOLDOWN_FILE, lambda: claim_quota.to_json())
+# Cache derived from the ledger: rebuilt from it at startup, never restored or backed up
+state_stores.register("sales_rollups", SALES_ROLLUP_FILE, lambda: sales_rollups.to_json(), backup=False, json_type=None)
+state_stores.register("warns", WARN_FILE, lambda: warns)
+state_stores.register_files("ledger", SALES_LEDGER_DIR)
+state_stores.register_files("ticket_events", TICKET_EVENTS_FILE)
+
+# ---------------------------
+# STARTUP STATE CHECK
+# ---------------------------
+# Missing or corrupt state files are restored from local backups before the
+# loaders below would replace them with empty defaults.
+def restore_state():
+    git_dirs = [os.path.join(BASE_DIR, ".git")]
+    try:
+        with open(os.path.join(BASE_DIR, "github_config.json"), "r") as f:
+            bare_repo = json.load(f).get("targets", {}).get("bare_repo")
+        if bare_repo:
+            git_dirs.append(bare_repo)
+    except (OSError, ValueError):
+        pass
+
+    started = time.perf_counter()
+    results = restore_state_files(BASE_DIR, state_stores.json_files(), git_dirs)
+    ledger_results = restore_missing_tree(BASE_DIR, os.path.relpath(SALES_LEDGER_DIR, BASE_DIR), git_dirs)
+    results += ledger_results
+
+    for result in results:
+        if result.restored_from:
+            print(f"[RESTORE] ✓ {result.path} ({result.problem}) <- {result.restored_from} in {result.seconds * 1000:.0f}ms")
+        else:
+            print(f"[RESTORE] ✗ {result.path} is {result.problem}, no valid backup found")
+    if results:
+        print(f"[RESTORE] State check finished in {time.perf_counter() - started:.2f}s")
+    return any(result.restored_from for result in ledger_results)
+
+ledger_restored = False  # Derived sales caches are rebuilt if the ledger came from a backup
+try:
+    ledger_restored = restore_state()
+except Exception as e:
+    print(f"[RESTORE] ✗ State check failed: {e}")
+
+# ---------------------------
+# LOAD / SAVE WARNS
+# ---------------------------
+# Older versions wrote warns.json to the working directory
+LEGACY_WARN_FILE = os.path.abspath("warns.json")
+if not os.path.exists(WARN_FILE) and os.path.exists(LEGACY_WARN_FILE):
+    os.replace(LEGACY_WARN_FILE, WARN_FILE)
+    print(f"[WARNS] ✓ Moved {LEGACY_WARN_FILE} to {WARN_FILE}")
+
+if os.path.exists(WARN_FILE):
+    with open(WARN_FILE, "r") as f:
+        warns = json.load(f)
+else:
+    warns = {}
+
+def save_warns():
+    state_stores.save("warns")
+
 # ---------------------------
 # LOAD / SAVE TICKETS
 # ---------------------------
@@ -118,11 +269,7 @@ else:
             ticket_count = 0
 
 def save_tickets():
-    with open(TICKET_DATA_FILE, "w") as f:
-        json.dump({
-            "counter": ticket_count,
-            "tickets": {str(k): v for k, v in active_tickets.items()}
-        }, f, indent=4)
+    state_stores.save("tickets")
 
 # ---------------------------
 # LOAD / SAVE MIDMAN TICKETS
@@ -147,11 +294,7 @@ else:
             midman_ticket_count = 0
 
 def save_midman_tickets():
-    with open(MIDMAN_TICKET_FILE, "w") as f:
-        json.dump({
-            "counter": midman_ticket_count,
-            "tickets": {str(k): v for k, v in midman_tickets.items()}
-        }, f, indent=4)
+    state_stores.save("midman_tickets")
 
 def add_midman_ticket(user_id, channel_id):
     midman_tickets[user_id] = channel_id
@@ -191,11 +334,7 @@ else:
             x8_ticket_count = 0
 
 def save_x8_tickets():
-    with open(X8_TICKET_FILE, "w") as f:
-        json.dump({
-            "counter": x8_ticket_count,
-            "tickets": {str(k): v for k, v in x8_tickets.items()}
-        }, f, indent=4)
+    state_stores.save("x8_tickets")
 
 def add_x8_ticket(user_id, channel_id):
     x8_tickets[user_id] = channel_id
@@ -227,21 +366,28 @@ else:
         except json.JSONDecodeError:
             ticket_claims = {}
 
+# Open claims per staff (kept in sync by add_claim/remove_claim)
+staff_open_claims = Counter(ticket_claims.values())
+
 def save_claims():
-    with open(CLAIMS_FILE, "w") as f:
-        json.dump({str(k): str(v) for k, v in ticket_claims.items()}, f, indent=4)
-    # Auto-backup to GitHub
-    if BACKUP_ENABLED:
-        backup_to_github(["claims.json"], async_mode=True)
+    state_stores.save("claims")
 
 def add_claim(channel_id, staff_id):
+    previous = ticket_claims.get(channel_id)
+    if previous is not None:
+        staff_open_claims[previous] -= 1
+        touch_assignee(previous)
     ticket_claims[channel_id] = staff_id
+    staff_open_claims[staff_id] += 1
     save_claims()
+    touch_assignee(staff_id)
 
 def remove_claim(channel_id):
     if channel_id in ticket_claims:
-        del ticket_claims[channel_id]
+        staff_id = ticket_claims.pop(channel_id)
+        staff_open_claims[staff_id] -= 1
         save_claims()
+        touch_assignee(staff_id)
 
 def get_claim(channel_id):
     return ticket_claims.get(channel_id)
@@ -249,8 +395,6 @@ def get_claim(channel_id):
 # ---------------------------
 # LOAD / SAVE DONE TICKETS (to prevent double-done)
 # ---------------------------
-DONE_TICKETS_FILE = os.path.join(BASE_DIR, "done_tickets.json")
-
 if not os.path.exists(DONE_TICKETS_FILE):
     with open(DONE_TICKETS_FILE, "w") as f:
         json.dump([], f, indent=4)
@@ -263,11 +407,7 @@ else:
             done_tickets = []
 
 def save_done_tickets():
-    with open(DONE_TICKETS_FILE, "w") as f:
-        json.dump(done_tickets, f, indent=4)
-    # Auto-backup to GitHub
-    if BACKUP_ENABLED:
-        backup_to_github(["done_tickets.json"], async_mode=True)
+    state_stores.save("done_tickets")
 
 def mark_ticket_done(channel_id):
     """Mark a ticket as done"""
@@ -286,201 +426,192 @@ def remove_done_ticket(channel_id):
         save_done_tickets()
 
 # ---------------------------
-# LOAD / SAVE COOLDOWNS (Hybrid: 20min reset OR 2hour cooldown)
+# LOAD / SAVE COOLDOWNS (Quota policies per role / ticket kind)
 # ---------------------------
-COOLDOWN_FILE = os.path.join(BASE_DIR, "cooldowns.json")
 COOLDOWN_LIMIT = 5  # Max tickets
 RESET_MINUTES = 20  # Reset time if not exhausted
 COOLDOWN_HOURS = 2  # Cooldown time if exhausted
 
+QUOTA_POLICIES = [
+    # Default hybrid: 5 claims per 20 min cycle, else 2 hour cooldown
+    HybridPolicy("hybrid", limit=COOLDOWN_LIMIT, reset_seconds=RESET_MINUTES * 60, cooldown_seconds=COOLDOWN_HOURS * 3600),
+    FixedWindowPolicy("fixed", limit=COOLDOWN_LIMIT, window_seconds=RESET_MINUTES * 60),
+    SlidingWindowPolicy("sliding", limit=COOLDOWN_LIMIT, window_seconds=60 * 60),
+    TokenBucketPolicy("bucket", capacity=COOLDOWN_LIMIT, refill_seconds=12 * 60),
+    UnlimitedPolicy("unlimited"),
+]
+
+# (role, ticket kind) -> policy name, None = any kind. Ticket kinds: "premium", "x8", "midman"
+QUOTA_RULES = {
+    ("admin", None): "unlimited",
+    ("staff", None): "hybrid",
+    ("helper", None): "hybrid",
+    ("midman", None): "unlimited",
+}
+QUOTA_ROLE_ORDER = ["admin", "staff", "helper", "midman"]  # First matching role wins
+QUOTA_ROLE_KEYS = {
+    ADMIN_ROLE_ID: "admin",
+    STAFF_ROLE_ID: "staff",
+    HELPER_ROLE_ID: "helper",
+    MIDMAN_ROLE_ID: "midman",
+}
+
+claim_quota = PolicyEngine(QUOTA_POLICIES, QUOTA_RULES, QUOTA_ROLE_ORDER, default="hybrid")
+
 if not os.path.exists(COOLDOWN_FILE):
     with open(COOLDOWN_FILE, "w") as f:
         json.dump({}, f, indent=4)
-    staff_cooldowns = {}
 else:
     with open(COOLDOWN_FILE, "r") as f:
         try:
-            staff_cooldowns = json.load(f)
+            claim_quota.load(json.load(f))
         except json.JSONDecodeError:
-            staff_cooldowns = {}
+            pass
 
 def save_cooldowns():
-    with open(COOLDOWN_FILE, "w") as f:
-        json.dump(staff_cooldowns, f, indent=4)
-    # Auto-backup to GitHub
-    if BACKUP_ENABLED:
-        backup_to_github(["cooldowns.json"], async_mode=True)
+    state_stores.save("cooldowns")
 
-def add_claim_to_cooldown(staff_id):
-    """Add a claim to staff's cooldown tracker"""
-    staff_key = str(staff_id)
-    now = datetime.datetime.now()
-    
-    if staff_key not in staff_cooldowns:
-        staff_cooldowns[staff_key] = {
-            "cycle_start": now.isoformat(),
-            "claims_in_cycle": 0,
-            "exhausted_cooldown_until": None
-        }
-    
-    # Check if we're in exhausted cooldown
-    exhausted_until_str = staff_cooldowns[staff_key].get("exhausted_cooldown_until")
-    if exhausted_until_str:
-        exhausted_until = datetime.datetime.fromisoformat(exhausted_until_str)
-        if now >= exhausted_until:
-            # Exhausted cooldown expired, start fresh cycle
-            staff_cooldowns[staff_key] = {
-                "cycle_start": now.isoformat(),
-                "claims_in_cycle": 1,
-                "exhausted_cooldown_until": None
-            }
-            save_cooldowns()
-            return
-    
-    # Check if normal cycle has expired (20 minutes)
-    cycle_start = datetime.datetime.fromisoformat(staff_cooldowns[staff_key]["cycle_start"])
-    time_since_start = now - cycle_start
-    
-    if time_since_start >= datetime.timedelta(minutes=RESET_MINUTES):
-        # Cycle expired, reset to fresh
-        staff_cooldowns[staff_key] = {
-            "cycle_start": now.isoformat(),
-            "claims_in_cycle": 1,
-            "exhausted_cooldown_until": None
-        }
-    else:
-        # Add to current cycle
-        staff_cooldowns[staff_key]["claims_in_cycle"] += 1
-        
-        # Check if exhausted (hit limit)
-        if staff_cooldowns[staff_key]["claims_in_cycle"] >= COOLDOWN_LIMIT:
-            # Set exhausted cooldown (2 hours from now)
-            exhausted_until = now + datetime.timedelta(hours=COOLDOWN_HOURS)
-            staff_cooldowns[staff_key]["exhausted_cooldown_until"] = exhausted_until.isoformat()
-    
-    save_cooldowns()
+def quota_roles(member):
+    """Map a member's Discord roles to quota role keys"""
+    role_ids = {role.id for role in member.roles}
+    return tuple(key for role_id, key in QUOTA_ROLE_KEYS.items() if role_id in role_ids)
 
-def is_staff_on_cooldown(staff_id):
-    """Check if staff is on cooldown"""
-    staff_key = str(staff_id)
-    now = datetime.datetime.now()
-    
-    if staff_key not in staff_cooldowns:
-        return False, None, 0
-    
-    # Check exhausted cooldown first
-    exhausted_until_str = staff_cooldowns[staff_key].get("exhausted_cooldown_until")
-    if exhausted_until_str:
-        exhausted_until = datetime.datetime.fromisoformat(exhausted_until_str)
-        if now < exhausted_until:
-            # Still in exhausted cooldown
-            time_left = exhausted_until - now
-            return True, time_left, COOLDOWN_LIMIT
-        else:
-            # Exhausted cooldown expired, reset
-            staff_cooldowns[staff_key] = {
-                "cycle_start": now.isoformat(),
-                "claims_in_cycle": 0,
-                "exhausted_cooldown_until": None
-            }
-            save_cooldowns()
-            return False, None, 0
-    
-    # Check normal cycle
-    cycle_start = datetime.datetime.fromisoformat(staff_cooldowns[staff_key]["cycle_start"])
-    time_since_start = now - cycle_start
-    
-    if time_since_start >= datetime.timedelta(minutes=RESET_MINUTES):
-        # Cycle expired, reset
-        staff_cooldowns[staff_key] = {
-            "cycle_start": now.isoformat(),
-            "claims_in_cycle": 0,
-            "exhausted_cooldown_until": None
-        }
+def add_claim_to_cooldown(member, kind="premium"):
+    """Add a claim to staff's quota tracker (the only write path)"""
+    status = claim_quota.record_claim(member.id, quota_roles(member), kind)
+    if status.limit is not None:
         save_cooldowns()
-        return False, None, 0
-    
-    current_claims = staff_cooldowns[staff_key]["claims_in_cycle"]
-    return False, None, current_claims
+        touch_assignee(member.id)
+    return status
 
-def get_claim_count(staff_id):
-    """Get current claim count for staff"""
-    staff_key = str(staff_id)
-    now = datetime.datetime.now()
-    
-    if staff_key not in staff_cooldowns:
-        return 0
-    
-    # Check if in exhausted cooldown
-    exhausted_until_str = staff_cooldowns[staff_key].get("exhausted_cooldown_until")
-    if exhausted_until_str:
-        exhausted_until = datetime.datetime.fromisoformat(exhausted_until_str)
-        if now < exhausted_until:
-            return COOLDOWN_LIMIT  # Show as full
-    
-    # Check if cycle expired
-    cycle_start = datetime.datetime.fromisoformat(staff_cooldowns[staff_key]["cycle_start"])
-    time_since_start = now - cycle_start
-    
-    if time_since_start >= datetime.timedelta(minutes=RESET_MINUTES):
-        # Cycle expired, reset
-        staff_cooldowns[staff_key] = {
-            "cycle_start": now.isoformat(),
-            "claims_in_cycle": 0,
-            "exhausted_cooldown_until": None
-        }
-        save_cooldowns()
-        return 0
-    
-    return staff_cooldowns[staff_key]["claims_in_cycle"]
+def get_quota_status(member, kind="premium"):
+    """Check if staff can claim right now (read-only)"""
+    return claim_quota.status(member.id, quota_roles(member), kind)
+
+def format_duration(seconds):
+    hours = int(seconds // 3600)
+    minutes = int((seconds % 3600) // 60)
+    return f"{hours} jam {minutes} menit"
 
 # ---------------------------
 # LOAD / SAVE SALES
 # ---------------------------
-if not os.path.exists(SALES_FILE):
-    with open(SALES_FILE, "w") as f:
-        json.dump({}, f, indent=4)
-    sales_data = {}
-else:
+# Append-only ledger: ledger/<staff_id>/open.jsonl + paid-*.jsonl.gz archives
+sales_ledger = SalesLedger(SALES_LEDGER_DIR)
+
+if not sales_ledger.exists() and os.path.exists(SALES_FILE):
+    # One-time migration from the old sales.json layout
     with open(SALES_FILE, "r") as f:
         try:
-            sales_data = json.load(f)
+            sales_ledger.import_legacy(json.load(f))
+            print("[SALES] ✓ Migrated sales.json into the ledger")
         except json.JSONDecodeError:
-            sales_data = {}
+            print("[SALES] ✗ sales.json is corrupt, starting with an empty ledger")
 
-def save_sales():
-    with open(SALES_FILE, "w") as f:
-        json.dump(sales_data, f, indent=4)
-    # Auto-backup to GitHub
-    if BACKUP_ENABLED:
-        backup_to_github(["sales.json"], async_mode=True)
+# Unpaid balances, derived from the open ledger segments (compact columns)
+sales_data = SalesBook()
+sales_ledger.load_open(sales_data)
+
+# Leaderboard kept up to date by add_sale/reset_sales
+sales_leaderboard = LeaderboardIndex()
+sales_leaderboard.rebuild(sales_data)
+
+# Day/week/month rollups kept up to date by add_sale (survive reset_sales)
+sales_rollups = SalesRollups()
+
+def save_sales_rollups():
+    # Debounced: sales recorded after the last write are replayed from the ledger on start
+    state_stores.save_later("sales_rollups")
+
+def load_sales_rollups():
+    """Load the rollup cache and replay ledger sales it has not counted yet"""
+    if not ledger_restored:
+        try:
+            with open(SALES_ROLLUP_FILE, "r") as f:
+                loaded = sales_rollups.load(json.load(f))
+        except (OSError, ValueError, AttributeError):
+            loaded = False
+        if loaded:
+            replayed = sales_rollups.catch_up(sales_ledger)
+            if replayed:
+                print(f"[SALES] ✓ Rollups caught up with {replayed} ledger sales")
+                state_stores.save("sales_rollups")
+            return
+
+    # Missing, corrupt, older format or ledger restored: rebuild from the raw ledger (paid + unpaid)
+    sales_rollups.rebuild(sales_ledger.iter_sales())
+    state_stores.save("sales_rollups")
+    print("[SALES] ✓ Rollups rebuilt from the ledger")
+
+load_sales_rollups()
+
+def ledger_backup_names(paths):
+    return [os.path.relpath(p, BASE_DIR) for p in paths]
+
+def backup_ledger_files(*paths):
+    state_stores.touch("ledger", *paths)
 
 def add_sale(staff_id, amount, description="Premium Sale"):
-    staff_key = str(staff_id)
-    if staff_key not in sales_data:
-        sales_data[staff_key] = {"total": 0, "sales": []}
-    
-    sale_entry = {
-        "amount": amount,
-        "description": description,
-        "timestamp": datetime.datetime.now().isoformat()
-    }
-    sales_data[staff_key]["sales"].append(sale_entry)
-    sales_data[staff_key]["total"] += amount
-    save_sales()
+    staff_id = int(staff_id)
+    now = datetime.datetime.now()
+    # Ledger first: everything below is derived from it
+    with span("state_io", "ledger"):
+        sales_ledger.append_sale(staff_id, {  # O(1) append
+            "amount": amount,
+            "description": description,
+            "timestamp": now.isoformat()
+        })
+    sales_data.add(staff_id, amount, description, now)
+    sales_leaderboard.add(staff_id, amount)
+    sales_rollups.add(staff_id, amount, now)
+    save_sales_rollups()
+    backup_ledger_files(sales_ledger.open_path(staff_id))
+    touch_assignee(staff_id)
 
 def get_sales(staff_id):
-    staff_key = str(staff_id)
-    return sales_data.get(staff_key, {"total": 0, "sales": []})
-
-def reset_sales(staff_id):
-    """Reset sales data for a staff member after salary payment"""
-    staff_key = str(staff_id)
-    if staff_key in sales_data:
-        sales_data[staff_key] = {"total": 0, "sales": []}
-        save_sales()
-        return True
-    return False
+    """Unpaid sales for a staff member (.total, len(), .recent(n))"""
+    return sales_data.get(int(staff_id))
+
+def reset_sales(staff_id, paid_by=None):
+    """
+    Close the staff member's unpaid period after salary payment (history is archived)
+
+    Returns the ledger files written (empty if there was nothing unpaid)
+    """
+    staff_id = int(staff_id)
+    if staff_id in sales_data:
+        open_sales = sales_data.get(staff_id)
+        with span("state_io", "ledger"):
+            archive_path = sales_ledger.close_period(staff_id, {
+                "amount": calculate_salary(open_sales.total),
+                "sales_total": open_sales.total,
+                "count": len(open_sales),
+                "paid_by": paid_by,
+                "timestamp": datetime.datetime.now().isoformat()
+            })
+        sales_data.reset(staff_id)
+        sales_leaderboard.reset(staff_id)
+        paths = [archive_path, sales_ledger.open_path(staff_id)]
+        backup_ledger_files(*paths)
+        touch_assignee(staff_id)
+        return paths
+    return []
+
+# Period choices for /sales and /mygaji -> (resolution, offset)
+SALES_PERIODS = {
+    "Hari Ini": ("day", 0),
+    "Kemarin": ("day", -1),
+    "Minggu Ini": ("week", 0),
+    "Minggu Lalu": ("week", -1),
+    "Bulan Ini": ("month", 0),
+    "Bulan Lalu": ("month", -1),
+}
+SalesPeriod = Literal["Hari Ini", "Kemarin", "Minggu Ini", "Minggu Lalu", "Bulan Ini", "Bulan Lalu"]
+
+def get_period_sales(period, staff_id=None):
+    """Get (total, count) for a period from the rollups"""
+    resolution, offset = SALES_PERIODS[period]
+    return sales_rollups.totals(resolution, period_key(resolution, datetime.datetime.now(), offset), staff_id)
 
 def calculate_salary(total_sales):
     """Calculate salary with cap"""
@@ -493,16 +624,13 @@ def is_salary_maxed(staff_id):
     """Check if staff has reached salary cap"""
     SALARY_CAP = 30000
     staff_sales = get_sales(staff_id)
-    salary = calculate_salary(staff_sales["total"])
+    salary = calculate_salary(staff_sales.total)
     return salary >= SALARY_CAP
 
 # Salary cap constant
 SALARY_CAP = 30000
 COMMISSION_RATE = 0.10
 
-# Admin role for salary payment
-ADMIN_ROLE_ID = 1458390940959117356
-
 def add_ticket(user_id, channel_id):
     active_tickets[user_id] = channel_id
     save_tickets()
@@ -518,6 +646,107 @@ def increment_ticket_counter():
     save_tickets()
     return ticket_count
 
+# ---------------------------
+# TICKET EVENT LOG (append-only, for /export)
+# ---------------------------
+def log_ticket_event(event, channel, kind, user_id=None, staff_id=None, response_seconds=None):
+    """Append a ticket lifecycle event (opened / claimed / done / closed)"""
+    entry = {
+        "timestamp": datetime.datetime.now().isoformat(),
+        "event": event,
+        "kind": kind,
+        "channel_id": channel.id,
+        "channel_name": channel.name,
+        "user_id": user_id,
+        "staff_id": staff_id
+    }
+    if response_seconds is not None:
+        entry["response_seconds"] = round(response_seconds, 1)  # Opened -> first claim
+    with span("state_io", "ticket_events"), open(TICKET_EVENTS_FILE, "a", encoding="utf-8") as f:
+        f.write(canonical_json.dumps_line(entry) + "\n")
+    state_stores.touch("ticket_events")
+
+# ---------------------------
+# AUTO-ASSIGNMENT (premium tickets)
+# ---------------------------
+# "off" = staff claim manually, "ping" = mention best staff, "claim" = pre-claim for best staff
+AUTO_ASSIGN_MODE = os.getenv("AUTO_ASSIGN_MODE", "off").strip().lower()
+if AUTO_ASSIGN_MODE not in ("off", "ping", "claim"):
+    print(f"[ASSIGN] ✗ Unknown AUTO_ASSIGN_MODE '{AUTO_ASSIGN_MODE}', using 'off'")
+    AUTO_ASSIGN_MODE = "off"
+
+# channel_id -> staff_id for tickets assigned in "ping" mode but not claimed yet
+pending_assignments = {}
+staff_pending_assignments = Counter()
+# channel_id -> time.monotonic() when a premium ticket was opened (time-to-claim stats)
+ticket_opened_at = {}
+# Recent opened -> first claim times in seconds (also stored in the ticket event log)
+first_response_times = deque(maxlen=200)
+
+def _assignment_score(slot):
+    """Score a staff member for auto-assignment (smaller tuple = better candidate)"""
+    staff_sales = get_sales(slot.staff_id)
+    headroom = SALARY_CAP - calculate_salary(staff_sales.total)
+
+    if headroom <= 0 and not slot.bypass:
+        return None  # Salary maxed, eligible again after /gajisudahbayar
+
+    status = claim_quota.status(slot.staff_id, slot.roles, "premium")
+    if not status.allowed:
+        return time.time() + status.retry_after
+    remaining = COOLDOWN_LIMIT if status.limit is None else status.limit - status.used
+
+    load = staff_open_claims[slot.staff_id] + staff_pending_assignments[slot.staff_id]
+    key = (-remaining, load, -headroom, 0 if slot.online else 1, slot.staff_id)
+    if status.resets_in:
+        return Score(key, time.time() + status.resets_in)  # Re-scored when the quota cycle rolls over
+    return key
+
+assignment_scheduler = AssignmentScheduler(_assignment_score)
+
+def touch_assignee(staff_id):
+    """Re-score a staff member in the auto-assign queue after their state changed"""
+    if AUTO_ASSIGN_MODE != "off":
+        assignment_scheduler.touch(staff_id)
+
+def track_assignee(member):
+    """Add or remove a member from the auto-assign roster based on their roles"""
+    role_ids = {role.id for role in member.roles}
+    if member.bot or not role_ids & {STAFF_ROLE_ID, HELPER_ROLE_ID}:
+        assignment_scheduler.untrack(member.id)
+        return
+    assignment_scheduler.track(
+        member.id,
+        online=member.status != dc.Status.offline,
+        bypass=ADMIN_ROLE_ID in role_ids,
+        roles=quota_roles(member)
+    )
+
+def sync_assignment_roster(guild):
+    """Load every staff/helper member into the auto-assign roster"""
+    for role_id in (STAFF_ROLE_ID, HELPER_ROLE_ID):
+        role = guild.get_role(role_id)
+        if role:
+            for member in role.members:
+                track_assignee(member)
+    print(f"[ASSIGN] ✓ Roster loaded: {len(assignment_scheduler)} staff")
+
+def record_first_response(channel):
+    """Seconds from opening to first claim of a premium ticket (None if not tracked)"""
+    opened_at = ticket_opened_at.pop(channel.id, None)
+    if opened_at is None:
+        return None
+    response = time.monotonic() - opened_at
+    first_response_times.append(response)
+    return response
+
+def clear_pending_assignment(channel_id):
+    """Drop a ping-mode assignment once the ticket is claimed or closed"""
+    staff_id = pending_assignments.pop(channel_id, None)
+    if staff_id is not None:
+        staff_pending_assignments[staff_id] -= 1
+        touch_assignee(staff_id)
+
 
 # ---------------------------
 # EMBEDS
@@ -611,10 +840,40 @@ TICKET_MIDMAN_DESC = """\
 Klik tombol Di bawah Ini Untuk membuat Ticket Midman.
 """
 
+# ---------------------------
+# GRACEFUL SHUTDOWN
+# ---------------------------
+SHUTDOWN_DEADLINE = 30       # Seconds for the whole shutdown
+INTERACTION_GRACE = 2        # Seconds for in-flight interactions to respond
+
+shutdown = ShutdownCoordinator(deadline=SHUTDOWN_DEADLINE)
+
+async def reject_during_shutdown(interaction: Interaction) -> bool:
+    """Tell the user to retry if shutdown has started (True = rejected)"""
+    if not shutdown.started:
+        return False
+    await interaction.response.send_message(
+        "⏳ Bot sedang restart, coba lagi dalam beberapa detik.",
+        ephemeral=True
+    )
+    return True
+
+class GuardedCommandTree(app_commands.CommandTree):
+    """Rejects new slash commands once shutdown has started"""
+
+    async def interaction_check(self, interaction: Interaction) -> bool:
+        return not await reject_during_shutdown(interaction)
+
+class GuardedView(ui.View):
+    """Base for every view: buttons are rejected once shutdown has started"""
+
+    async def interaction_check(self, interaction: Interaction) -> bool:
+        return not await reject_during_shutdown(interaction)
+
 # ---------------------------
 # VIEWS
 # ---------------------------
-class TicketPanelButtons(ui.View):
+class TicketPanelButtons(GuardedView):
     def __init__(self):
         super().__init__(timeout=None)
 
@@ -630,7 +889,7 @@ class TicketPanelButtons(ui.View):
     async def report(self, interaction: Interaction, button: ui.Button):
         await create_ticket(interaction, "Bug / Misconduct Report")
 
-class TicketX8Button(ui.View):
+class TicketX8Button(GuardedView):
     def __init__(self):
         super().__init__(timeout=None)
 
@@ -673,6 +932,9 @@ class MidmanModal(ui.Modal, title="🤝 Form Midman Ticket"):
         max_length=100
     )
 
+    async def interaction_check(self, interaction: Interaction) -> bool:
+        return not await reject_during_shutdown(interaction)
+
     async def on_submit(self, interaction: Interaction):
         await create_midman_ticket(
             interaction,
@@ -683,11 +945,12 @@ class MidmanModal(ui.Modal, title="🤝 Form Midman Ticket"):
             payment=self.payment.value
         )
 
-class TicketMidmanButton(ui.View):
+class TicketMidmanButton(GuardedView):
     def __init__(self):
         super().__init__(timeout=None)
 
     @ui.button(label="🤝 Buat Ticket Midman", style=dc.ButtonStyle.green, custom_id="ticket_midman")
+    @traced("create_midman_form")
     async def create_midman_ticket_button(self, interaction: Interaction, button: ui.Button):
         # Show the modal form
         await interaction.response.send_modal(MidmanModal())
@@ -695,12 +958,13 @@ class TicketMidmanButton(ui.View):
 # ---------------------------
 # DONE BUTTON VIEW (appears after whitelist)
 # ---------------------------
-class DoneButtonView(ui.View):
+class DoneButtonView(GuardedView):
     def __init__(self, is_premium=False):
         super().__init__(timeout=None)
         self.is_premium = is_premium
 
     @ui.button(label="Done", style=dc.ButtonStyle.success, emoji="✅", custom_id="done_ticket_confirm")
+    @traced("done_ticket")
     async def done_button(self, interaction: Interaction, button: ui.Button):
         user = interaction.user
         guild = interaction.guild
@@ -751,18 +1015,19 @@ class DoneButtonView(ui.View):
 
         # Get updated stats
         staff_sales = get_sales(claimer_id)
-        total = staff_sales["total"]
+        total = staff_sales.total
 
         # Send confirmation
-        embed = dc.Embed(
-            title="✅ Ticket Selesai & Sales Tercatat",
-            description=f"Terima kasih {user.mention}! Ticket telah ditandai selesai.",
-            color=VORA_BLUE
-        )
-        embed.add_field(name="Staff yang Handle", value=claimer.mention, inline=True)
-        embed.add_field(name="Credit Sales", value=f"IDR {sale_amount:,}", inline=True)
-        embed.add_field(name="Total Sales Staff", value=f"IDR {total:,}", inline=True)
-        embed.set_footer(text="VoraHub Sales Tracker")
+        with span("render", "done_embed"):
+            embed = dc.Embed(
+                title="✅ Ticket Selesai & Sales Tercatat",
+                description=f"Terima kasih {user.mention}! Ticket telah ditandai selesai.",
+                color=VORA_BLUE
+            )
+            embed.add_field(name="Staff yang Handle", value=claimer.mention, inline=True)
+            embed.add_field(name="Credit Sales", value=f"IDR {sale_amount:,}", inline=True)
+            embed.add_field(name="Total Sales Staff", value=f"IDR {total:,}", inline=True)
+            embed.set_footer(text="VoraHub Sales Tracker")
 
         await interaction.response.send_message(embed=embed)
 
@@ -778,8 +1043,9 @@ class DoneButtonView(ui.View):
 
         # Mark ticket as done to prevent double-done
         mark_ticket_done(channel.id)
+        log_ticket_event("done", channel, "premium", user_id=user.id, staff_id=claimer_id)
 
-class TicketControlView(ui.View):
+class TicketControlView(GuardedView):
     def __init__(self, is_premium=False, is_x8=False):
         super().__init__(timeout=None)
         self.is_premium = is_premium
@@ -797,6 +1063,8 @@ class TicketControlView(ui.View):
             self.add_item(ui.Button(label="💳 Bayar Sekarang", style=dc.ButtonStyle.blurple, custom_id="pay_now_x8"))
 
     async def interaction_check(self, interaction: Interaction) -> bool:
+        if not await super().interaction_check(interaction):
+            return False
         cid = interaction.data.get("custom_id")
         if cid == "claim_ticket":
             return await self.claim_ticket_callback(interaction)
@@ -808,6 +1076,7 @@ class TicketControlView(ui.View):
             return await self.pay_now_x8_callback(interaction)
         return True
 
+    @traced("claim_ticket")
     async def claim_ticket_callback(self, interaction: Interaction):
         user = interaction.user
         guild = interaction.guild
@@ -827,7 +1096,7 @@ class TicketControlView(ui.View):
         # Check if staff has reached salary cap (skip for admin)
         if not is_admin and is_salary_maxed(user.id):
             staff_sales = get_sales(user.id)
-            current_salary = calculate_salary(staff_sales["total"])
+            current_salary = calculate_salary(staff_sales.total)
             await interaction.response.send_message(
                 f"❌ **Gaji kamu sudah mencapai batas maksimal IDR {current_salary:,}!**\n\n"
                 f"Kamu tidak bisa claim ticket baru sampai gaji dibayar oleh admin.\n"
@@ -836,20 +1105,19 @@ class TicketControlView(ui.View):
             )
             return False
 
-        # Check if staff is on cooldown (skip for admin)
-        if not is_admin:
-            on_cooldown, time_left, current_count = is_staff_on_cooldown(user.id)
-            if on_cooldown:
-                hours = int(time_left.total_seconds() // 3600)
-                minutes = int((time_left.total_seconds() % 3600) // 60)
-                await interaction.response.send_message(
-                    f"⏰ **Quota habis! Cooldown aktif**\n\n"
-                    f"Kamu sudah claim {COOLDOWN_LIMIT} ticket dan quota habis.\n"
-                    f"Cooldown berakhir dalam: **{hours} jam {minutes} menit**\n\n"
-                    f"💡 **Tip:** Kalau quota belum habis, reset otomatis setiap {RESET_MINUTES} menit!",
-                    ephemeral=True
-                )
-                return False
+        # Check claim quota (policy depends on role + ticket kind, admin = unlimited)
+        ticket_kind = "x8" if self.is_x8 else "premium"
+        quota = get_quota_status(user, ticket_kind)
+        if not quota.allowed:
+            policy = claim_quota.policies[quota.policy]
+            await interaction.response.send_message(
+                f"⏰ **Quota habis! Cooldown aktif**\n\n"
+                f"Kamu sudah claim {quota.used} ticket dan quota habis.\n"
+                f"Cooldown berakhir dalam: **{format_duration(quota.retry_after)}**\n\n"
+                f"💡 **Aturan quota:** {policy.describe()}",
+                ephemeral=True
+            )
+            return False
 
         # Check if already claimed
         existing_claim = get_claim(channel.id)
@@ -865,14 +1133,14 @@ class TicketControlView(ui.View):
 
         # Add claim
         add_claim(channel.id, user.id)
+        clear_pending_assignment(channel.id)
+        response = record_first_response(channel)
+        log_ticket_event("claimed", channel, ticket_kind, staff_id=user.id, response_seconds=response)
+        if response is not None:
+            print(f"[ASSIGN] {channel.name} claimed by {user.name} after {response:.1f}s")
         
-        # Add to cooldown tracker (skip for admin)
-        if not is_admin:
-            add_claim_to_cooldown(user.id)
-        
-        # Get current claim count
-        claim_count = get_claim_count(user.id) if not is_admin else 0
-        remaining = COOLDOWN_LIMIT - claim_count if not is_admin else 999  # Show unlimited for admin
+        # Add to quota tracker (no-op for unlimited policies)
+        quota = add_claim_to_cooldown(user, ticket_kind)
 
         # Find ticket creator
         ticket_creator_id = None
@@ -898,12 +1166,16 @@ class TicketControlView(ui.View):
 
         # Success message with quota info
         quota_msg = ""
-        if is_admin:
-            quota_msg = "\n\n👑 **Admin Mode:** Unlimited quota - No cooldown!"
-        elif remaining > 0:
-            quota_msg = f"\n\n📊 Sisa quota: **{remaining}/{COOLDOWN_LIMIT}** ticket\n💡 Reset otomatis dalam {RESET_MINUTES} menit jadi 5/5 lagi!"
+        if quota.limit is None:
+            if is_admin:
+                quota_msg = "\n\n👑 **Admin Mode:** Unlimited quota - No cooldown!"
+            else:
+                quota_msg = "\n\n♾️ Unlimited quota - No cooldown!"
+        elif quota.allowed:
+            policy = claim_quota.policies[quota.policy]
+            quota_msg = f"\n\n📊 Sisa quota: **{quota.limit - quota.used}/{quota.limit}** ticket\n💡 Aturan quota: {policy.describe()}"
         else:
-            quota_msg = f"\n\n⚠️ Quota habis! Cooldown {COOLDOWN_HOURS} jam dimulai sekarang."
+            quota_msg = f"\n\n⚠️ Quota habis! Cooldown **{format_duration(quota.retry_after)}** dimulai sekarang."
         
         await interaction.response.send_message(
             f"✅ {user.mention} telah **claim** ticket ini! Ticket sekarang hanya terlihat oleh kamu dan pembuat ticket.{quota_msg}",
@@ -912,6 +1184,7 @@ class TicketControlView(ui.View):
         return True
 
 
+    @traced("close_ticket")
     async def close_ticket_callback(self, interaction: Interaction):
         user = interaction.user
         guild = interaction.guild
@@ -925,14 +1198,16 @@ class TicketControlView(ui.View):
         channel = interaction.channel
         await interaction.response.send_message("📁 Membuat transcript…", ephemeral=True)
         messages = []
-        async for msg in channel.history(limit=None, oldest_first=True):
-            ts = msg.created_at.strftime("%Y-%m-%d %H:%M:%S")
-            content = msg.content or "*[Tidak ada teks]*"
-            if msg.attachments:
-                content += "\n" + "\n".join([f"[Attachment] {a.url}" for a in msg.attachments])
-            messages.append(f"**{msg.author}** [{ts}]:\n{content}\n")
-
-        transcript = "\n".join(messages)
+        # History page fetches inside count as REST time
+        async with span("render", "transcript"):
+            async for msg in channel.history(limit=None, oldest_first=True):
+                ts = msg.created_at.strftime("%Y-%m-%d %H:%M:%S")
+                content = msg.content or "*[Tidak ada teks]*"
+                if msg.attachments:
+                    content += "\n" + "\n".join([f"[Attachment] {a.url}" for a in msg.attachments])
+                messages.append(f"**{msg.author}** [{ts}]:\n{content}\n")
+            transcript = "\n".join(messages)
+
         log = guild.get_channel(TICKET_LOG_CHANNEL_ID)
         for i in range(0, len(transcript), 4096):
             part = transcript[i:i+4096]
@@ -952,10 +1227,14 @@ class TicketControlView(ui.View):
                     del active_tickets[uid]
              save_tickets()
         remove_claim(channel.id)
+        clear_pending_assignment(channel.id)
+        ticket_opened_at.pop(channel.id, None)
         remove_done_ticket(channel.id)  # Clean up done tickets list
+        log_ticket_event("closed", channel, "x8" if self.is_x8 else "premium" if self.is_premium else "other", staff_id=user.id)
         await channel.delete()
         return True
 
+    @traced("pay_now")
     async def pay_now_callback(self, interaction: Interaction):
         if not self.is_premium:
             await interaction.response.send_message("❌ Tidak ada pembayaran di ticket ini.", ephemeral=True)
@@ -964,6 +1243,7 @@ class TicketControlView(ui.View):
         await interaction.response.send_message("📄 Informasi pembayaran dikirim!", ephemeral=True)
         return True
     
+    @traced("pay_now_x8")
     async def pay_now_x8_callback(self, interaction: Interaction):
         if not self.is_x8:
             await interaction.response.send_message("❌ Tidak ada pembayaran di ticket ini.", ephemeral=True)
@@ -977,7 +1257,7 @@ class TicketControlView(ui.View):
 # ---------------------------
 # MIDMAN TICKET CONTROL VIEW (khusus Midman)
 # ---------------------------
-class MidmanTicketControlView(ui.View):
+class MidmanTicketControlView(GuardedView):
     def __init__(self):
         super().__init__(timeout=None)
         # Claim ticket button for Midman
@@ -988,6 +1268,8 @@ class MidmanTicketControlView(ui.View):
         self.add_item(ui.Button(label="Done ✅", style=dc.ButtonStyle.blurple, emoji="✅", custom_id="done_midman_ticket"))
 
     async def interaction_check(self, interaction: Interaction) -> bool:
+        if not await super().interaction_check(interaction):
+            return False
         cid = interaction.data.get("custom_id")
         if cid == "claim_midman_ticket":
             return await self.claim_midman_callback(interaction)
@@ -997,6 +1279,7 @@ class MidmanTicketControlView(ui.View):
             return await self.done_midman_callback(interaction)
         return True
 
+    @traced("claim_midman")
     async def claim_midman_callback(self, interaction: Interaction):
         user = interaction.user
         guild = interaction.guild
@@ -1022,6 +1305,7 @@ class MidmanTicketControlView(ui.View):
 
         # Add claim
         add_claim(channel.id, user.id)
+        log_ticket_event("claimed", channel, "midman", staff_id=user.id)
 
         # Find ticket creator (from midman_tickets)
         ticket_creator_id = None
@@ -1050,6 +1334,7 @@ class MidmanTicketControlView(ui.View):
         )
         return True
 
+    @traced("close_midman")
     async def close_midman_callback(self, interaction: Interaction):
         user = interaction.user
         guild = interaction.guild
@@ -1063,14 +1348,16 @@ class MidmanTicketControlView(ui.View):
         channel = interaction.channel
         await interaction.response.send_message("📁 Membuat transcript…", ephemeral=True)
         messages = []
-        async for msg in channel.history(limit=None, oldest_first=True):
-            ts = msg.created_at.strftime("%Y-%m-%d %H:%M:%S")
-            content = msg.content or "*[Tidak ada teks]*"
-            if msg.attachments:
-                content += "\n" + "\n".join([f"[Attachment] {a.url}" for a in msg.attachments])
-            messages.append(f"**{msg.author}** [{ts}]:\n{content}\n")
-
-        transcript = "\n".join(messages)
+        # History page fetches inside count as REST time
+        async with span("render", "transcript"):
+            async for msg in channel.history(limit=None, oldest_first=True):
+                ts = msg.created_at.strftime("%Y-%m-%d %H:%M:%S")
+                content = msg.content or "*[Tidak ada teks]*"
+                if msg.attachments:
+                    content += "\n" + "\n".join([f"[Attachment] {a.url}" for a in msg.attachments])
+                messages.append(f"**{msg.author}** [{ts}]:\n{content}\n")
+            transcript = "\n".join(messages)
+
         log = guild.get_channel(TICKET_LOG_CHANNEL_ID)
         for i in range(0, len(transcript), 4096):
             part = transcript[i:i+4096]
@@ -1085,9 +1372,11 @@ class MidmanTicketControlView(ui.View):
         save_midman_tickets()
         remove_claim(channel.id)
         remove_done_ticket(channel.id)
+        log_ticket_event("closed", channel, "midman", staff_id=user.id)
         await channel.delete()
         return True
 
+    @traced("done_midman")
     async def done_midman_callback(self, interaction: Interaction):
         user = interaction.user
         guild = interaction.guild
@@ -1122,6 +1411,7 @@ class MidmanTicketControlView(ui.View):
 
         # Mark as done
         mark_ticket_done(channel.id)
+        log_ticket_event("done", channel, "midman", staff_id=user.id)
 
         embed = dc.Embed(
             title="✅ Transaksi Midman Selesai!",
@@ -1136,15 +1426,17 @@ class MidmanTicketControlView(ui.View):
         await interaction.response.send_message(embed=embed)
         return True
 
-class PaymentActionView(ui.View):
+class PaymentActionView(GuardedView):
     def __init__(self):
         super().__init__(timeout=None)
 
     @ui.button(label="📤 Send Proof", style=dc.ButtonStyle.green)
+    @traced("payment_proof")
     async def send_proof(self, interaction: Interaction, button: ui.Button):
         await interaction.response.send_message("Silakan **upload bukti transfer** di chat ticket ini.", ephemeral=True)
 
     @ui.button(label="💳 Open QRIS", style=dc.ButtonStyle.blurple)
+    @traced("payment_qris")
     async def open_qris(self, interaction: Interaction, button: ui.Button):
         await interaction.response.send_message(
             "🧾 **QRIS Payment:**\nhttps://cdn.discordapp.com/attachments/1436968124699119636/1443793945581846619/VoraQris.png",
@@ -1168,6 +1460,7 @@ async def send_payment_embed(channel):
 # ---------------------------
 # CREATE TICKET FUNCTION
 # ---------------------------
+@traced("create_ticket")  # Panel buttons (premium / creator / report / X8)
 async def create_ticket(interaction: Interaction, category_name: str):
     user = interaction.user
     guild = interaction.guild
@@ -1216,20 +1509,22 @@ async def create_ticket(interaction: Interaction, category_name: str):
         add_ticket(user.id, ticket_channel.id)
 
     is_premium = "premium" in category_name.lower()
+    log_ticket_event("opened", ticket_channel, "x8" if is_x8 else "premium" if is_premium else "other", user_id=user.id)
 
-    embed = dc.Embed(
-        title=f"🎫 Ticket Dibuat — {category_name}",
-        description=(
-            f"Halo {user.mention}!\n\n"
-            f"Ticket kamu telah berhasil dibuat untuk kategori **{category_name}**.\n"
-            "Staff akan segera merespons.\n\n"
-            "**Jangan close ticket sebelum masalah selesai.**"
-        ),
-        color=VORA_BLUE
-    )
-    embed.add_field(name="Pembuat Ticket", value=user.mention, inline=False)
-    embed.add_field(name="Kategori", value=category_name, inline=False)
-    embed.set_footer(text="Vora Hub Ticket System")
+    with span("render", "ticket_embed"):
+        embed = dc.Embed(
+            title=f"🎫 Ticket Dibuat — {category_name}",
+            description=(
+                f"Halo {user.mention}!\n\n"
+                f"Ticket kamu telah berhasil dibuat untuk kategori **{category_name}**.\n"
+                "Staff akan segera merespons.\n\n"
+                "**Jangan close ticket sebelum masalah selesai.**"
+            ),
+            color=VORA_BLUE
+        )
+        embed.add_field(name="Pembuat Ticket", value=user.mention, inline=False)
+        embed.add_field(name="Kategori", value=category_name, inline=False)
+        embed.set_footer(text="Vora Hub Ticket System")
 
     mentions = []
     if staff_role:
@@ -1248,6 +1543,12 @@ async def create_ticket(interaction: Interaction, category_name: str):
 
     await interaction.response.send_message(f"🎫 Ticket kamu sudah dibuat: {ticket_channel.mention}", ephemeral=True)
 
+    # Route premium tickets to the least-loaded eligible staff
+    if is_premium:
+        ticket_opened_at[ticket_channel.id] = time.monotonic()
+        if AUTO_ASSIGN_MODE != "off":
+            await auto_assign_ticket(guild, ticket_channel)
+
     log = guild.get_channel(TICKET_LOG_CHANNEL_ID)
     log_embed = dc.Embed(
         title="📩 Ticket Dibuat",
@@ -1257,9 +1558,47 @@ async def create_ticket(interaction: Interaction, category_name: str):
     log_embed.set_footer(text="Vora Hub Ticket System • Ticket Log")
     await log.send(embed=log_embed)
 
+# ---------------------------
+# AUTO-ASSIGN TICKET FUNCTION
+# ---------------------------
+async def auto_assign_ticket(guild, ticket_channel):
+    """Pick the best eligible staff for a new premium ticket and ping or pre-claim them"""
+    while True:
+        staff_id = assignment_scheduler.pick()
+        if staff_id is None:
+            print(f"[ASSIGN] ✗ No eligible staff for {ticket_channel.name}")
+            return None
+        member = guild.get_member(staff_id)
+        if member:
+            break
+        assignment_scheduler.untrack(staff_id)  # Left the server
+
+    if AUTO_ASSIGN_MODE == "claim":
+        add_claim(ticket_channel.id, member.id)
+        add_claim_to_cooldown(member, "premium")
+        response = record_first_response(ticket_channel)
+        log_ticket_event("claimed", ticket_channel, "premium", staff_id=member.id, response_seconds=response)
+
+        # Same visibility as a manual claim
+        await ticket_channel.set_permissions(guild.get_role(STAFF_ROLE_ID), view_channel=False)
+        await ticket_channel.set_permissions(guild.get_role(HELPER_ROLE_ID), view_channel=False)
+        await ticket_channel.set_permissions(member, view_channel=True, send_messages=True)
+
+        await ticket_channel.send(f"✋ Ticket ini otomatis di-assign dan di-**claim** oleh {member.mention}.")
+    else:
+        pending_assignments[ticket_channel.id] = member.id
+        staff_pending_assignments[member.id] += 1
+        touch_assignee(member.id)
+
+        await ticket_channel.send(f"📌 {member.mention} kamu di-assign ke ticket ini, silakan **claim**!")
+
+    print(f"[ASSIGN] ✓ {ticket_channel.name} → {member.name} ({AUTO_ASSIGN_MODE})")
+    return member
+
 # ---------------------------
 # CREATE MIDMAN TICKET FUNCTION
 # ---------------------------
+@traced("create_midman_ticket")  # Midman form submit
 async def create_midman_ticket(interaction: Interaction, item: str, buyer: str, seller: str, harga: str, payment: str):
     user = interaction.user
     guild = interaction.guild
@@ -1306,6 +1645,7 @@ async def create_midman_ticket(interaction: Interaction, item: str, buyer: str,
         overwrites=overwrites
     )
     add_midman_ticket(user.id, ticket_channel.id)
+    log_ticket_event("opened", ticket_channel, "midman", user_id=user.id)
 
     # Format harga dengan comma
     try:
@@ -1367,11 +1707,12 @@ async def create_midman_ticket(interaction: Interaction, item: str, buyer: str,
 # ---------------------------
 # VERIF VIEW
 # ---------------------------
-class VerifView(ui.View):
+class VerifView(GuardedView):
     def __init__(self):
         super().__init__(timeout=None)
 
     @ui.button(label="Verifikasi ✔", style=ButtonStyle.green, custom_id="verif_button")
+    @traced("verif")
     async def verif(self, interaction: Interaction, button: ui.Button):
         member = interaction.user
         guild = interaction.guild
@@ -1384,6 +1725,7 @@ class VerifView(ui.View):
         await interaction.response.send_message(f"✅ {member.mention}, kamu sudah **terverifikasi**!\nSelamat datang 🎉", ephemeral=True)
 
     @ui.button(label="Info", style=ButtonStyle.blurple, custom_id="info_button")
+    @traced("verif_info")
     async def info(self, interaction: Interaction, button: ui.Button):
         embed = dc.Embed(
             title="📘 Info & Peraturan Server",
@@ -1420,6 +1762,32 @@ def get_verif_embed():
     embed.set_footer(text="VoraHub Official • © 2026")
     return embed
 
+# ---------------------------
+# SHUTDOWN STEPS
+# ---------------------------
+def save_state_stores():
+    """Write every registered store to disk and queue them as one backup commit"""
+    state_stores.save_all()
+    state_stores.flush()
+
+async def close_discord():
+    # Bypass Client.close (it routes back into the coordinator)
+    await commands.Bot.close(client)
+
+async def flush_state_stores(timeout):
+    # Leaving the block commits and pushes every saved store in one batch
+    async with flush_on_exit(timeout=timeout):
+        save_state_stores()
+
+def drain_backups(timeout):
+    if BACKUP_ENABLED and not shutdown_backup(timeout):
+        raise RuntimeError("unpushed commits remain (kept locally, pushed on next start)")
+
+shutdown.add_step("stop_interactions", lambda: asyncio.sleep(INTERACTION_GRACE))
+shutdown.add_step("close_discord", close_discord)
+shutdown.add_step("flush_stores", flush_state_stores, pass_timeout=True)
+shutdown.add_step("drain_backups", drain_backups, blocking=True, pass_timeout=True)
+
 # ---------------------------
 # CLIENT
 # ---------------------------
@@ -1428,7 +1796,8 @@ class Client(commands.Bot):
         intents = dc.Intents.default()
         intents.members = True
         intents.message_content = True
-        super().__init__(command_prefix="!", intents=intents)
+        intents.presences = AUTO_ASSIGN_MODE != "off"  # Online status for auto-assign
+        super().__init__(command_prefix="!", intents=intents, tree_cls=GuardedCommandTree)
 
         self.ticket_panels = [
         {
@@ -1477,6 +1846,14 @@ class Client(commands.Bot):
         }
     ]
 
+    async def setup_hook(self):
+        # REST spans for /perf: API calls + interaction responses / followups
+        trace_discord_rest(self)
+
+    async def close(self):
+        # Every close (signal, error, normal exit) goes through the coordinator
+        await shutdown.run("Client.close")
+
     async def on_ready(self):
         print(f"Logged in as {self.user}")
         try:
@@ -1494,6 +1871,10 @@ class Client(commands.Bot):
                 panel["view"]()  # <-- bikin instance sekarang
             )
         
+        if AUTO_ASSIGN_MODE != "off":
+            for guild in self.guilds:
+                sync_assignment_roster(guild)
+
         # Jalankan auto check whitelist pertama kali saat load
         await self.check_whitelist_tickets()
         
@@ -1502,6 +1883,10 @@ class Client(commands.Bot):
             self.auto_check_whitelist_loop.start()
             print("[AUTO-CHECK] ✓ Whitelist auto-check started (every 5 seconds)")
 
+        if BACKUP_ENABLED and METRICS_TEXTFILE and not export_metrics_loop.is_running():
+            export_metrics_loop.start()
+            print(f"[METRICS] ✓ Backup metrics exported to {METRICS_TEXTFILE} (every 15 seconds)")
+
     @tasks.loop(seconds=5)
     async def auto_check_whitelist_loop(self):
         """Auto check setiap 5 detik untuk ticket yang WL tapi belum Done"""
@@ -1786,6 +2171,14 @@ class Client(commands.Bot):
         return buffer
 
 
+    async def on_presence_update(self, before, after):
+        if AUTO_ASSIGN_MODE != "off" and before.status != after.status:
+            assignment_scheduler.set_online(after.id, after.status != dc.Status.offline)
+
+    async def on_member_update(self, before, after):
+        if AUTO_ASSIGN_MODE != "off" and before.roles != after.roles:
+            track_assignee(after)
+
     async def on_member_join(self, member):
         WELCOME_CHANNEL = 1434568585132511505
         DEFAULT_ROLE_ID = 1443627247809335429
@@ -1833,14 +2226,17 @@ class Client(commands.Bot):
 client = Client()
 
 @client.tree.command(name="hello", description="Says hello to the user.")
+@traced("/hello")
 async def hello(interaction: dc.Interaction):
     await interaction.response.send_message(f'Hello {interaction.user.mention}!!!')
 
 @client.tree.command(name="chat",description="Chat Anything With A Bot.")
+@traced("/chat")
 async def chat(interaction: dc.Interaction, messages: str):
     await interaction.response.send_message(messages)
 
 @client.tree.command(name="kick", description="Kicks a member from the server.")
+@traced("/kick")
 async def kick(interaction: dc.Interaction, member: dc.Member, reason: str = "No Reason Provided"):
     if not interaction.user.guild_permissions.kick_members:
         return await interaction.response.send_message(
@@ -1873,6 +2269,7 @@ async def kick(interaction: dc.Interaction, member: dc.Member, reason: str = "No
 
 @client.tree.command(name="ban", description="Ban a member from the server.")
 @app_commands.describe(member="The member to ban", reason="Reason for the ban")
+@traced("/ban")
 async def ban(interaction: dc.Interaction, member: dc.Member, reason: str = "No reason provided"):
     if not interaction.user.guild_permissions.ban_members:
         return await interaction.response.send_message("You don't have permission to ban members.", ephemeral=True)
@@ -1897,11 +2294,13 @@ async def ban(interaction: dc.Interaction, member: dc.Member, reason: str = "No
 
 @client.tree.command(name="nigger", description="Just a normal command")
 @app_commands.describe(member="The member to nigger")
+@traced("/nigger")
 async def nigger(interaction: dc.Interaction, member: dc.Member):
     await interaction.response.send_message(f"{member.mention}'ve been nigger by {interaction.user.mention}")
 
 @client.tree.command(name="warn", description="Warn a member.")
 @app_commands.describe(member="The member to warn", reason="Reason for the warning")
+@traced("/warn")
 async def warn(interaction: dc.Interaction, member: dc.Member, reason: str = "No reason provided"):
     if not interaction.user.guild_permissions.kick_members:
         await interaction.response.send_message("You don't have permission to warn members.", ephemeral=True)
@@ -1924,6 +2323,7 @@ async def warn(interaction: dc.Interaction, member: dc.Member, reason: str = "No
 
 @client.tree.command(name="delwarn", description="Remove a warning from a member.")
 @app_commands.describe(member="The member to remove a warning from", index="Optional: index of warn to remove (starts from 1)")
+@traced("/delwarn")
 async def unwarn(interaction: dc.Interaction, member: dc.Member, index: int = None):
     if not interaction.user.guild_permissions.kick_members:
         await interaction.response.send_message("You don't have permission to remove warns.", ephemeral=True)
@@ -1958,6 +2358,7 @@ async def unwarn(interaction: dc.Interaction, member: dc.Member, index: int = No
 
 @client.tree.command(name="warnlist", description="View all warns of a member.")
 @app_commands.describe(member="The member to view warns for")
+@traced("/warnlist")
 async def view_warns(interaction: dc.Interaction, member: dc.Member):
     guild_id = str(interaction.guild.id)
     member_id = str(member.id)
@@ -1970,6 +2371,7 @@ async def view_warns(interaction: dc.Interaction, member: dc.Member):
 
 @client.tree.command(name="timeout", description="Temporarily mute a member.")
 @app_commands.describe(member="The member to timeout", minutes="Duration in minutes", reason="Reason for timeout")
+@traced("/timeout")
 async def timeout(interaction: dc.Interaction, member: dc.Member, minutes: int = 5, reason: str = "No reason provided"):
     if not interaction.user.guild_permissions.moderate_members:
         await interaction.response.send_message("You don't have permission to timeout members.", ephemeral=True)
@@ -1985,6 +2387,7 @@ async def timeout(interaction: dc.Interaction, member: dc.Member, minutes: int =
 
 @client.tree.command(name="deltimeout", description="Remove timeout from a member.")
 @app_commands.describe(member="The member to remove timeout from")
+@traced("/deltimeout")
 async def untimeout(interaction: dc.Interaction, member: dc.Member):
     if not interaction.user.guild_permissions.moderate_members:
         await interaction.response.send_message("You don't have permission to remove timeout.", ephemeral=True)
@@ -1999,6 +2402,7 @@ async def untimeout(interaction: dc.Interaction, member: dc.Member):
     name="changelog",
     description="Send VoraHub changelog embed."
 )
+@traced("/changelog")
 async def changelog(
     interaction: dc.Interaction,
     game: str,
@@ -2079,6 +2483,7 @@ async def changelog(
     )
 
 @client.tree.command(name="ticketpanel", description="Send the ticket creation panel.")
+@traced("/ticketpanel")
 async def ticketpanel(interaction: dc.Interaction):
     if not interaction.user.guild_permissions.manage_channels:
         return await interaction.response.send_message(
@@ -2099,6 +2504,7 @@ async def ticketpanel(interaction: dc.Interaction):
 
 @client.tree.command(name="add", description="Tambah user ke ticket ini")
 @app_commands.describe(user="User yang ingin ditambahkan")
+@traced("/add")
 async def add_user(interaction: dc.Interaction, user: dc.Member):
 
     guild = interaction.guild
@@ -2128,6 +2534,7 @@ async def add_user(interaction: dc.Interaction, user: dc.Member):
 
 @client.tree.command(name="remove", description="Keluarkan user dari ticket ini")
 @app_commands.describe(user="User yang ingin dikeluarkan")
+@traced("/remove")
 async def remove_user(interaction: dc.Interaction, user: dc.Member):
 
     guild = interaction.guild
@@ -2165,12 +2572,15 @@ async def remove_user(interaction: dc.Interaction, user: dc.Member):
 @client.tree.command(name="sales", description="Sales")
 @app_commands.describe(
     staff="(Opsional) Staff yang melakukan penjualan - kosongkan untuk lihat leaderboard",
-    description="(Opsional) Deskripsi penjualan"
+    description="(Opsional) Deskripsi penjualan",
+    period="(Opsional) Leaderboard untuk periode tertentu - kosongkan untuk sales belum dibayar"
 )
+@traced("/sales")
 async def sales(
     interaction: dc.Interaction,
     staff: dc.Member = None,
-    description: str = "Sales"
+    description: str = "Sales",
+    period: SalesPeriod = None
 ):
     staff_role = interaction.guild.get_role(STAFF_ROLE_ID)
     helper_role = interaction.guild.get_role(HELPER_ROLE_ID)
@@ -2184,85 +2594,234 @@ async def sales(
     
     # If no parameters, show leaderboard
     if staff is None:
-        # Get all sales data and sort by total
-        leaderboard = []
-        for staff_id_str, data in sales_data.items():
-            staff_id = int(staff_id_str)
-            member = interaction.guild.get_member(staff_id)
-            if member:
-                leaderboard.append({
-                    "member": member,
-                    "total": data["total"],
-                    "count": len(data["sales"])
-                })
-        
-        # Sort by total sales (descending)
-        leaderboard.sort(key=lambda x: x["total"], reverse=True)
-        
-        if not leaderboard:
-            return await interaction.response.send_message(
-                "📊 Belum ada data penjualan yang tercatat.",
-                ephemeral=True
+        if period:
+            # Read the period rollup bucket (no scan over transactions)
+            resolution, offset = SALES_PERIODS[period]
+            bucket = period_key(resolution, datetime.datetime.now(), offset)
+            ranked = sales_rollups.ranked(resolution, bucket)
+            grand_total, grand_count = sales_rollups.totals(resolution, bucket)
+        else:
+            ranked = ((row.staff_id, row.total, row.count) for row in sales_leaderboard.ranked())
+            grand_total, grand_count = sales_leaderboard.total_sales, sales_leaderboard.total_transactions
+
+        with span("render", "leaderboard"):
+            # Walk the pre-sorted rows until 10 members still in the server are found
+            leaderboard = []
+            for staff_id, total, count in ranked:
+                member = interaction.guild.get_member(staff_id)
+                if member:
+                    leaderboard.append((member, total, count))
+                    if len(leaderboard) == 10:
+                        break
+
+            if not leaderboard:
+                return await interaction.response.send_message(
+                    "📊 Belum ada data penjualan yang tercatat.",
+                    ephemeral=True
+                )
+
+            # Create leaderboard embed
+            embed = dc.Embed(
+                title=f"🏆 Leaderboard Penjualan — {period}" if period else "🏆 Leaderboard Penjualan",
+                description="Top staff berdasarkan total penjualan",
+                color=VORA_BLUE
             )
-        
-        # Create leaderboard embed
-        embed = dc.Embed(
-            title="🏆 Leaderboard Penjualan",
-            description="Top staff berdasarkan total penjualan",
-            color=VORA_BLUE
-        )
-        
-        # Add top 10 to leaderboard
-        leaderboard_text = ""
-        medals = ["🥇", "🥈", "🥉"]
-        for idx, entry in enumerate(leaderboard[:10], 1):
-            medal = medals[idx-1] if idx <= 3 else f"**{idx}.**"
-            commission = calculate_salary(entry["total"])
-            leaderboard_text += (
-                f"{medal} {entry['member'].mention}\n"
-                f"   💰 Sales: IDR {entry['total']:,} | "
-                f"💵 Gaji: IDR {commission:,} | "
-                f"📦 {entry['count']} transaksi\n\n"
+
+            # Add top 10 to leaderboard
+            leaderboard_text = ""
+            medals = ["🥇", "🥈", "🥉"]
+            for idx, (member, total, count) in enumerate(leaderboard, 1):
+                medal = medals[idx-1] if idx <= 3 else f"**{idx}.**"
+                commission = calculate_salary(total)
+                leaderboard_text += (
+                    f"{medal} {member.mention}\n"
+                    f"   💰 Sales: IDR {total:,} | "
+                    f"💵 Gaji: IDR {commission:,} | "
+                    f"📦 {count} transaksi\n\n"
+                )
+
+            embed.add_field(
+                name="📊 Top Performers",
+                value=leaderboard_text or "Tidak ada data",
+                inline=False
             )
+
+            # Running totals across all staff
+            embed.add_field(
+                name="📈 Total Keseluruhan",
+                value=f"Sales: IDR {grand_total:,} | Transaksi: {grand_count}",
+                inline=False
+            )
+
+            embed.set_footer(text="VoraHub Sales Tracker • Komisi 10%")
         
+        await interaction.response.send_message(embed=embed)
+
+@client.tree.command(name="quota", description="Lihat status quota claim semua staff")
+@traced("/quota")
+async def quota(interaction: dc.Interaction):
+    guild = interaction.guild
+    staff_role = guild.get_role(STAFF_ROLE_ID)
+    helper_role = guild.get_role(HELPER_ROLE_ID)
+
+    # Check if user is staff/helper
+    if staff_role not in interaction.user.roles and helper_role not in interaction.user.roles:
+        return await interaction.response.send_message(
+            "❌ Hanya staff yang bisa menggunakan command ini.",
+            ephemeral=True
+        )
+
+    # Collect roster (staff + helper, no duplicates)
+    roster = {}
+    for role in (staff_role, helper_role):
+        if role:
+            for member in role.members:
+                if not member.bot:
+                    roster[member.id] = member
+
+    if not roster:
+        return await interaction.response.send_message("📊 Tidak ada staff yang ditemukan.", ephemeral=True)
+
+    # One batched pass over the roster, no per-member reloads
+    admin_role = guild.get_role(ADMIN_ROLE_ID)
+    statuses = claim_quota.evaluate(((m.id, quota_roles(m)) for m in roster.values()), "premium")
+    available = []
+    cooling = []
+    for staff_id, status in statuses.items():
+        member = roster[staff_id]
+        if status.limit is None:
+            icon = "👑" if admin_role in member.roles else "♾️"
+            available.append((float("inf"), f"{icon} {member.mention} — unlimited"))
+        elif not status.allowed:
+            cooling.append((status.retry_after, f"⏰ {member.mention} — cooldown **{format_duration(status.retry_after)}**"))
+        else:
+            remaining = status.limit - status.used
+            available.append((remaining, f"✅ {member.mention} — sisa **{remaining}/{status.limit}** ({status.policy})"))
+
+    available.sort(key=lambda x: x[0], reverse=True)
+    cooling.sort(key=lambda x: x[0])
+
+    embed = dc.Embed(
+        title="📊 Status Quota Staff",
+        description=f"{len(available)} staff bisa claim • {len(cooling)} staff cooldown",
+        color=VORA_BLUE
+    )
+    for name, rows in (("✅ Bisa Claim", available), ("⏰ Cooldown", cooling)):
+        if not rows:
+            continue
+        text = ""
+        for idx, (_, line) in enumerate(rows):
+            if len(text) + len(line) > 950:
+                text += f"… dan {len(rows) - idx} lainnya"
+                break
+            text += line + "\n"
+        embed.add_field(name=name, value=text, inline=False)
+
+    if first_response_times:
+        times = sorted(first_response_times)
         embed.add_field(
-            name="📊 Top Performers",
-            value=leaderboard_text or "Tidak ada data",
+            name="⏱️ Respon Pertama (ticket premium)",
+            value=(
+                f"Median **{times[len(times) // 2] / 60:.1f} menit** • "
+                f"terlama {times[-1] / 60:.1f} menit • {len(times)} ticket terakhir"
+            ),
             inline=False
         )
-        
-        # Calculate total sales across all staff
-        total_all_sales = sum(entry["total"] for entry in leaderboard)
-        total_transactions = sum(entry["count"] for entry in leaderboard)
-        
-        embed.add_field(
-            name="📈 Total Keseluruhan",
-            value=f"Sales: IDR {total_all_sales:,} | Transaksi: {total_transactions}",
+
+    used_policies = sorted({status.policy for status in statuses.values()})
+    embed.set_footer(text=" • ".join(f"{name}: {claim_quota.policies[name].describe()}" for name in used_policies))
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+class SalesHistoryView(GuardedView):
+    """Prev/Next pages over a staff member's sales history"""
+
+    PAGE_SIZE = 8
+
+    def __init__(self, owner_id: int, embed: dc.Embed, history: SalesHistory):
+        super().__init__(timeout=300)
+        self.owner_id = owner_id
+        self.embed = embed
+        self.history = history
+        self.page = 0
+        self.newest_first = True
+        self.pages = history.page_count(self.PAGE_SIZE)
+        self.field_index = len(embed.fields)
+        embed.add_field(name="📋 Riwayat Transaksi", value="-", inline=False)
+
+    async def render(self) -> dc.Embed:
+        # Paid periods the page overlaps are loaded on first use, off the event loop
+        rows = await asyncio.to_thread(self.history.page, self.page, self.PAGE_SIZE, self.newest_first)
+        lines = []
+        with span("render", "sales_history"):
+            for sale, paid in rows:
+                date_str = sale.timestamp.strftime("%d/%m/%Y %H:%M")
+                mark = " ✅" if paid else ""
+                lines.append(f"• **IDR {sale.amount:,}** - {sale.description} ({date_str}){mark}")
+
+        order = "terbaru" if self.newest_first else "terlama"
+        self.embed.set_field_at(
+            self.field_index,
+            name=f"📋 Riwayat Transaksi ({order}) • Hal {self.page + 1}/{self.pages}",
+            value="\n".join(lines)[:1024] or "Tidak ada transaksi",
             inline=False
         )
-        
-        embed.set_footer(text="VoraHub Sales Tracker • Komisi 10%")
-        
-        await interaction.response.send_message(embed=embed)
+        self.prev_page.disabled = self.page == 0
+        self.next_page.disabled = self.page >= self.pages - 1
+        return self.embed
+
+    async def interaction_check(self, interaction: Interaction) -> bool:
+        if not await super().interaction_check(interaction):
+            return False
+        if interaction.user.id != self.owner_id:
+            await interaction.response.send_message("❌ Gunakan /mygaji sendiri untuk melihat riwayat.", ephemeral=True)
+            return False
+        return True
+
+    @ui.button(label="◀ Prev", style=dc.ButtonStyle.gray)
+    @traced("sales_history_prev")
+    async def prev_page(self, interaction: Interaction, button: ui.Button):
+        self.page = max(self.page - 1, 0)
+        await interaction.response.edit_message(embed=await self.render(), view=self)
+
+    @ui.button(label="Next ▶", style=dc.ButtonStyle.gray)
+    @traced("sales_history_next")
+    async def next_page(self, interaction: Interaction, button: ui.Button):
+        self.page = min(self.page + 1, self.pages - 1)
+        await interaction.response.edit_message(embed=await self.render(), view=self)
+
+    @ui.button(label="🔃 Urutan", style=dc.ButtonStyle.blurple)
+    @traced("sales_history_order")
+    async def toggle_order(self, interaction: Interaction, button: ui.Button):
+        self.newest_first = not self.newest_first
+        self.page = 0
+        await interaction.response.edit_message(embed=await self.render(), view=self)
 
 @client.tree.command(name="mygaji", description="Lihat total penjualan dan gaji staff")
 @app_commands.describe(
-    staff="(Opsional) Staff yang ingin dilihat gajinya - kosongkan untuk lihat gaji sendiri"
+    staff="(Opsional) Staff yang ingin dilihat gajinya - kosongkan untuk lihat gaji sendiri",
+    period="(Opsional) Tampilkan juga penjualan untuk periode tertentu"
 )
-async def mygaji(interaction: dc.Interaction, staff: dc.Member = None):
+@traced("/mygaji")
+async def mygaji(interaction: dc.Interaction, staff: dc.Member = None, period: SalesPeriod = None):
     # If no staff specified, use the command user
     target_user = staff if staff else interaction.user
     
     # Get sales data for the target user
     staff_sales = get_sales(target_user.id)
-    total_sales = staff_sales["total"]
-    sales_list = staff_sales["sales"]
+    total_sales = staff_sales.total
     
     # Calculate commission with cap
     gaji = calculate_salary(total_sales)
     is_maxed = gaji >= SALARY_CAP
-    
-    if total_sales == 0:
+
+    # Period stats come from the rollups (include already-paid sales)
+    period_total, period_count = get_period_sales(period, target_user.id) if period else (0, 0)
+
+    # Paged history (current + paid periods); the archive index is read off the event loop
+    history = await asyncio.to_thread(sales_ledger.history, target_user.id, sales_data)
+
+    # Nothing unpaid is not "no sales": a staff member who was just paid still has history
+    if len(history) == 0 and period_count == 0:
         return await interaction.response.send_message(
             f"📊 {target_user.mention} belum memiliki penjualan yang tercatat."
         )
@@ -2291,41 +2850,38 @@ async def mygaji(interaction: dc.Interaction, staff: dc.Member = None):
     )
     embed.add_field(
         name="🔢 Jumlah Transaksi",
-        value=f"{len(sales_list)} transaksi",
+        value=f"{len(staff_sales)} transaksi",
         inline=True
     )
     
-    # Warning if maxed
-    if is_maxed:
+    if period:
         embed.add_field(
-            name="⚠️ Peringatan",
-            value=f"Gaji sudah mencapai batas maksimal! Tidak bisa claim ticket baru sampai gaji dibayar.",
+            name=f"🗓️ Penjualan {period}",
+            value=f"IDR {period_total:,} ({period_count} transaksi)",
             inline=False
         )
     
-    # Show last 5 transactions
-    if len(sales_list) > 0:
-        recent_sales = sales_list[-5:]  # Last 5
-        sales_text = ""
-        for sale in reversed(recent_sales):
-            timestamp = datetime.datetime.fromisoformat(sale["timestamp"])
-            date_str = timestamp.strftime("%d/%m/%Y %H:%M")
-            sales_text += f"• **IDR {sale['amount']:,}** - {sale['description']} ({date_str})\n"
-        
+    # Warning if maxed
+    if is_maxed:
         embed.add_field(
-            name="📋 Transaksi Terakhir",
-            value=sales_text or "Tidak ada transaksi",
+            name="⚠️ Peringatan",
+            value=f"Gaji sudah mencapai batas maksimal! Tidak bisa claim ticket baru sampai gaji dibayar.",
             inline=False
         )
     
     embed.set_footer(text="VoraHub Sales Tracker • Data diperbarui real-time")
-    
-    await interaction.response.send_message(embed=embed)
+
+    if len(history) == 0:
+        return await interaction.response.send_message(embed=embed)
+
+    view = SalesHistoryView(interaction.user.id, embed, history)
+    await interaction.response.send_message(embed=await view.render(), view=view)
 
 @client.tree.command(name="gajisudahbayar", description="[ADMIN] Konfirmasi pembayaran gaji staff dan reset sales")
 @app_commands.describe(
     staff="Staff yang sudah dibayar gajinya"
 )
+@traced("/gajisudahbayar")
 async def gajisudahbayar(interaction: dc.Interaction, staff: dc.Member):
     # Check if user is admin
     admin_role = interaction.guild.get_role(ADMIN_ROLE_ID)
@@ -2338,9 +2894,9 @@ async def gajisudahbayar(interaction: dc.Interaction, staff: dc.Member):
     
     # Get staff sales data before reset
     staff_sales = get_sales(staff.id)
-    total_sales = staff_sales["total"]
+    total_sales = staff_sales.total
     gaji = calculate_salary(total_sales)
-    transaction_count = len(staff_sales["sales"])
+    transaction_count = len(staff_sales)
     
     if total_sales == 0:
         return await interaction.response.send_message(
@@ -2348,8 +2904,14 @@ async def gajisudahbayar(interaction: dc.Interaction, staff: dc.Member):
             ephemeral=True
         )
     
-    # Reset sales
-    reset_sales(staff.id)
+    # Pushing the payout can take a few seconds
+    await interaction.response.defer()
+    
+    # Close the unpaid period (archived in the ledger, not deleted)
+    ledger_paths = reset_sales(staff.id, paid_by=interaction.user.id)
+    
+    # Push the payout right away, without blocking the event loop
+    backed_up = BACKUP_ENABLED and await backup_now_async(ledger_backup_names(ledger_paths), timeout=30)
     
     # Send confirmation embed
     embed = dc.Embed(
@@ -2378,11 +2940,17 @@ async def gajisudahbayar(interaction: dc.Interaction, staff: dc.Member):
         value="Sales telah di-reset ke 0. Staff bisa claim ticket lagi!",
         inline=False
     )
+    if BACKUP_ENABLED:
+        embed.add_field(
+            name="☁️ Backup",
+            value="Tersimpan di GitHub" if backed_up else "⚠️ Belum ter-push, akan dicoba ulang otomatis",
+            inline=False
+        )
     
     embed.set_footer(text=f"Dibayar oleh {interaction.user.name}")
     embed.timestamp = datetime.datetime.now()
     
-    await interaction.response.send_message(embed=embed)
+    await interaction.followup.send(embed=embed)
     
     # Notify staff via DM
     try:
@@ -2408,13 +2976,269 @@ async def gajisudahbayar(interaction: dc.Interaction, staff: dc.Member):
             f"Sales sudah di-reset, kamu bisa claim ticket lagi."
         )
 
-from dotenv import load_dotenv
-import os
+@client.tree.command(name="export", description="[ADMIN] Export data sales / ticket ke file CSV atau JSONL (gzip)")
+@app_commands.rename(file_format="format")
+@app_commands.describe(
+    data="Data yang ingin di-export (sales = penjualan + pembayaran gaji, tickets = riwayat ticket)",
+    file_format="Format file",
+    staff="(Opsional) Hanya data staff / user ini",
+    start="(Opsional) Tanggal mulai, format YYYY-MM-DD",
+    end="(Opsional) Tanggal akhir (inklusif), format YYYY-MM-DD"
+)
+@traced("/export")
+async def export(
+    interaction: dc.Interaction,
+    data: Literal["sales", "tickets"],
+    file_format: Literal["csv", "jsonl"] = "csv",
+    staff: dc.Member = None,
+    start: str = None,
+    end: str = None
+):
+    # Check if user is admin
+    admin_role = interaction.guild.get_role(ADMIN_ROLE_ID)
+    if admin_role not in interaction.user.roles:
+        return await interaction.response.send_message(
+            "❌ Hanya admin yang bisa menggunakan command ini.",
+            ephemeral=True
+        )
 
-load_dotenv()
+    try:
+        start_iso = datetime.date.fromisoformat(start).isoformat() if start else None
+        end_iso = (datetime.date.fromisoformat(end) + timedelta(days=1)).isoformat() if end else None
+    except ValueError:
+        return await interaction.response.send_message(
+            "❌ Format tanggal salah, gunakan **YYYY-MM-DD** (contoh: 2026-01-31).",
+            ephemeral=True
+        )
+
+    await interaction.response.defer(ephemeral=True)
+
+    # Rows are generated lazily and written in a worker thread
+    staff_id = staff.id if staff else None
+    if data == "sales":
+        rows = iter_ledger_rows(sales_ledger, staff_id, start_iso, end_iso)
+        fields = SALES_FIELDS
+    else:
+        rows = iter_event_log(TICKET_EVENTS_FILE, staff_id, start_iso, end_iso)
+        fields = TICKET_FIELDS
+
+    filename = f"vorahub-{data}-{datetime.datetime.now().strftime('%Y%m%d-%H%M%S')}.{file_format}.gz"
+    path = os.path.join(tempfile.gettempdir(), filename)
+    try:
+        count = await asyncio.to_thread(write_export, rows, path, file_format, fields)
+        size = os.path.getsize(path)
+        if size > interaction.guild.filesize_limit:
+            return await interaction.followup.send(
+                f"❌ File export terlalu besar ({size / 1024 / 1024:.1f} MB). Persempit filter staff / tanggal.",
+                ephemeral=True
+            )
+        await interaction.followup.send(
+            f"✅ Export **{data}** selesai: **{count:,}** baris ({size / 1024:.1f} KB)",
+            file=dc.File(path, filename=filename),
+            ephemeral=True
+        )
+    except Exception as e:
+        print(f"[EXPORT] ✗ Failed to export {data}: {e}")
+        await interaction.followup.send(f"❌ Export gagal: {e}", ephemeral=True)
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+def format_ms(seconds):
+    return "-" if seconds is None else f"{seconds * 1000:.0f} ms" if seconds < 10 else f"{seconds:.1f} s"
+
+def format_timestamp(epoch):
+    return "belum pernah" if not epoch else f"<t:{int(epoch)}:R>"
+
+@client.tree.command(name="backupstatus", description="[ADMIN] Status backup GitHub: antrian, latensi, kegagalan")
+@traced("/backupstatus")
+async def backupstatus(interaction: dc.Interaction):
+    # Check if user is admin
+    admin_role = interaction.guild.get_role(ADMIN_ROLE_ID)
+    if admin_role not in interaction.user.roles:
+        return await interaction.response.send_message(
+            "❌ Hanya admin yang bisa menggunakan command ini.",
+            ephemeral=True
+        )
+
+    stats = get_backup_stats() if BACKUP_ENABLED else None
+    if stats is None:
+        return await interaction.response.send_message("⚠️ Backup GitHub tidak aktif.", ephemeral=True)
+
+    queue = stats["queue"]
+    healthy = stats["state"] == "ready" and stats["consecutive_failures"] == 0
+    embed = dc.Embed(
+        title="🗄️ Status Backup",
+        description=(
+            f"{'✅' if healthy else '⚠️'} **{stats['state']}** • writer `{stats['writer']}` • "
+            f"sukses terakhir {format_timestamp(stats['last_success'])}"
+        ),
+        color=VORA_BLUE if healthy else 0xe74c3c
+    )
+    embed.add_field(
+        name="📥 Antrian",
+        value=(
+            f"{queue['pending_files']} file ({queue['pending_bytes'] / 1024:.1f} KB)\n"
+            f"Tertua: {queue['oldest_pending_age']:.1f} s\n"
+            f"Flush: {queue['max_delay']:.0f} s / {queue['max_files']} file"
+        ),
+        inline=True
+    )
+    embed.add_field(
+        name="📦 Batch",
+        value=(
+            f"{stats['batches']} batch, {stats['commits']} commit\n"
+            f"{stats['noop_batches']} tanpa perubahan\n"
+            f"Rata-rata {stats['batch_files']['avg'] or 0:.1f} file / batch"
+        ),
+        inline=True
+    )
+    embed.add_field(
+        name="❌ Kegagalan",
+        value=(
+            f"Beruntun: **{stats['consecutive_failures']}** (total {stats['failures']})\n"
+            f"Terakhir: {format_timestamp(stats['last_failure'])}"
+            + (f"\n`{stats['last_error'][:200]}`" if stats["last_error"] else "")
+        ),
+        inline=True
+    )
+    latency = "\n".join(
+        f"`{phase:<9}` p50 {format_ms(timing['p50'])} • p95 {format_ms(timing['p95'])} • max {format_ms(timing['max'])}"
+        for phase, timing in stats["latency"].items() if timing["count"]
+    )
+    embed.add_field(name="⏱️ Latensi (stage / lock / commit / push)", value=latency or "Belum ada data", inline=False)
+    for name, target in stats["targets"].items():
+        if "ahead" in target:
+            value = (
+                f"Tertinggal {target['ahead']} commit • gagal beruntun {target['failures']}\n"
+                f"Push terakhir {format_timestamp(target['last_success'])} ({format_ms(target['last_duration'])})"
+            )
+            if target["last_error"]:
+                value += f"\n`{target['last_error'][:200]}`"
+        else:
+            value = (
+                f"{target['snapshots']} snapshot • terakhir {format_timestamp(target['last_snapshot'])}"
+                + (" • menunggu snapshot berikutnya" if target["pending"] else "")
+            )
+        embed.add_field(name=f"🎯 {name}", value=value, inline=False)
+    maintenance = stats["maintenance"]
+    if maintenance:
+        embed.add_field(
+            name="🧹 Repository",
+            value=(
+                f"{maintenance['size_kb'] / 1024:.1f} MB • {maintenance['commits']} commit • "
+                f"{maintenance['growth_kb_per_day'] / 1024:+.2f} MB/hari\n"
+                f"Maintenance terakhir {format_timestamp(maintenance['last_run'])} ({maintenance['last_action']})"
+            ),
+            inline=False
+        )
+    embed.set_footer(text="VoraHub Official • © 2026")
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+PERF_SPAN_LABELS = {"state_io": "io", "rest": "rest", "render": "render", "other": "other"}
+
+@client.tree.command(name="perf", description="[ADMIN] Latensi handler: p50/p95/p99 dan trace paling lambat")
+@app_commands.describe(handler="(Opsional) Nama handler untuk rincian per span, contoh: claim_ticket atau /sales")
+@traced("/perf")
+async def perf(interaction: dc.Interaction, handler: str = None):
+    # Check if user is admin
+    admin_role = interaction.guild.get_role(ADMIN_ROLE_ID)
+    if admin_role not in interaction.user.roles:
+        return await interaction.response.send_message(
+            "❌ Hanya admin yang bisa menggunakan command ini.",
+            ephemeral=True
+        )
+
+    stats = tracer.stats()
+    if not stats:
+        return await interaction.response.send_message("📊 Belum ada interaksi yang tercatat.", ephemeral=True)
+    if handler and handler not in stats:
+        return await interaction.response.send_message(
+            f"❌ Handler `{handler}` belum tercatat.\nTersedia: {', '.join(f'`{name}`' for name in sorted(stats))}",
+            ephemeral=True
+        )
+
+    if handler:
+        # One handler: every span kind
+        rows = [f"{'span':<8}{'n':>6}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}"]
+        for kind in ("total",) + SPAN_KINDS + ("other",):
+            timing = stats[handler][kind]
+            if timing["count"]:
+                rows.append(
+                    f"{PERF_SPAN_LABELS.get(kind, kind):<8}{timing['count']:>6}"
+                    + "".join(f"{timing[q] * 1000:>7.0f}ms" for q in ("p50", "p95", "p99", "max"))
+                )
+        title = f"⏱️ Latensi — {handler}"
+        description = f"Error: **{stats[handler]['errors']}**\n```\n" + "\n".join(rows) + "\n```"
+    else:
+        # Every handler, slowest p95 first
+        rows = [f"{'handler':<22}{'n':>6}{'p50':>8}{'p95':>8}{'p99':>8}"]
+        ranked = sorted(stats.items(), key=lambda item: item[1]["total"]["p95"], reverse=True)
+        for name, handler_stats in ranked[:25]:
+            timing = handler_stats["total"]
+            rows.append(
+                f"{name[:21]:<22}{timing['count']:>6}"
+                + "".join(f"{timing[q] * 1000:>6.0f}ms" for q in ("p50", "p95", "p99"))
+            )
+        title = "⏱️ Latensi Handler"
+        description = "```\n" + "\n".join(rows) + "\n```"
+
+    embed = dc.Embed(title=title, description=description[:4096], color=VORA_BLUE)
+    slow_lines = []
+    for trace in tracer.slowest(5, handler):
+        breakdown = " • ".join(
+            f"{PERF_SPAN_LABELS[kind]} {format_ms(seconds)}"
+            for kind, seconds in (*trace.spans.items(), ("other", trace.other)) if seconds >= 0.001
+        )
+        line = f"**{format_ms(trace.total)}** `{trace.name}` {format_timestamp(trace.started)}"
+        if trace.error:
+            line += f" ⚠️ {trace.error}"
+        line += f"\n{breakdown or '-'}"
+        if trace.top:
+            seconds, kind, label = trace.top[0]
+            line += f"\nSpan terlama: `{PERF_SPAN_LABELS[kind]} {label}` {format_ms(seconds)}"
+        slow_lines.append(line)
+    embed.add_field(name=f"🐢 Trace Paling Lambat ({len(tracer.recent)} interaksi terakhir)", value="\n\n".join(slow_lines)[:1024] or "-", inline=False)
+    if not tracer.rest_traced:
+        embed.add_field(name="ℹ️ REST", value="Waktu REST tidak terukur di versi discord.py ini (masuk ke other).", inline=False)
+    embed.set_footer(text="VoraHub Official • © 2026")
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+# ---------------------------
+# METRICS EXPORT
+# ---------------------------
+# Backup metrics for Prometheus' node_exporter textfile collector, e.g.
+# METRICS_TEXTFILE=/var/lib/node_exporter/textfile/vorahub.prom (unset = disabled)
+METRICS_TEXTFILE = os.getenv("METRICS_TEXTFILE", "").strip()
+
+def write_metrics_textfile(path, metrics):
+    """Write metrics as "name value" lines; the collector never sees a half-written file"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for name, value in sorted(metrics.items()):
+            f.write(f"{name} {float(value)!r}\n")
+    os.replace(tmp_path, path)
+
+@tasks.loop(seconds=15)
+async def export_metrics_loop():
+    try:
+        await asyncio.to_thread(write_metrics_textfile, METRICS_TEXTFILE, export_backup_metrics())
+    except OSError as e:
+        print(f"[METRICS] ✗ Failed to write {METRICS_TEXTFILE}: {e}")
 
 TOKEN = os.getenv("DISCORD_TOKEN")
 
-client.run(TOKEN)
+async def main():
+    shutdown.install_signal_handlers(asyncio.get_running_loop())
+    try:
+        async with client:
+            await client.start(TOKEN)
+    finally:
+        # Stores flushed, final backup commit pushed (no-op if already done)
+        await shutdown.run("exit")
+        print("[SHUTDOWN] " + shutdown.format_report())
+
+dc.utils.setup_logging()
+asyncio.run(main())
 
 
@@ -0,0 +1,74 @@
+"""
+Canonical JSON Layout for VoraHub Bot
+Delta-friendly serialization for state files that are backed up with git
+
+Key Features:
+- Sorted keys: the same state always serializes to the same bytes
+- One record per line: a changed record is a one-line diff, not a shifted block
+- Still plain JSON (json.load reads it unchanged)
+- dumps_line for append-only JSONL ledgers / event logs
+"""
+
+import json
+from typing import Any
+
+INDENT = "  "
+
+
+def _compact(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+
+
+def _has_containers(value: Any) -> bool:
+    """True if `value` holds nested dicts/lists (is not a single record)"""
+    children = value.values() if isinstance(value, dict) else value
+    return any(isinstance(child, (dict, list)) and child for child in children)
+
+
+def _encode(value: Any, level: int, expand: bool) -> str:
+    if not expand or not isinstance(value, (dict, list)) or not value:
+        return _compact(value)
+
+    pad = INDENT * (level + 1)
+    if isinstance(value, dict):
+        # Keys compared as strings, the same order json.dumps(sort_keys=True) gives
+        entries = sorted(value.items(), key=lambda item: str(item[0]))
+        lines = [f"{pad}{json.dumps(str(key), ensure_ascii=False)}: {_encode(child, level + 1, _nested(child))}"
+                 for key, child in entries]
+        opening, closing = "{", "}"
+    else:
+        # Lists keep their order: appends land at the end
+        lines = [f"{pad}{_encode(child, level + 1, _nested(child))}" for child in value]
+        opening, closing = "[", "]"
+    return opening + "\n" + ",\n".join(lines) + "\n" + INDENT * level + closing
+
+
+def _nested(value: Any) -> bool:
+    return isinstance(value, (dict, list)) and _has_containers(value)
+
+
+def dumps(data: Any) -> bytes:
+    """
+    Serialize state in the canonical layout
+
+    The top level is always expanded; below it containers are expanded
+    until they only hold scalars, and those records stay on one line:
+
+        {
+          "day": {
+            "2026-01-05": {
+              "*": [40000,2],
+              "1001": [40000,2]
+            }
+          }
+        }
+
+    Returns:
+        UTF-8 bytes ending with a newline
+    """
+    return (_encode(data, 0, True) + "\n").encode("utf-8")
+
+
+def dumps_line(record: Any) -> str:
+    """One JSONL record with sorted keys (no trailing newline)"""
+    return _compact(record)
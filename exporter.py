@@ -0,0 +1,101 @@
+"""
+Streaming Export for VoraHub Bot
+Writes sales ledger and ticket history to gzip CSV / JSONL files
+
+Key Features:
+- Rows produced lazily by generators (memory stays flat)
+- Filtering by staff member and date range
+- Plain functions, safe to run in a worker thread
+"""
+
+import csv
+import gzip
+import json
+import os
+import logging
+from typing import Dict, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SALES_FIELDS = ["staff_id", "type", "amount", "description", "timestamp", "sales_total", "count", "paid_by"]
+TICKET_FIELDS = ["timestamp", "event", "kind", "channel_id", "channel_name", "user_id", "staff_id", "response_seconds"]
+
+
+def _in_range(ts: str, start: Optional[str], end: Optional[str]) -> bool:
+    """ISO timestamps of the same format compare correctly as strings"""
+    return (start is None or ts >= start) and (end is None or ts < end)
+
+
+def iter_ledger_rows(ledger, staff_id: Optional[int] = None,
+                     start: Optional[str] = None, end: Optional[str] = None) -> Iterator[Dict]:
+    """
+    Stream sale and payout events from the sales ledger
+
+    Args:
+        ledger: SalesLedger instance
+        staff_id: Only this staff member
+        start: Inclusive ISO lower bound
+        end: Exclusive ISO upper bound
+    """
+    for sid, event in ledger.iter_events(staff_id):
+        if _in_range(event.get("timestamp", ""), start, end):
+            yield {"staff_id": sid, **event}
+
+
+def iter_event_log(path: str, staff_id: Optional[int] = None,
+                   start: Optional[str] = None, end: Optional[str] = None) -> Iterator[Dict]:
+    """
+    Stream events from a JSONL event log (e.g. ticket_events.jsonl)
+
+    Args:
+        path: Log file path
+        staff_id: Only events where this member is the user or the staff
+        start: Inclusive ISO lower bound
+        end: Exclusive ISO upper bound
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"Skipping invalid line in {path}")
+                continue
+            if staff_id is not None and staff_id not in (event.get("user_id"), event.get("staff_id")):
+                continue
+            if _in_range(event.get("timestamp", ""), start, end):
+                yield event
+
+
+def write_export(rows: Iterable[Dict], path: str, fmt: str, fields: List[str]) -> int:
+    """
+    Stream rows into a gzip-compressed CSV or JSONL file
+
+    Args:
+        rows: Row generator
+        path: Output file path (.gz)
+        fmt: "csv" or "jsonl"
+        fields: CSV column order (extra keys are ignored)
+
+    Returns:
+        Number of rows written
+    """
+    count = 0
+    with gzip.open(path, "wt", encoding="utf-8", newline="") as f:
+        if fmt == "csv":
+            writer = csv.DictWriter(f, fieldnames=fields, extrasaction="ignore")
+            writer.writeheader()
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+        elif fmt == "jsonl":
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+                count += 1
+        else:
+            raise ValueError(f"Unknown export format: {fmt}")
+    return count
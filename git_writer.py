@@ -0,0 +1,411 @@
+"""
+In-Process Git Commit Writer for VoraHub Bot
+Builds blobs, trees and commits without spawning git for every batch
+
+Key Features:
+- Pure-Python loose object writer (zlib + SHA-1, no subprocess per file)
+- Tree model seeded once from `git ls-tree`, only changed directories re-hashed
+- Index updated in the same step so `git status` stays clean
+- Optional pygit2 backend when the library is installed
+- CLI fallback (single `git add` for the whole batch) for unusual repositories
+"""
+
+import os
+import time
+import zlib
+import struct
+import hashlib
+import logging
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import pygit2
+except ImportError:
+    pygit2 = None
+
+logger = logging.getLogger(__name__)
+
+# Runs a git command, returns (success, output) - see GitBackupManager._run_git_command
+GitRunner = Callable[[List[str]], Tuple[bool, str]]
+
+BLOB_MODE = "100644"
+TREE_MODE = "40000"
+
+
+class WriterError(Exception):
+    """The in-process writer cannot handle this repository state"""
+
+
+class CommitWriter:
+    """Base class: turn a batch of file contents into one commit on HEAD"""
+
+    name = "base"
+
+    def __init__(self, repo_path: Path, author_name: str, author_email: str):
+        self.repo_path = Path(repo_path)
+        self.git_dir = self.repo_path / ".git"
+        self.author_name = author_name
+        self.author_email = author_email
+
+    def commit(self, contents: Dict[str, bytes], message: str) -> Optional[str]:
+        """
+        Commit new contents for the given paths
+
+        Args:
+            contents: Repo-relative path -> file bytes
+            message: Commit message
+
+        Returns:
+            New commit SHA, or None if nothing changed
+        """
+        raise NotImplementedError
+
+
+# ---------------------------
+# PURE PYTHON BACKEND
+# ---------------------------
+class LooseObjectWriter(CommitWriter):
+    """
+    Writes loose objects, updates the branch ref and the index directly
+
+    The tree of HEAD is loaded once with `git ls-tree`; afterwards every
+    commit only re-serializes the directories that contain changed files.
+    If HEAD moves outside the bot (manual commit, pull), the model is
+    reseeded automatically.
+    """
+
+    name = "python"
+
+    def __init__(self, repo_path: Path, author_name: str, author_email: str, run_git: GitRunner):
+        super().__init__(repo_path, author_name, author_email)
+        self.run_git = run_git
+        self._dirs: Dict[str, Dict[str, Tuple[str, str]]] = {}  # dir -> {name: (mode, sha)}
+        self._tree_sha: Dict[str, str] = {}                       # dir -> clean tree sha
+        self._head: Optional[str] = None
+        self._seeded = False
+
+    # Objects -------------------------------------------------------------
+
+    def _write_object(self, obj_type: str, data: bytes) -> str:
+        """Store a loose object, returns its hex SHA"""
+        raw = f"{obj_type} {len(data)}".encode() + b"\0" + data
+        sha = hashlib.sha1(raw).hexdigest()
+        obj_dir = self.git_dir / "objects" / sha[:2]
+        obj_path = obj_dir / sha[2:]
+        if obj_path.exists():
+            return sha
+        obj_dir.mkdir(exist_ok=True)
+        tmp_path = obj_dir / f"tmp_{sha[2:]}_{os.getpid()}"
+        with open(tmp_path, "wb") as f:
+            f.write(zlib.compress(raw))
+        os.replace(tmp_path, obj_path)
+        return sha
+
+    @staticmethod
+    def _blob_sha(data: bytes) -> str:
+        return hashlib.sha1(f"blob {len(data)}".encode() + b"\0" + data).hexdigest()
+
+    # Refs ----------------------------------------------------------------
+
+    def _head_ref(self) -> str:
+        """Symbolic ref HEAD points at (e.g. refs/heads/main)"""
+        head = (self.git_dir / "HEAD").read_text().strip()
+        if not head.startswith("ref: "):
+            raise WriterError("Detached HEAD")
+        return head[5:]
+
+    def _read_ref(self, ref: str) -> Optional[str]:
+        ref_path = self.git_dir / ref
+        if ref_path.exists():
+            return ref_path.read_text().strip() or None
+        packed = self.git_dir / "packed-refs"
+        if packed.exists():
+            for line in packed.read_text().splitlines():
+                if line and line[0] not in "#^" and line.endswith(" " + ref):
+                    return line.split(" ", 1)[0]
+        return None
+
+    def _update_ref(self, ref: str, old: Optional[str], new: str, message: str):
+        """Move the branch with a lock file (same protocol as git)"""
+        ref_path = self.git_dir / ref
+        ref_path.parent.mkdir(parents=True, exist_ok=True)
+        lock_path = ref_path.with_name(ref_path.name + ".lock")
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            raise WriterError(f"Ref is locked: {ref}")
+        try:
+            if self._read_ref(ref) != old:
+                raise WriterError(f"Ref moved during commit: {ref}")
+            os.write(fd, (new + "\n").encode())
+        finally:
+            os.close(fd)
+        os.replace(lock_path, ref_path)
+
+        # Reflogs, so `git reflog` can recover old backup states
+        zero = "0" * 40
+        entry = f"{old or zero} {new} {self._signature()}\tcommit: {message.splitlines()[0]}\n"
+        for log in (self.git_dir / "logs" / "HEAD", self.git_dir / "logs" / ref):
+            try:
+                log.parent.mkdir(parents=True, exist_ok=True)
+                with open(log, "a", encoding="utf-8") as f:
+                    f.write(entry)
+            except OSError:
+                pass
+
+    # Tree model ----------------------------------------------------------
+
+    def _seed(self, head: Optional[str]):
+        """Load the full tree of HEAD (one subprocess, only when HEAD moved)"""
+        self._dirs = {"": {}}
+        self._tree_sha = {}
+        if head:
+            success, output = self.run_git(["git", "ls-tree", "-r", "-t", "-z", "--full-tree", head])
+            if not success:
+                raise WriterError(f"ls-tree failed: {output}")
+            for record in output.split("\0"):
+                if not record:
+                    continue
+                meta, path = record.split("\t", 1)
+                mode, obj_type, sha = meta.split(" ")
+                parent, _, name = path.rpartition("/")
+                if obj_type == "tree":
+                    mode = TREE_MODE
+                    self._dirs.setdefault(path, {})
+                self._dirs.setdefault(parent, {})[name] = (mode, sha)
+            for parent, entries in self._dirs.items():
+                for name, (mode, sha) in entries.items():
+                    if mode == TREE_MODE:
+                        self._tree_sha[f"{parent}/{name}" if parent else name] = sha
+            success, output = self.run_git(["git", "rev-parse", f"{head}^{{tree}}"])
+            if not success:
+                raise WriterError(f"rev-parse failed: {output}")
+            self._tree_sha[""] = output.strip()
+        self._head = head
+        self._seeded = True
+
+    @staticmethod
+    def _tree_sort_key(item):
+        name, (mode, _) = item
+        return name + "/" if mode == TREE_MODE else name
+
+    def _build_tree(self, dirty: set) -> str:
+        """Re-serialize dirty directories bottom-up, returns the root tree SHA"""
+        for path in sorted(dirty, key=lambda p: p.count("/") if p else -1, reverse=True):
+            entries = self._dirs[path]
+            data = b"".join(
+                f"{mode} {name}".encode() + b"\0" + bytes.fromhex(sha)
+                for name, (mode, sha) in sorted(entries.items(), key=self._tree_sort_key)
+            )
+            sha = self._write_object("tree", data)
+            self._tree_sha[path] = sha
+            if path:
+                parent, _, name = path.rpartition("/")
+                self._dirs[parent][name] = (TREE_MODE, sha)
+        return self._tree_sha[""]
+
+    def _stage(self, contents: Dict[str, bytes]) -> Tuple[set, Dict[str, Tuple[str, str]]]:
+        """Write blobs into the tree model; returns dirty dirs and index updates"""
+        dirty = set()
+        staged = {}
+        for path, data in contents.items():
+            parent, _, name = path.rpartition("/")
+            old = self._dirs.get(parent, {}).get(name)
+            if old and old[0] == TREE_MODE:
+                raise WriterError(f"Path is a directory in HEAD: {path}")
+            mode = old[0] if old else BLOB_MODE
+            sha = self._blob_sha(data)
+            staged[path] = (mode, sha)
+            if old == (mode, sha):
+                continue
+            self._write_object("blob", data)
+
+            # Create missing parent directories
+            ancestor = parent
+            while ancestor not in self._dirs:
+                self._dirs[ancestor] = {}
+                up, _, leaf = ancestor.rpartition("/")
+                self._dirs.setdefault(up, {})
+                ancestor = up
+            self._dirs[parent][name] = (mode, sha)
+
+            while True:
+                dirty.add(parent)
+                if not parent:
+                    break
+                parent = parent.rpartition("/")[0]
+        # New directories need their (not yet known) entry in the parent
+        for path in dirty:
+            if path and path not in self._tree_sha:
+                up, _, leaf = path.rpartition("/")
+                self._dirs[up].setdefault(leaf, (TREE_MODE, "0" * 40))
+        return dirty, staged
+
+    # Index ---------------------------------------------------------------
+
+    def _update_index(self, staged: Dict[str, Tuple[str, str]]):
+        """Point index entries of committed paths at their new blobs"""
+        index_path = self.git_dir / "index"
+        entries: Dict[bytes, bytes] = {}
+        version = 2
+        if index_path.exists():
+            data = index_path.read_bytes()
+            signature, version, count = struct.unpack(">4sLL", data[:12])
+            if signature != b"DIRC" or version not in (2, 3):
+                raise WriterError(f"Unsupported index version {version}")
+            pos = 12
+            for _ in range(count):
+                flags = struct.unpack(">H", data[pos + 60:pos + 62])[0]
+                header = 64 if flags & 0x4000 else 62
+                end = data.index(b"\0", pos + header)
+                path = data[pos + header:end]
+                if flags & 0x3000:
+                    raise WriterError("Index has unmerged entries")
+                length = (end - pos + 8) & ~7
+                entries[path] = data[pos:pos + length]
+                pos += length
+            # Extensions (TREE cache etc.) are dropped: git rebuilds them
+            if b"link" in data[pos:-20] or b"sdir" in data[pos:-20]:
+                raise WriterError("Split or sparse index is not supported")
+
+        for path, (mode, sha) in staged.items():
+            name = path.encode()
+            # Zeroed stat data makes git re-check the file content on next status
+            entry = struct.pack(">10L", 0, 0, 0, 0, 0, 0, int(mode, 8), 0, 0, 0)
+            entry += bytes.fromhex(sha) + struct.pack(">H", min(len(name), 0xFFF)) + name
+            entry += b"\0" * (8 - len(entry) % 8)
+            entries[name] = entry
+
+        body = struct.pack(">4sLL", b"DIRC", version, len(entries))
+        body += b"".join(entries[name] for name in sorted(entries))
+        lock_path = self.git_dir / "index.lock"
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            raise WriterError("Index is locked")
+        try:
+            os.write(fd, body + hashlib.sha1(body).digest())
+        finally:
+            os.close(fd)
+        os.replace(lock_path, index_path)
+
+    # Commit --------------------------------------------------------------
+
+    def _signature(self) -> str:
+        offset = -(time.altzone if time.localtime().tm_isdst > 0 else time.timezone)
+        sign = "+" if offset >= 0 else "-"
+        tz = f"{sign}{abs(offset) // 3600:02d}{abs(offset) % 3600 // 60:02d}"
+        return f"{self.author_name} <{self.author_email}> {int(time.time())} {tz}"
+
+    def commit(self, contents: Dict[str, bytes], message: str) -> Optional[str]:
+        ref = self._head_ref()
+        head = self._read_ref(ref)
+        if not self._seeded or head != self._head:
+            logger.info("Loading HEAD tree for in-process commits")
+            self._seed(head)
+
+        try:
+            dirty, staged = self._stage(contents)
+            if not dirty:
+                return None
+            tree = self._build_tree(dirty)
+
+            signature = self._signature()
+            lines = [f"tree {tree}"]
+            if head:
+                lines.append(f"parent {head}")
+            lines += [f"author {signature}", f"committer {signature}", "", message]
+            commit_sha = self._write_object("commit", ("\n".join(lines) + "\n").encode())
+            self._update_ref(ref, head, commit_sha, message)
+        except Exception:
+            # The in-memory tree may no longer match HEAD
+            self._seeded = False
+            raise
+
+        self._head = commit_sha
+        self._update_index(staged)
+        return commit_sha
+
+
+# ---------------------------
+# PYGIT2 BACKEND (OPTIONAL)
+# ---------------------------
+class Pygit2Writer(CommitWriter):
+    """libgit2-backed writer, used when pygit2 is installed"""
+
+    name = "pygit2"
+
+    def __init__(self, repo_path: Path, author_name: str, author_email: str):
+        super().__init__(repo_path, author_name, author_email)
+        self.repo = pygit2.Repository(str(repo_path))
+
+    def commit(self, contents: Dict[str, bytes], message: str) -> Optional[str]:
+        repo = self.repo
+        index = repo.index
+        index.read()
+        for path, data in contents.items():
+            existing = index[path] if path in index else None
+            mode = existing.mode if existing else pygit2.GIT_FILEMODE_BLOB
+            index.add(pygit2.IndexEntry(path, repo.create_blob(data), mode))
+        tree = index.write_tree()
+        index.write()
+
+        parents = [] if repo.head_is_unborn else [repo.head.target]
+        if parents and repo[parents[0]].tree_id == tree:
+            return None
+        signature = pygit2.Signature(self.author_name, self.author_email)
+        return str(repo.create_commit("HEAD", signature, signature, message, tree, parents))
+
+
+# ---------------------------
+# CLI FALLBACK
+# ---------------------------
+class CliWriter(CommitWriter):
+    """Subprocess writer: one `git add` for the whole batch, then commit"""
+
+    name = "cli"
+
+    def __init__(self, repo_path: Path, author_name: str, author_email: str, run_git: GitRunner):
+        super().__init__(repo_path, author_name, author_email)
+        self.run_git = run_git
+
+    def commit(self, contents: Dict[str, bytes], message: str) -> Optional[str]:
+        # `git add` stages the working tree copy (same or newer than `contents`)
+        paths = list(contents)
+        success, output = self.run_git(["git", "add", "--"] + paths)
+        if not success:
+            raise WriterError(f"git add failed: {output}")
+        success, _ = self.run_git(["git", "diff", "--cached", "--quiet"])
+        if success:
+            return None
+        success, output = self.run_git(["git", "commit", "-m", message])
+        if not success:
+            raise WriterError(f"git commit failed: {output}")
+        success, output = self.run_git(["git", "rev-parse", "HEAD"])
+        return output.strip() if success else None
+
+
+def create_writer(repo_path: Path, author_name: str, author_email: str,
+                  run_git: GitRunner, backend: str = "auto") -> CommitWriter:
+    """
+    Pick a commit writer
+
+    Args:
+        repo_path: Repository root
+        author_name: Commit author/committer name
+        author_email: Commit author/committer email
+        run_git: Git command runner (used for seeding and the CLI backend)
+        backend: "auto", "pygit2", "python" or "cli"
+
+    Returns:
+        CommitWriter instance
+    """
+    if backend in ("auto", "pygit2") and pygit2 is not None:
+        try:
+            return Pygit2Writer(repo_path, author_name, author_email)
+        except Exception as e:
+            logger.warning(f"pygit2 backend unavailable: {e}")
+    if backend in ("auto", "python", "pygit2"):
+        return LooseObjectWriter(repo_path, author_name, author_email, run_git)
+    return CliWriter(repo_path, author_name, author_email, run_git)
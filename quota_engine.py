@@ -0,0 +1,453 @@
+"""
+Claim Quota Policy Engine for VoraHub Bot
+Decides who may claim a ticket right now, per role and per ticket kind
+
+Key Features:
+- Pluggable policies: hybrid (N per cycle, else lockout), fixed window,
+  sliding window, token bucket, unlimited
+- Rules map (role, ticket kind) to a policy; first matching role wins
+- Compact per-staff records with epoch-second integers (no ISO parsing)
+- Side-effect free queries: expired windows are resolved lazily in memory
+- Only real claims mutate state (and therefore need persisting)
+- Batched evaluation of the whole roster in a single pass
+"""
+
+import time
+import math
+import bisect
+import datetime
+import logging
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class QuotaStatus(NamedTuple):
+    """Result of a quota check"""
+    allowed: bool
+    retry_after: int       # Seconds until a claim is allowed again (0 if allowed)
+    used: int              # Claims counted against the current limit
+    limit: Optional[int]   # None = unlimited
+    policy: str
+    resets_in: int = 0     # Seconds until `used` next drops (0 = nothing counted / blocked)
+
+
+def _to_epoch(value) -> int:
+    """Convert a stored timestamp (epoch int or legacy ISO string) to epoch seconds"""
+    if not value:
+        return 0
+    if isinstance(value, (int, float)):
+        return int(value)
+    return int(datetime.datetime.fromisoformat(value).timestamp())
+
+
+def _fmt_duration(seconds: int) -> str:
+    """Short duration label (e.g. 20m, 2h)"""
+    if seconds % 3600 == 0:
+        return f"{seconds // 3600}h"
+    if seconds % 60 == 0:
+        return f"{seconds // 60}m"
+    return f"{seconds}s"
+
+
+# ---------------------------
+# POLICIES
+# ---------------------------
+class QuotaPolicy:
+    """Base class for claim quota policies"""
+
+    def __init__(self, name: str, limit: Optional[int]):
+        self.name = name
+        self.limit = limit
+
+    def new_state(self, now: int):
+        """Create empty per-staff state"""
+        raise NotImplementedError
+
+    def check(self, state, now: int) -> QuotaStatus:
+        """Evaluate state without modifying it"""
+        raise NotImplementedError
+
+    def consume(self, state, now: int):
+        """Record one claim"""
+        raise NotImplementedError
+
+    def dump(self, state):
+        """Serialize state to JSON-compatible data"""
+        raise NotImplementedError
+
+    def restore(self, raw):
+        """Deserialize state from JSON data"""
+        raise NotImplementedError
+
+    def describe(self) -> str:
+        """Short human-readable summary"""
+        return self.name
+
+
+class CooldownRecord:
+    """Hybrid policy state for one staff member (epoch seconds)"""
+
+    __slots__ = ("cycle_start", "claims", "exhausted_until")
+
+    def __init__(self, cycle_start: int, claims: int = 0, exhausted_until: int = 0):
+        self.cycle_start = cycle_start
+        self.claims = claims
+        self.exhausted_until = exhausted_until  # 0 = not exhausted
+
+
+class HybridPolicy(QuotaPolicy):
+    """`limit` claims per `reset_seconds` cycle; hitting the limit starts a `cooldown_seconds` lockout"""
+
+    def __init__(self, name: str, limit: int, reset_seconds: int, cooldown_seconds: int):
+        super().__init__(name, limit)
+        self.reset_seconds = reset_seconds
+        self.cooldown_seconds = cooldown_seconds
+
+    def new_state(self, now: int) -> CooldownRecord:
+        return CooldownRecord(now)
+
+    def check(self, state: CooldownRecord, now: int) -> QuotaStatus:
+        if state.exhausted_until:
+            if now < state.exhausted_until:
+                return QuotaStatus(False, state.exhausted_until - now, self.limit, self.limit, self.name)
+            return QuotaStatus(True, 0, 0, self.limit, self.name)
+
+        if now - state.cycle_start >= self.reset_seconds:
+            return QuotaStatus(True, 0, 0, self.limit, self.name)
+
+        resets_in = state.cycle_start + self.reset_seconds - now if state.claims else 0
+        return QuotaStatus(True, 0, state.claims, self.limit, self.name, resets_in)
+
+    def consume(self, state: CooldownRecord, now: int):
+        expired = (
+            (state.exhausted_until and now >= state.exhausted_until)
+            or now - state.cycle_start >= self.reset_seconds
+        )
+        if expired:
+            state.cycle_start = now
+            state.claims = 1
+            state.exhausted_until = 0
+            return
+
+        state.claims += 1
+        if state.claims >= self.limit:
+            state.exhausted_until = now + self.cooldown_seconds
+
+    def dump(self, state: CooldownRecord) -> dict:
+        return {
+            "cycle_start": state.cycle_start,
+            "claims_in_cycle": state.claims,
+            "exhausted_cooldown_until": state.exhausted_until or None
+        }
+
+    def restore(self, raw: dict) -> CooldownRecord:
+        return CooldownRecord(
+            _to_epoch(raw.get("cycle_start")),
+            int(raw.get("claims_in_cycle", 0)),
+            _to_epoch(raw.get("exhausted_cooldown_until"))
+        )
+
+    def describe(self) -> str:
+        return f"{self.limit}/{_fmt_duration(self.reset_seconds)} → {_fmt_duration(self.cooldown_seconds)} cooldown"
+
+
+class WindowRecord:
+    """Fixed window state: window start and claims in that window"""
+
+    __slots__ = ("window_start", "claims")
+
+    def __init__(self, window_start: int = 0, claims: int = 0):
+        self.window_start = window_start
+        self.claims = claims
+
+
+class FixedWindowPolicy(QuotaPolicy):
+    """`limit` claims per clock-aligned window of `window_seconds`"""
+
+    def __init__(self, name: str, limit: int, window_seconds: int):
+        super().__init__(name, limit)
+        self.window_seconds = window_seconds
+
+    def new_state(self, now: int) -> WindowRecord:
+        return WindowRecord()
+
+    def check(self, state: WindowRecord, now: int) -> QuotaStatus:
+        window_start = now - now % self.window_seconds
+        used = state.claims if state.window_start == window_start else 0
+        if used < self.limit:
+            resets_in = window_start + self.window_seconds - now if used else 0
+            return QuotaStatus(True, 0, used, self.limit, self.name, resets_in)
+        return QuotaStatus(False, window_start + self.window_seconds - now, used, self.limit, self.name)
+
+    def consume(self, state: WindowRecord, now: int):
+        window_start = now - now % self.window_seconds
+        if state.window_start != window_start:
+            state.window_start = window_start
+            state.claims = 0
+        state.claims += 1
+
+    def dump(self, state: WindowRecord) -> list:
+        return [state.window_start, state.claims]
+
+    def restore(self, raw: list) -> WindowRecord:
+        return WindowRecord(int(raw[0]), int(raw[1]))
+
+    def describe(self) -> str:
+        return f"{self.limit}/{_fmt_duration(self.window_seconds)} fixed"
+
+
+class SlidingWindowPolicy(QuotaPolicy):
+    """At most `limit` claims in any trailing `window_seconds`"""
+
+    def __init__(self, name: str, limit: int, window_seconds: int):
+        super().__init__(name, limit)
+        self.window_seconds = window_seconds
+
+    def new_state(self, now: int) -> List[int]:
+        return []  # Sorted claim timestamps, at most `limit` kept
+
+    def check(self, state: List[int], now: int) -> QuotaStatus:
+        first = bisect.bisect_right(state, now - self.window_seconds)
+        used = len(state) - first
+        if used < self.limit:
+            resets_in = state[first] + self.window_seconds - now if used else 0
+            return QuotaStatus(True, 0, used, self.limit, self.name, resets_in)
+        # Oldest claim that still counts must leave the window
+        return QuotaStatus(False, state[-self.limit] + self.window_seconds - now, used, self.limit, self.name)
+
+    def consume(self, state: List[int], now: int):
+        state.append(now)
+        if len(state) > self.limit:
+            del state[:-self.limit]
+
+    def dump(self, state: List[int]) -> list:
+        return list(state)
+
+    def restore(self, raw: list) -> List[int]:
+        return sorted(int(ts) for ts in raw)[-self.limit:]
+
+    def describe(self) -> str:
+        return f"{self.limit}/{_fmt_duration(self.window_seconds)} sliding"
+
+
+class BucketRecord:
+    """Token bucket state"""
+
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: int):
+        self.tokens = tokens
+        self.updated = updated
+
+
+class TokenBucketPolicy(QuotaPolicy):
+    """Bucket of `capacity` claims, refilled by one every `refill_seconds`"""
+
+    def __init__(self, name: str, capacity: int, refill_seconds: int):
+        super().__init__(name, capacity)
+        self.refill_seconds = refill_seconds
+
+    def _tokens(self, state: BucketRecord, now: int) -> float:
+        return min(self.limit, state.tokens + (now - state.updated) / self.refill_seconds)
+
+    def new_state(self, now: int) -> BucketRecord:
+        return BucketRecord(float(self.limit), now)
+
+    def check(self, state: BucketRecord, now: int) -> QuotaStatus:
+        tokens = self._tokens(state, now)
+        used = self.limit - math.floor(tokens)
+        if tokens >= 1:
+            # Next whole token
+            resets_in = math.ceil((math.floor(tokens) + 1 - tokens) * self.refill_seconds) if used else 0
+            return QuotaStatus(True, 0, used, self.limit, self.name, resets_in)
+        return QuotaStatus(False, math.ceil((1 - tokens) * self.refill_seconds), used, self.limit, self.name)
+
+    def consume(self, state: BucketRecord, now: int):
+        state.tokens = self._tokens(state, now) - 1
+        state.updated = now
+
+    def dump(self, state: BucketRecord) -> list:
+        return [round(state.tokens, 4), state.updated]
+
+    def restore(self, raw: list) -> BucketRecord:
+        return BucketRecord(float(raw[0]), int(raw[1]))
+
+    def describe(self) -> str:
+        return f"{self.limit} token, +1/{_fmt_duration(self.refill_seconds)}"
+
+
+class UnlimitedPolicy(QuotaPolicy):
+    """No limit (e.g. admins)"""
+
+    def __init__(self, name: str = "unlimited"):
+        super().__init__(name, None)
+
+    def new_state(self, now: int):
+        return None
+
+    def check(self, state, now: int) -> QuotaStatus:
+        return QuotaStatus(True, 0, 0, None, self.name)
+
+    def consume(self, state, now: int):
+        pass
+
+    def dump(self, state):
+        return None
+
+    def restore(self, raw):
+        return None
+
+    def describe(self) -> str:
+        return "unlimited"
+
+
+# ---------------------------
+# ENGINE
+# ---------------------------
+Roster = Iterable[Tuple[int, Sequence[str]]]
+
+
+class PolicyEngine:
+    """Resolves (role, ticket kind) to a policy and tracks per-staff state"""
+
+    def __init__(self, policies: List[QuotaPolicy], rules: Dict[Tuple[Optional[str], Optional[str]], str],
+                 role_order: List[str], default: str):
+        """
+        Initialize policy engine
+
+        Args:
+            policies: Available policies (unique names)
+            rules: (role, ticket_kind) -> policy name; None acts as wildcard
+            role_order: Role precedence, first role a member has wins
+            default: Policy name used when no rule matches
+        """
+        self.policies: Dict[str, QuotaPolicy] = {p.name: p for p in policies}
+        self.rules = rules
+        self.role_order = role_order
+        self.default = default
+        # policy name -> staff_id -> state (claims under the same policy share a counter)
+        self.states: Dict[str, Dict[int, object]] = {name: {} for name in self.policies}
+        self._resolved: Dict[Tuple[Tuple[str, ...], Optional[str]], QuotaPolicy] = {}
+
+    def resolve(self, roles: Sequence[str], kind: Optional[str] = None) -> QuotaPolicy:
+        """Pick the policy for a member's roles and a ticket kind"""
+        cache_key = (tuple(roles), kind)
+        policy = self._resolved.get(cache_key)
+        if policy is not None:
+            return policy
+
+        name = self.default
+        for role in self.role_order:
+            if role not in roles:
+                continue
+            if (role, kind) in self.rules:
+                name = self.rules[(role, kind)]
+                break
+            if (role, None) in self.rules:
+                name = self.rules[(role, None)]
+                break
+        else:
+            name = self.rules.get((None, kind), self.default)
+
+        policy = self._resolved[cache_key] = self.policies[name]
+        return policy
+
+    def status(self, staff_id: int, roles: Sequence[str], kind: Optional[str] = None,
+               now: Optional[int] = None) -> QuotaStatus:
+        """
+        Get current quota status (read-only)
+
+        Args:
+            staff_id: Discord user ID
+            roles: Role keys of the member (e.g. ["staff"])
+            kind: Ticket kind (e.g. "premium")
+            now: Epoch seconds (defaults to current time)
+        """
+        if now is None:
+            now = int(time.time())
+        policy = self.resolve(roles, kind)
+        state = self.states[policy.name].get(staff_id)
+        if state is None:
+            return QuotaStatus(True, 0, 0, policy.limit, policy.name)
+        return policy.check(state, now)
+
+    def record_claim(self, staff_id: int, roles: Sequence[str], kind: Optional[str] = None,
+                     now: Optional[int] = None) -> QuotaStatus:
+        """
+        Record a claim (the only write path)
+
+        Returns:
+            Status after the claim
+        """
+        if now is None:
+            now = int(time.time())
+        policy = self.resolve(roles, kind)
+        if policy.limit is None:
+            return policy.check(None, now)  # Nothing to track
+        states = self.states[policy.name]
+        state = states.get(staff_id)
+        if state is None:
+            state = states[staff_id] = policy.new_state(now)
+        policy.consume(state, now)
+        return policy.check(state, now)
+
+    def evaluate(self, roster: Roster, kind: Optional[str] = None,
+                 now: Optional[int] = None) -> Dict[int, QuotaStatus]:
+        """
+        Evaluate the whole roster in one pass
+
+        Args:
+            roster: Iterable of (staff_id, role keys)
+            kind: Ticket kind
+            now: Epoch seconds, shared by every member
+
+        Returns:
+            staff_id -> QuotaStatus
+        """
+        if now is None:
+            now = int(time.time())
+        return {staff_id: self.status(staff_id, roles, kind, now) for staff_id, roles in roster}
+
+    def eligible(self, roster: Roster, kind: Optional[str] = None, now: Optional[int] = None) -> List[int]:
+        """Staff IDs that can claim right now"""
+        return [staff_id for staff_id, st in self.evaluate(roster, kind, now).items() if st.allowed]
+
+    def load(self, data: dict):
+        """
+        Load state from cooldowns.json
+
+        Accepts the legacy flat format ({staff_id: hybrid record}),
+        which is loaded into the default policy.
+        """
+        for states in self.states.values():
+            states.clear()
+
+        if "policies" in data:
+            sections = data["policies"]
+        else:
+            sections = {self.default: data}
+
+        for name, entries in sections.items():
+            policy = self.policies.get(name)
+            if policy is None:
+                logger.warning(f"Dropping state for unknown quota policy: {name}")
+                continue
+            for staff_key, raw in entries.items():
+                try:
+                    self.states[name][int(staff_key)] = policy.restore(raw)
+                except (TypeError, ValueError, AttributeError, IndexError) as e:
+                    logger.warning(f"Skipping invalid quota entry {name}/{staff_key}: {e}")
+
+    def to_json(self) -> dict:
+        """Serialize state for cooldowns.json"""
+        return {
+            "policies": {
+                name: {
+                    str(staff_id): self.policies[name].dump(state)
+                    for staff_id, state in states.items()
+                }
+                for name, states in self.states.items()
+                if states
+            }
+        }
@@ -0,0 +1,693 @@
+"""
+Sales Indexes for VoraHub Bot
+Keeps derived sales views up to date as sales are recorded
+
+Key Features:
+- Compact in-memory sales: array('q') columns + interned descriptions
+- Paged history over paid and unpaid periods without building full lists
+- Per-staff archive index (sale count per period): a page only loads the
+  archives it overlaps
+- Append-only per-staff ledger segments (sales + payouts)
+- Paid periods rolled into gzip archive segments that are never rewritten
+- Leaderboard index with running totals and transaction counts
+- Sorted order maintained incrementally (no re-sort per /sales call)
+- Day / ISO week / month rollups per staff member and globally
+- Rollups record how far into the ledger they are and replay the tail on load
+"""
+
+import os
+import gzip
+import json
+import bisect
+import datetime
+import logging
+import functools
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import canonical_json
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------------------
+# COMPACT SALES RECORDS
+# ---------------------------
+_EPOCH = datetime.datetime(1970, 1, 1)
+_MICROSECOND = datetime.timedelta(microseconds=1)
+
+
+def to_micros(ts: datetime.datetime) -> int:
+    """Naive datetime -> integer microseconds (exact round-trip)"""
+    return (ts - _EPOCH) // _MICROSECOND
+
+
+def from_micros(value: int) -> datetime.datetime:
+    """Integer microseconds -> naive datetime"""
+    return _EPOCH + datetime.timedelta(microseconds=value)
+
+
+class SaleRecord(NamedTuple):
+    """One sale, materialized only when displayed"""
+    amount: int
+    description: str
+    timestamp: datetime.datetime
+
+
+class DescriptionTable:
+    """Interned sale descriptions shared by every staff member"""
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def intern(self, text: str) -> int:
+        idx = self._ids.get(text)
+        if idx is None:
+            idx = self._ids[text] = len(self.values)
+            self.values.append(text)
+        return idx
+
+
+class StaffSales:
+    """Unpaid sales of one staff member stored as parallel columns"""
+
+    __slots__ = ("total", "amounts", "timestamps", "descriptions", "_table")
+
+    def __init__(self, table: DescriptionTable):
+        self.total = 0
+        self.amounts = array("q")
+        self.timestamps = array("q")    # Epoch microseconds (naive local time)
+        self.descriptions = array("I")  # Index into the description table
+        self._table = table
+
+    def append(self, amount: int, description: str, ts: datetime.datetime):
+        self.amounts.append(amount)
+        self.timestamps.append(to_micros(ts))
+        self.descriptions.append(self._table.intern(description))
+        self.total += amount
+
+    def __len__(self) -> int:
+        return len(self.amounts)
+
+    def record(self, idx: int) -> SaleRecord:
+        """Materialize one sale (supports negative indexes)"""
+        return SaleRecord(
+            self.amounts[idx],
+            self._table.values[self.descriptions[idx]],
+            from_micros(self.timestamps[idx])
+        )
+
+    def recent(self, n: int) -> List[SaleRecord]:
+        """Last `n` sales, newest first"""
+        return self.page(0, n)
+
+    def page(self, offset: int, size: int, newest_first: bool = True) -> List[SaleRecord]:
+        """
+        `size` sales starting `offset` entries from the newest (or oldest) end
+
+        Only the returned entries are materialized.
+        """
+        count = len(self.amounts)
+        if newest_first:
+            stop = count - offset
+            return [self.record(i) for i in range(stop - 1, max(stop - size, 0) - 1, -1)]
+        return [self.record(i) for i in range(offset, min(offset + size, count))]
+
+
+class SalesBook:
+    """Unpaid sales for every staff member"""
+
+    def __init__(self):
+        self.table = DescriptionTable()
+        self.staff: Dict[int, StaffSales] = {}
+        self._empty = StaffSales(self.table)
+
+    def get(self, staff_id: int) -> StaffSales:
+        """Sales for a staff member (a shared empty record if none; do not mutate it)"""
+        return self.staff.get(staff_id, self._empty)
+
+    def __contains__(self, staff_id: int) -> bool:
+        return staff_id in self.staff
+
+    def items(self):
+        return self.staff.items()
+
+    def add(self, staff_id: int, amount: int, description: str, ts: datetime.datetime):
+        sales = self.staff.get(staff_id)
+        if sales is None:
+            sales = self.staff[staff_id] = StaffSales(self.table)
+        sales.append(amount, description, ts)
+
+    def reset(self, staff_id: int):
+        """Drop a staff member's unpaid sales (after payout)"""
+        self.staff[staff_id] = StaffSales(self.table)
+
+
+class SalesHistory:
+    """
+    Paged view over one staff member's full history (paid + unpaid)
+
+    A page is located with a bisect over the cumulative period sizes.
+    Paid periods are only loaded when a page overlaps them, and only the
+    page's rows are materialized.
+    """
+
+    def __init__(self, archived: List[Tuple[int, Callable[[], StaffSales]]], unpaid: StaffSales):
+        """
+        Args:
+            archived: (sale count, loader) per paid period, oldest first
+            unpaid: Current (unpaid) period
+        """
+        self._loaders: List[Callable[[], StaffSales]] = [loader for count, loader in archived if count]
+        self._loaded: Dict[int, StaffSales] = {}  # Segment index -> sales
+        sizes = [count for count, _ in archived if count]
+        self.paid_count = sum(sizes)
+        if len(unpaid):
+            self._loaded[len(sizes)] = unpaid
+            sizes.append(len(unpaid))
+        self._starts: List[int] = []  # Global index of each segment's first sale
+        count = 0
+        for size in sizes:
+            self._starts.append(count)
+            count += size
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def page_count(self, size: int) -> int:
+        return max(1, -(-self._count // size))
+
+    def segment(self, seg: int) -> StaffSales:
+        """Sales of one period, loading a paid period on first use"""
+        sales = self._loaded.get(seg)
+        if sales is None:
+            sales = self._loaded[seg] = self._loaders[seg]()
+        return sales
+
+    def _at(self, idx: int) -> SaleRecord:
+        seg = bisect.bisect_right(self._starts, idx) - 1
+        return self.segment(seg).record(idx - self._starts[seg])
+
+    def page(self, page: int, size: int, newest_first: bool = True) -> List[Tuple[SaleRecord, bool]]:
+        """
+        One page of history
+
+        Args:
+            page: Zero-based page number
+            size: Sales per page
+            newest_first: Page 0 holds the newest sales (otherwise the oldest)
+
+        Returns:
+            List of (sale, paid) tuples in display order
+        """
+        offset = page * size
+        if newest_first:
+            stop = self._count - offset
+            indexes = range(stop - 1, max(stop - size, 0) - 1, -1)
+        else:
+            indexes = range(offset, min(offset + size, self._count))
+        return [(self._at(i), i < self.paid_count) for i in indexes]
+
+
+# ---------------------------
+# APPEND-ONLY LEDGER
+# ---------------------------
+class SalesLedger:
+    """
+    Append-only sales/payout ledger, one directory per staff member
+
+    Layout:
+        <root>/<staff_id>/open.jsonl                  unpaid events (appended)
+        <root>/<staff_id>/paid-<timestamp>.jsonl.gz   archived paid periods
+        <root>/<staff_id>/archives.json               sale count per archive
+    """
+
+    OPEN_SEGMENT = "open.jsonl"
+    ARCHIVE_INDEX = "archives.json"  # Archive name -> sale count
+    ARCHIVE_CACHE_SIZE = 64
+
+    def __init__(self, root: str):
+        self.root = root
+        # Decoded archives (never rewritten, so safe to cache by path)
+        self._archive_cache: "OrderedDict[str, StaffSales]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._counts: Dict[int, Dict[str, int]] = {}  # staff_id -> archive index
+        self._index_lock = threading.Lock()
+
+    def _staff_dir(self, staff_id: int) -> str:
+        return os.path.join(self.root, str(staff_id))
+
+    def open_path(self, staff_id: int) -> str:
+        """Path of a staff member's open segment"""
+        return os.path.join(self._staff_dir(staff_id), self.OPEN_SEGMENT)
+
+    def exists(self) -> bool:
+        return os.path.isdir(self.root)
+
+    def staff_ids(self) -> List[int]:
+        """Staff members with a ledger directory"""
+        if not self.exists():
+            return []
+        return sorted(int(name) for name in os.listdir(self.root) if name.isdigit())
+
+    @staticmethod
+    def _read_lines(lines: Iterable[str], source: str) -> Iterator[dict]:
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # Torn write at the tail after a crash
+                logger.warning(f"Skipping invalid ledger line in {source}")
+
+    def _read_open(self, staff_id: int) -> List[dict]:
+        path = self.open_path(staff_id)
+        if not os.path.exists(path):
+            return []
+        with open(path, "r", encoding="utf-8") as f:
+            return list(self._read_lines(f, path))
+
+    def _append(self, staff_id: int, event: dict):
+        os.makedirs(self._staff_dir(staff_id), exist_ok=True)
+        with open(self.open_path(staff_id), "a", encoding="utf-8") as f:
+            f.write(canonical_json.dumps_line(event) + "\n")
+
+    def archive_paths(self, staff_id: int) -> List[str]:
+        """Archived paid segments, oldest first"""
+        staff_dir = self._staff_dir(staff_id)
+        if not os.path.isdir(staff_dir):
+            return []
+        names = [n for n in os.listdir(staff_dir) if n.startswith("paid-") and n.endswith(".jsonl.gz")]
+        return [os.path.join(staff_dir, n) for n in sorted(names, key=self._archive_order)]
+
+    @staticmethod
+    def _archive_order(name: str) -> Tuple[str, int]:
+        """paid-<stamp>[-<n>].jsonl.gz -> (stamp, n): same-second archives in creation order"""
+        stem = name[len("paid-"):-len(".jsonl.gz")]
+        return stem[:15], int(stem[16:] or 0)
+
+    def _archive(self, staff_id: int, events: List[dict], recovering: bool = False) -> str:
+        """Write a closed period (ending with its payout event) to a new gzip segment"""
+        stamp = datetime.datetime.fromisoformat(events[-1]["timestamp"]).strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(self._staff_dir(staff_id), f"paid-{stamp}.jsonl.gz")
+        suffix = 1
+        # Archives are never overwritten, except to finish the same interrupted payout
+        while os.path.exists(path) and not (recovering and self._holds(path, events)):
+            path = os.path.join(self._staff_dir(staff_id), f"paid-{stamp}-{suffix}.jsonl.gz")
+            suffix += 1
+        tmp_path = path + ".tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            for event in events:
+                f.write(canonical_json.dumps_line(event) + "\n")
+        os.replace(tmp_path, path)
+        self._index_archive(staff_id, os.path.basename(path), sum(1 for e in events if e.get("type") == "sale"))
+        # Start a fresh open segment (kept as an empty file so backups see the change)
+        open(self.open_path(staff_id), "w").close()
+        return path
+
+    def _holds(self, path: str, events: List[dict]) -> bool:
+        """True if the archive at `path` already holds exactly `events`"""
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                return list(self._read_lines(f, path)) == events
+        except (OSError, EOFError):
+            return False
+
+    def load_archive(self, path: str) -> StaffSales:
+        """Sales of one archived period as compact columns (LRU cached)"""
+        with self._cache_lock:
+            sales = self._archive_cache.get(path)
+            if sales is not None:
+                self._archive_cache.move_to_end(path)
+                return sales
+
+        sales = StaffSales(DescriptionTable())
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for e in self._read_lines(f, path):
+                if e.get("type") == "sale":
+                    sales.append(e["amount"], e["description"], datetime.datetime.fromisoformat(e["timestamp"]))
+
+        with self._cache_lock:
+            self._archive_cache[path] = sales
+            while len(self._archive_cache) > self.ARCHIVE_CACHE_SIZE:
+                self._archive_cache.popitem(last=False)
+        return sales
+
+    # Archive index -------------------------------------------------------
+
+    def _read_index(self, staff_id: int) -> Dict[str, int]:
+        path = os.path.join(self._staff_dir(staff_id), self.ARCHIVE_INDEX)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return {str(name): int(count) for name, count in data.items()}
+        except (OSError, ValueError, TypeError, AttributeError):
+            return {}  # Missing or corrupt: counted again from the archives
+
+    def _write_index(self, staff_id: int, counts: Dict[str, int]):
+        path = os.path.join(self._staff_dir(staff_id), self.ARCHIVE_INDEX)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(canonical_json.dumps_line(counts))
+        os.replace(tmp_path, path)
+        self._counts[staff_id] = counts
+
+    def _index_archive(self, staff_id: int, name: str, sales: int):
+        with self._index_lock:
+            counts = self._counts.get(staff_id)
+            counts = dict(self._read_index(staff_id) if counts is None else counts)
+            counts[name] = sales
+            self._write_index(staff_id, counts)
+
+    def archive_counts(self, staff_id: int) -> List[Tuple[str, int]]:
+        """
+        (path, sale count) of every archived period, oldest first
+
+        Counts come from the staff member's archive index. Archives missing
+        from it (written before the index existed, or restored without it)
+        are counted once and added.
+        """
+        paths = self.archive_paths(staff_id)
+        with self._index_lock:
+            counts = self._counts.get(staff_id)
+            if counts is None:
+                counts = self._counts[staff_id] = self._read_index(staff_id)
+            missing = [path for path in paths if os.path.basename(path) not in counts]
+            if missing:
+                counts = dict(counts)
+                for path in missing:
+                    counts[os.path.basename(path)] = len(self.load_archive(path))
+                self._write_index(staff_id, counts)
+        return [(path, counts[os.path.basename(path)]) for path in paths]
+
+    def history(self, staff_id: int, book: SalesBook) -> SalesHistory:
+        """
+        Full paged history for a staff member
+
+        Only the archive index is read here; archives are loaded (through
+        the LRU cache) when a page that overlaps them is rendered.
+
+        Args:
+            staff_id: Staff member
+            book: Unpaid sales book (current period)
+        """
+        archived = [
+            (count, functools.partial(self.load_archive, path))
+            for path, count in self.archive_counts(staff_id)
+        ]
+        return SalesHistory(archived, book.get(staff_id))
+
+    def load_open(self, book: SalesBook):
+        """
+        Load unpaid balances from every open segment into `book`
+
+        Finishes any payout whose archiving was interrupted.
+        """
+        for staff_id in self.staff_ids():
+            events = self._read_open(staff_id)
+            if events and events[-1].get("type") == "payout":
+                logger.warning(f"Completing interrupted payout archive for {staff_id}")
+                self._archive(staff_id, events, recovering=True)
+                continue
+
+            for e in events:
+                if e.get("type") == "sale":
+                    book.add(staff_id, e["amount"], e["description"], datetime.datetime.fromisoformat(e["timestamp"]))
+
+    def append_sale(self, staff_id: int, entry: dict):
+        """Append a sale event (O(1))"""
+        self._append(staff_id, {"type": "sale", **entry})
+
+    def close_period(self, staff_id: int, payout: dict) -> str:
+        """
+        Append a payout event and roll the open segment into an archive
+
+        Args:
+            staff_id: Staff member being paid
+            payout: Payout details (amount, timestamp, ...)
+
+        Returns:
+            Path of the new archive segment
+        """
+        self._append(staff_id, {"type": "payout", **payout})
+        return self._archive(staff_id, self._read_open(staff_id))
+
+    def iter_events(self, staff_id: Optional[int] = None) -> Iterator[Tuple[int, dict]]:
+        """
+        Stream every event, archives first then the open segment
+
+        Args:
+            staff_id: Only this staff member (default: everyone)
+        """
+        staff_ids = [staff_id] if staff_id is not None else self.staff_ids()
+        for sid in staff_ids:
+            for path in self.archive_paths(sid):
+                with gzip.open(path, "rt", encoding="utf-8") as f:
+                    for event in self._read_lines(f, path):
+                        yield sid, event
+            for event in self._read_open(sid):
+                yield sid, event
+
+    def iter_sales(self, staff_id: Optional[int] = None) -> Iterator[Tuple[int, dict]]:
+        """Stream every sale event (paid and unpaid)"""
+        for sid, event in self.iter_events(staff_id):
+            if event.get("type") == "sale":
+                yield sid, event
+
+    def iter_sales_after(self, staff_id: int, after: datetime.datetime) -> Iterator[dict]:
+        """
+        Sale events of one staff member recorded after `after`
+
+        Archives whose payout happened before `after` only hold older sales
+        and are skipped, so this normally reads just the open segment.
+        """
+        paths = []
+        for path in self.archive_paths(staff_id):
+            stamp = datetime.datetime.strptime(os.path.basename(path)[5:20], "%Y%m%d-%H%M%S")
+            if stamp + datetime.timedelta(seconds=1) > after:  # Stamp is truncated to seconds
+                paths.append(path)
+        for path in paths:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                events = list(self._read_lines(f, path))
+            yield from self._sales_after(events, after)
+        yield from self._sales_after(self._read_open(staff_id), after)
+
+    @staticmethod
+    def _sales_after(events: Iterable[dict], after: datetime.datetime) -> Iterator[dict]:
+        for event in events:
+            if event.get("type") == "sale" and datetime.datetime.fromisoformat(event["timestamp"]) > after:
+                yield event
+
+    def import_legacy(self, sales_data: dict):
+        """One-time import of the old sales.json layout into open segments"""
+        for staff_key, data in sales_data.items():
+            for sale in data.get("sales", []):
+                self.append_sale(int(staff_key), sale)
+
+
+class LeaderboardRow:
+    """Cached leaderboard entry for one staff member"""
+
+    __slots__ = ("staff_id", "total", "count")
+
+    def __init__(self, staff_id: int, total: int = 0, count: int = 0):
+        self.staff_id = staff_id
+        self.total = total
+        self.count = count
+
+
+class LeaderboardIndex:
+    """Sales leaderboard maintained incrementally by add_sale / reset_sales"""
+
+    def __init__(self):
+        self.rows: Dict[int, LeaderboardRow] = {}
+        self._order: List[Tuple[int, int]] = []  # Sorted (-total, staff_id)
+        self.total_sales = 0
+        self.total_transactions = 0
+
+    def rebuild(self, book: SalesBook):
+        """Rebuild from the unpaid sales book"""
+        self.rows.clear()
+        self.total_sales = 0
+        self.total_transactions = 0
+        for staff_id, sales in book.items():
+            row = LeaderboardRow(staff_id, sales.total, len(sales))
+            self.rows[row.staff_id] = row
+            self.total_sales += row.total
+            self.total_transactions += row.count
+        self._order = sorted((-row.total, row.staff_id) for row in self.rows.values())
+
+    def _unlink(self, row: LeaderboardRow):
+        idx = bisect.bisect_left(self._order, (-row.total, row.staff_id))
+        del self._order[idx]
+
+    def _link(self, row: LeaderboardRow):
+        bisect.insort(self._order, (-row.total, row.staff_id))
+
+    def add(self, staff_id: int, amount: int):
+        """Record a sale"""
+        row = self.rows.get(staff_id)
+        if row is None:
+            row = self.rows[staff_id] = LeaderboardRow(staff_id)
+        else:
+            self._unlink(row)
+        row.total += amount
+        row.count += 1
+        self._link(row)
+        self.total_sales += amount
+        self.total_transactions += 1
+
+    def reset(self, staff_id: int):
+        """Zero a staff member's totals (salary paid)"""
+        row = self.rows.get(staff_id)
+        if row is None:
+            return
+        self._unlink(row)
+        self.total_sales -= row.total
+        self.total_transactions -= row.count
+        row.total = 0
+        row.count = 0
+        self._link(row)
+
+    def ranked(self) -> Iterator[LeaderboardRow]:
+        """Rows from highest to lowest total"""
+        for _, staff_id in self._order:
+            yield self.rows[staff_id]
+
+
+# ---------------------------
+# PERIOD ROLLUPS
+# ---------------------------
+ROLLUP_RESOLUTIONS = ("day", "week", "month")
+ALL_STAFF = "*"  # Global bucket entry
+
+
+def bucket_keys(ts: datetime.datetime) -> Tuple[str, str, str]:
+    """Day, ISO week and month bucket keys for a timestamp"""
+    year, week, _ = ts.isocalendar()
+    return ts.strftime("%Y-%m-%d"), f"{year}-W{week:02d}", ts.strftime("%Y-%m")
+
+
+def period_key(resolution: str, now: datetime.datetime, offset: int = 0) -> str:
+    """
+    Bucket key for the period containing `now`, shifted by `offset` periods
+
+    Args:
+        resolution: "day", "week" or "month"
+        now: Reference time
+        offset: 0 = current period, -1 = previous period, ...
+    """
+    if resolution == "day":
+        return bucket_keys(now + datetime.timedelta(days=offset))[0]
+    if resolution == "week":
+        return bucket_keys(now + datetime.timedelta(weeks=offset))[1]
+    if resolution == "month":
+        month_index = now.year * 12 + now.month - 1 + offset
+        return f"{month_index // 12}-{month_index % 12 + 1:02d}"
+    raise ValueError(f"Unknown rollup resolution: {resolution}")
+
+
+class SalesRollups:
+    """
+    Pre-aggregated sales per period, maintained by add_sale
+
+    A cache of the ledger: `applied` holds the timestamp of the newest sale
+    counted per staff member, so sales appended after the last save (e.g.
+    before a crash) are replayed from the ledger by catch_up.
+    """
+
+    def __init__(self):
+        # resolution -> bucket key -> staff key (or ALL_STAFF) -> [total, count]
+        self.buckets: Dict[str, Dict[str, Dict[str, List[int]]]] = {res: {} for res in ROLLUP_RESOLUTIONS}
+        self.applied: Dict[str, str] = {}  # staff key -> ISO timestamp of newest counted sale
+
+    def add(self, staff_id: int, amount: int, ts: datetime.datetime):
+        """Record a sale in every resolution"""
+        staff_key = str(staff_id)
+        newest = self.applied.get(staff_key)
+        if newest is None or ts > datetime.datetime.fromisoformat(newest):
+            self.applied[staff_key] = ts.isoformat()
+        for res, key in zip(ROLLUP_RESOLUTIONS, bucket_keys(ts)):
+            bucket = self.buckets[res].setdefault(key, {})
+            for entry_key in (staff_key, ALL_STAFF):
+                entry = bucket.get(entry_key)
+                if entry is None:
+                    bucket[entry_key] = [amount, 1]
+                else:
+                    entry[0] += amount
+                    entry[1] += 1
+
+    def rebuild(self, sales: Iterable[Tuple[int, dict]]):
+        """Rebuild all rollups from the raw ledger ((staff_id, sale entry) pairs)"""
+        self.buckets = {res: {} for res in ROLLUP_RESOLUTIONS}
+        self.applied = {}
+        for staff_id, sale in sales:
+            self.add(staff_id, sale["amount"], datetime.datetime.fromisoformat(sale["timestamp"]))
+
+    def load(self, data: dict) -> bool:
+        """
+        Load rollups from JSON data
+
+        Returns:
+            False if the data has no recorded position (older format) and
+            the rollups must be rebuilt instead
+        """
+        if not isinstance(data.get("applied"), dict):
+            return False
+        self.buckets = {res: data.get(res, {}) for res in ROLLUP_RESOLUTIONS}
+        self.applied = dict(data["applied"])
+        return True
+
+    def catch_up(self, ledger: SalesLedger) -> int:
+        """
+        Count ledger sales recorded after the loaded position
+
+        Returns:
+            Number of sales replayed
+        """
+        replayed = 0
+        for staff_id in ledger.staff_ids():
+            newest = self.applied.get(str(staff_id))
+            after = datetime.datetime.fromisoformat(newest) if newest else datetime.datetime.min
+            for sale in ledger.iter_sales_after(staff_id, after):
+                self.add(staff_id, sale["amount"], datetime.datetime.fromisoformat(sale["timestamp"]))
+                replayed += 1
+        return replayed
+
+    def to_json(self) -> dict:
+        """Serialize rollups with their ledger position"""
+        return {**self.buckets, "applied": self.applied}
+
+    def totals(self, resolution: str, key: str, staff_id: Optional[int] = None) -> Tuple[int, int]:
+        """
+        Sales in one bucket
+
+        Args:
+            resolution: "day", "week" or "month"
+            key: Bucket key (see period_key)
+            staff_id: Staff member, or None for all staff
+
+        Returns:
+            (total: int, count: int)
+        """
+        entry_key = ALL_STAFF if staff_id is None else str(staff_id)
+        entry = self.buckets[resolution].get(key, {}).get(entry_key)
+        return (entry[0], entry[1]) if entry else (0, 0)
+
+    def ranked(self, resolution: str, key: str) -> List[Tuple[int, int, int]]:
+        """
+        Per-staff totals in one bucket, highest first
+
+        Returns:
+            List of (staff_id, total, count)
+        """
+        bucket = self.buckets[resolution].get(key, {})
+        rows = [(int(k), v[0], v[1]) for k, v in bucket.items() if k != ALL_STAFF]
+        rows.sort(key=lambda r: r[1], reverse=True)
+        return rows
@@ -0,0 +1,141 @@
+"""
+Graceful Shutdown Coordinator for VoraHub Bot
+Runs ordered shutdown steps under one deadline on SIGTERM / SIGINT / close
+
+Key Features:
+- Signal handlers on the running event loop (SIGTERM, SIGINT)
+- Idempotent: signals, Client.close and normal exit share one shutdown run
+- Ordered steps (async, sync or blocking-in-thread) with the remaining time budget
+- Per-step timing report (ok / failed / timeout / skipped)
+"""
+
+import time
+import signal
+import asyncio
+import logging
+import inspect
+import contextvars
+from typing import Awaitable, Callable, List, NamedTuple, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+StepCallback = Callable[..., Union[None, Awaitable[None]]]
+
+# Set inside the shutdown task; copied into every task a step starts
+_in_shutdown: contextvars.ContextVar[bool] = contextvars.ContextVar("in_shutdown", default=False)
+
+
+class StepReport(NamedTuple):
+    """Outcome of one shutdown step"""
+    name: str
+    status: str      # "ok", "failed", "timeout" or "skipped"
+    seconds: float
+    detail: str = ""
+
+
+class ShutdownStep(NamedTuple):
+    name: str
+    callback: StepCallback
+    blocking: bool       # Run in a worker thread
+    pass_timeout: bool   # Callback accepts the remaining seconds
+
+
+class ShutdownCoordinator:
+    """Runs registered shutdown steps once, in order, within a deadline"""
+
+    def __init__(self, deadline: float = 30.0):
+        """
+        Args:
+            deadline: Total seconds allowed for all steps
+        """
+        self.deadline = deadline
+        self.steps: List[ShutdownStep] = []
+        self.started = False
+        self.reason: Optional[str] = None
+        self.report: List[StepReport] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def add_step(self, name: str, callback: StepCallback, blocking: bool = False, pass_timeout: bool = False):
+        """
+        Register a step (runs in registration order)
+
+        Args:
+            name: Label used in the timing report
+            callback: Plain function, or one returning an awaitable
+            blocking: Run a plain function in a worker thread
+            pass_timeout: Call with the remaining seconds as the only argument
+        """
+        self.steps.append(ShutdownStep(name, callback, blocking, pass_timeout))
+
+    def install_signal_handlers(self, loop: asyncio.AbstractEventLoop,
+                                signals=(signal.SIGTERM, signal.SIGINT)):
+        """Start shutdown when the process receives one of `signals`"""
+        for sig in signals:
+            try:
+                loop.add_signal_handler(sig, self.trigger, sig.name)
+            except (NotImplementedError, RuntimeError):
+                # Windows event loops have no add_signal_handler
+                signal.signal(sig, lambda signum, frame: loop.call_soon_threadsafe(self.trigger, signal.Signals(signum).name))
+
+    def trigger(self, reason: str):
+        """Start shutdown without waiting for it (signal handler entry point)"""
+        if self._task is None:
+            logger.info(f"Shutdown requested ({reason})")
+            self.started = True  # Interactions are rejected from now on
+            self.reason = reason
+            self._task = asyncio.get_running_loop().create_task(self._run(reason))
+
+    async def run(self, reason: str) -> List[StepReport]:
+        """
+        Shut down (or wait for the shutdown already in progress)
+
+        Returns:
+            Timing report of every step
+        """
+        if _in_shutdown.get():
+            return self.report  # Called from inside a step (e.g. Client.close)
+        self.trigger(reason)
+        return await asyncio.shield(self._task)
+
+    async def _run_step(self, step: ShutdownStep, remaining: float):
+        args = (remaining,) if step.pass_timeout else ()
+        if step.blocking:
+            await asyncio.wait_for(asyncio.to_thread(step.callback, *args), remaining)
+            return
+        result = step.callback(*args)
+        if inspect.isawaitable(result):
+            await asyncio.wait_for(result, remaining)
+
+    async def _run(self, reason: str) -> List[StepReport]:
+        _in_shutdown.set(True)
+        started = time.monotonic()
+        deadline = started + self.deadline
+
+        for step in self.steps:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.report.append(StepReport(step.name, "skipped", 0.0, "deadline reached"))
+                continue
+            step_started = time.monotonic()
+            try:
+                await self._run_step(step, remaining)
+                status, detail = "ok", ""
+            except asyncio.TimeoutError:
+                status, detail = "timeout", f"after {remaining:.1f}s"
+            except Exception as e:
+                status, detail = "failed", str(e)
+                logger.exception(f"Shutdown step {step.name} failed")
+            self.report.append(StepReport(step.name, status, time.monotonic() - step_started, detail))
+
+        logger.info(f"Shutdown ({reason}) finished in {time.monotonic() - started:.2f}s")
+        return self.report
+
+    def format_report(self) -> str:
+        """Human readable timing report"""
+        icons = {"ok": "✓", "failed": "✗", "timeout": "⏱", "skipped": "-"}
+        lines = [f"Shutdown ({self.reason}), deadline {self.deadline:.0f}s:"]
+        for entry in self.report:
+            detail = f" ({entry.detail})" if entry.detail else ""
+            lines.append(f"  {icons.get(entry.status, '?')} {entry.name:<18} {entry.seconds:6.2f}s {entry.status}{detail}")
+        lines.append(f"  total {sum(entry.seconds for entry in self.report):.2f}s")
+        return "\n".join(lines)
@@ -0,0 +1,194 @@
+"""
+State Store Registry for VoraHub Bot
+Every persisted structure declares its path, serializer and backup policy
+
+Key Features:
+- One place that knows every state file (backup coverage, startup restore)
+- Atomic writes; the exact bytes written are handed to the backup
+- Dirty stores are collected and backed up together: one commit per flush
+- save_later for stores that change on every event (written once per flush)
+- Append-only files (ledger segments, event logs) tracked by path
+"""
+
+import os
+import asyncio
+import logging
+import threading
+from typing import Any, Callable, Dict, NamedTuple, Optional, Set
+
+import canonical_json
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Receives {repo-relative path: bytes or None (read the file)} for one commit
+BackupSink = Callable[[Dict[str, Optional[bytes]]], None]
+
+
+class StateStore(NamedTuple):
+    """A registered persisted structure"""
+    name: str
+    path: str                              # Absolute path (file, or directory for file stores)
+    dump: Optional[Callable[[], Any]]      # Current in-memory state (None = written elsewhere)
+    serializer: Callable[[Any], bytes]
+    backup: bool                           # Included in git backups
+    json_type: Optional[type]              # Expected top-level JSON type (startup validation)
+
+
+class StoreRegistry:
+    """
+    Registry of state stores with batched backups
+
+    `save(name)` writes a store to disk right away and marks it dirty; dirty
+    stores are handed to the backup together `flush_delay` seconds after the
+    first change (right away when there is no running event loop).
+    """
+
+    def __init__(self, base_dir: str, backup_sink: Optional[BackupSink] = None, flush_delay: float = 0.5):
+        """
+        Args:
+            base_dir: Bot directory (paths are backed up relative to it)
+            backup_sink: Queues one batch of files for backup
+            flush_delay: Seconds to gather saves into one flush
+        """
+        self.base_dir = base_dir
+        self.backup_sink = backup_sink
+        self.flush_delay = flush_delay
+        self.stores: Dict[str, StateStore] = {}
+        self._dirty: Dict[str, Optional[bytes]] = {}  # relpath -> payload (None = read the file)
+        self._deferred: Set[str] = set()              # Stores to write at the next flush
+        self._lock = threading.Lock()
+        self._flush_scheduled = False
+        self.flushes = 0
+
+    def register(self, name: str, path: str, dump: Callable[[], Any],
+                 serializer: Callable[[Any], bytes] = canonical_json.dumps,
+                 backup: bool = True, json_type: Optional[type] = dict) -> StateStore:
+        """
+        Register a JSON state file written from memory
+
+        Args:
+            name: Store name (used with save)
+            path: File path (absolute, or relative to base_dir)
+            dump: Returns the JSON-compatible state to write
+            serializer: Turns the state into bytes (default: canonical layout)
+            backup: Include in git backups
+            json_type: Expected top-level JSON type (None = skip validation)
+        """
+        store = StateStore(name, os.path.join(self.base_dir, path), dump, serializer, backup, json_type)
+        self.stores[name] = store
+        return store
+
+    def register_files(self, name: str, path: str, backup: bool = True) -> StateStore:
+        """
+        Register files that are written elsewhere (append-only logs, ledger segments)
+
+        Args:
+            name: Store name (used with touch)
+            path: File or directory (absolute, or relative to base_dir)
+            backup: Include in git backups
+        """
+        store = StateStore(name, os.path.join(self.base_dir, path), None, canonical_json.dumps, backup, None)
+        self.stores[name] = store
+        return store
+
+    def json_files(self) -> Dict[str, type]:
+        """Relative path -> expected JSON type of every validated JSON store"""
+        return {
+            os.path.relpath(store.path, self.base_dir): store.json_type
+            for store in self.stores.values() if store.dump and store.json_type
+        }
+
+    # Writing -------------------------------------------------------------
+
+    def _write(self, store: StateStore) -> bytes:
+        with span("state_io", store.name):
+            payload = store.serializer(store.dump())
+            tmp_path = store.path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, store.path)
+        return payload
+
+    def save(self, name: str):
+        """Write a store atomically and mark it for the next backup flush"""
+        store = self.stores[name]
+        payload = self._write(store)
+        if store.backup:
+            self._mark(os.path.relpath(store.path, self.base_dir), payload)
+
+    def save_later(self, name: str):
+        """Write a store at the next flush (many changes within flush_delay = one write)"""
+        with self._lock:
+            self._deferred.add(name)
+        self._schedule()
+
+    def save_all(self):
+        """Write every registered JSON store (e.g. on shutdown)"""
+        for name, store in self.stores.items():
+            if store.dump:
+                self.save(name)
+
+    def touch(self, name: str, *paths: str):
+        """
+        Mark files of a file store as changed (read from disk at backup time)
+
+        Args:
+            name: Registered file store
+            paths: Absolute paths of the changed files (default: the store path)
+        """
+        store = self.stores[name]
+        if store.backup:
+            for path in paths or (store.path,):
+                self._mark(os.path.relpath(path, self.base_dir), None)
+
+    def _mark(self, relpath: str, payload: Optional[bytes]):
+        with self._lock:
+            self._dirty[relpath] = payload
+        self._schedule()
+
+    def _schedule(self):
+        with self._lock:
+            if self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Startup code / worker threads: no loop to gather saves on
+            self.flush()
+            return
+        loop.call_later(self.flush_delay, self.flush)
+
+    def flush(self) -> int:
+        """
+        Write deferred stores, then hand every dirty store to the backup as one batch
+
+        Returns:
+            Number of files handed over
+        """
+        with self._lock:
+            deferred, self._deferred = self._deferred, set()
+        for name in deferred:
+            store = self.stores[name]
+            payload = self._write(store)
+            if store.backup:
+                with self._lock:
+                    self._dirty[os.path.relpath(store.path, self.base_dir)] = payload
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+            self._flush_scheduled = False
+        if not dirty or not self.backup_sink:
+            return 0
+        try:
+            self.backup_sink(dirty)
+        except Exception as e:
+            logger.error(f"Backup of {', '.join(dirty)} failed: {e}")
+            return 0
+        self.flushes += 1
+        return len(dirty)
+
+    def pending(self) -> Set[str]:
+        """Files waiting for the next flush"""
+        with self._lock:
+            return set(self._dirty) | {os.path.relpath(self.stores[name].path, self.base_dir) for name in self._deferred}
@@ -0,0 +1,163 @@
+"""
+Startup State Validator for VoraHub Bot
+Restores missing or corrupt state files from the local backup history
+
+Key Features:
+- Checks every JSON state file (parses, expected top-level type)
+- Restores the newest valid committed version (HEAD first, then older commits)
+- Local git only (working repo, then local bare backup) - never a network fetch
+- Corrupt files are kept aside as <name>.corrupt-<timestamp> for inspection
+- Missing ledger directory restored file by file from the last commit
+"""
+
+import os
+import json
+import time
+import logging
+import subprocess
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# How many older commits to try when HEAD's copy is also bad
+HISTORY_DEPTH = 20
+
+
+class RestoreResult(NamedTuple):
+    """Outcome for one state file"""
+    path: str             # Repo-relative path
+    problem: str          # Why the local copy was rejected
+    restored_from: Optional[str]  # "<source>:<commit>" or None if nothing usable
+    seconds: float
+
+
+def check_json(path: str, expected_type: type) -> Optional[str]:
+    """
+    Validate a JSON state file
+
+    Returns:
+        Problem description, or None if the file is fine
+    """
+    if not os.path.exists(path):
+        return "missing"
+    try:
+        with open(path, "rb") as f:
+            data = json.loads(f.read() or b"null")
+    except (OSError, ValueError) as e:
+        return f"unreadable ({e.__class__.__name__})"
+    if not isinstance(data, expected_type):
+        return f"wrong type ({type(data).__name__}, expected {expected_type.__name__})"
+    return None
+
+
+def _git(git_dir: str, *args: str) -> Optional[bytes]:
+    try:
+        result = subprocess.run(
+            ["git", f"--git-dir={git_dir}", *args],
+            capture_output=True,
+            timeout=10,
+            env={**os.environ, "GIT_TERMINAL_PROMPT": "0"}
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return result.stdout if result.returncode == 0 else None
+
+
+def _source_label(git_dir: str) -> str:
+    """"repo" for <repo>/.git, the directory name for bare repositories"""
+    git_dir = os.path.normpath(git_dir)
+    if os.path.basename(git_dir) == ".git":
+        return os.path.basename(os.path.dirname(git_dir))
+    return os.path.basename(git_dir)
+
+
+def _valid_bytes(data: bytes, expected_type: type) -> bool:
+    try:
+        return isinstance(json.loads(data), expected_type)
+    except ValueError:
+        return False
+
+
+def _find_valid_version(git_dirs: List[str], relpath: str, expected_type: type) -> Optional[tuple]:
+    """Newest committed version that parses, as (source, commit, bytes)"""
+    for git_dir in git_dirs:
+        revisions = _git(git_dir, "log", f"-{HISTORY_DEPTH}", "--format=%H", "HEAD", "--", relpath)
+        for commit in (revisions or b"").decode().split():
+            data = _git(git_dir, "show", f"{commit}:{relpath}")
+            if data is not None and _valid_bytes(data, expected_type):
+                return git_dir, commit, data
+    return None
+
+
+def _write_restored(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def restore_state_files(base_dir: str, files: Dict[str, type], git_dirs: List[str]) -> List[RestoreResult]:
+    """
+    Validate state files and restore broken ones from local backups
+
+    Args:
+        base_dir: Bot directory (repo root)
+        files: Repo-relative path -> expected top-level JSON type (dict / list)
+        git_dirs: Git directories to restore from, in order of preference
+
+    Returns:
+        One result per file that needed attention
+    """
+    git_dirs = [d for d in git_dirs if d and os.path.exists(d)]
+    results = []
+    for relpath, expected_type in files.items():
+        path = os.path.join(base_dir, relpath)
+        problem = check_json(path, expected_type)
+        if problem is None:
+            continue
+
+        started = time.perf_counter()
+        found = _find_valid_version(git_dirs, relpath, expected_type) if git_dirs else None
+        if found is None:
+            # Missing and never backed up is a normal first start
+            if problem != "missing":
+                logger.error(f"{relpath} is {problem} and no valid backup exists")
+                results.append(RestoreResult(relpath, problem, None, time.perf_counter() - started))
+            continue
+
+        git_dir, commit, data = found
+        if problem != "missing":
+            # Keep the broken copy for inspection
+            os.replace(path, f"{path}.corrupt-{datetime.now().strftime('%Y%m%d-%H%M%S')}")
+        _write_restored(path, data)
+        source = f"{_source_label(git_dir)}:{commit[:8]}"
+        logger.warning(f"Restored {relpath} ({problem}) from {source}")
+        results.append(RestoreResult(relpath, problem, source, time.perf_counter() - started))
+    return results
+
+
+def restore_missing_tree(base_dir: str, relpath: str, git_dirs: List[str]) -> List[RestoreResult]:
+    """
+    Restore a whole directory (e.g. the sales ledger) if it is missing locally
+
+    Files are taken from the newest commit of the first git dir that has them.
+    """
+    if os.path.exists(os.path.join(base_dir, relpath)):
+        return []
+    for git_dir in (d for d in git_dirs if d and os.path.exists(d)):
+        started = time.perf_counter()
+        listing = _git(git_dir, "ls-tree", "-r", "-z", "--name-only", "HEAD", "--", relpath)
+        names = [n for n in (listing or b"").decode().split("\0") if n]
+        if not names:
+            continue
+        commit = (_git(git_dir, "rev-parse", "HEAD") or b"").decode().strip()
+        for name in names:
+            data = _git(git_dir, "show", f"HEAD:{name}")
+            if data is not None:
+                _write_restored(os.path.join(base_dir, name), data)
+        logger.warning(f"Restored {relpath}/ ({len(names)} files) from {commit[:8]}")
+        return [RestoreResult(relpath + "/", "missing", f"{_source_label(git_dir)}:{commit[:8]}",
+                              time.perf_counter() - started)]
+    return []
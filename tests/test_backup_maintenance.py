@@ -0,0 +1,132 @@
+import os
+import shutil
+import subprocess
+import time
+from datetime import datetime
+
+import pytest
+
+from backup_maintenance import REWRITE_REF, RepoMaintainer
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git not installed")
+
+DAY = 86400
+
+
+def run_git(repo):
+    def run(command, timeout=30):
+        result = subprocess.run(command, cwd=repo, capture_output=True, text=True, timeout=timeout)
+        output = result.stdout if result.returncode == 0 else result.stderr
+        return result.returncode == 0, output.strip()
+    return run
+
+
+def commit(repo, message, when, files):
+    for name, data in files.items():
+        (repo / name).write_text(data)
+    date = f"{int(when)} +0000"
+    env = {**os.environ, "GIT_AUTHOR_DATE": date, "GIT_COMMITTER_DATE": date}
+    subprocess.run(["git", "add", "-A"], cwd=repo, check=True)
+    subprocess.run(["git", "-c", "user.name=Bot", "-c", "user.email=bot@local", "commit", "-q", "-m", message],
+                   cwd=repo, env=env, check=True)
+
+
+def log(repo):
+    return run_git(repo)(["git", "log", "--format=%s", "main"])[1].splitlines()
+
+
+def head(repo, ref="main"):
+    return run_git(repo)(["git", "rev-parse", ref])[1]
+
+
+@pytest.fixture
+def repo(tmp_path):
+    path = tmp_path / "bot"
+    subprocess.run(["git", "init", "-q", "-b", "main", str(path)], check=True)
+    return path
+
+
+@pytest.fixture
+def maintainer(repo):
+    rewrites = []
+    maintainer = RepoMaintainer(str(repo), idle_after=60, interval=3600)
+    maintainer.start(run_git(repo), on_rewrite=lambda old, new: rewrites.append((old, new)))
+    maintainer.rewrites = rewrites
+    return maintainer
+
+
+def noon(days_ago):
+    today = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0)
+    return today.timestamp() - days_ago * DAY
+
+
+def test_old_backup_commits_become_daily_checkpoints(repo, maintainer):
+    commit(repo, "Initial setup", noon(12), {"README": "bot"})
+    for i in range(3):
+        commit(repo, f"Auto-backup: sales.json - {i}", noon(10) + i * 60, {"sales.json": f"{i}"})
+    for i in range(2):
+        commit(repo, f"Auto-backup: claims.json - {i}", noon(9) + i * 60, {"claims.json": f"{i}"})
+    commit(repo, "Auto-backup: sales.json - now", time.time(), {"sales.json": "now"})
+    setup, old_head = head(repo, "main~6"), head(repo)
+    tree = head(repo, "main^{tree}")
+
+    assert maintainer.squash(days=5)
+    day10 = datetime.fromtimestamp(noon(10)).strftime("%Y-%m-%d")
+    day9 = datetime.fromtimestamp(noon(9)).strftime("%Y-%m-%d")
+    assert log(repo) == [
+        "Auto-backup: sales.json - now",
+        f"Backup checkpoint: {day9} (2 commits)",
+        f"Backup checkpoint: {day10} (3 commits)",
+        "Initial setup",
+    ]
+    # Same final tree, the non-backup commit is not rewritten
+    assert head(repo, "main^{tree}") == tree
+    assert head(repo, "main~3") == setup
+    assert run_git(repo)(["git", "show", "main~1:claims.json"])[1] == "1"
+    assert maintainer.rewrites == [(old_head, head(repo))]
+    assert not run_git(repo)(["git", "rev-parse", "--verify", "-q", REWRITE_REF])[0]
+
+    # Checkpoints keep their counts when squashed again
+    assert not maintainer.squash(days=5)
+
+
+def test_nothing_to_squash_leaves_the_branch_alone(repo, maintainer):
+    commit(repo, "Auto-backup: sales.json - a", noon(10), {"sales.json": "a"})
+    commit(repo, "Auto-backup: sales.json - b", noon(9), {"sales.json": "b"})
+    old_head = head(repo)
+
+    assert not maintainer.squash(days=5)
+    assert head(repo) == old_head and maintainer.rewrites == []
+
+
+def test_commit_slipping_in_aborts_the_ref_update(repo, maintainer):
+    for i in range(3):
+        commit(repo, f"Auto-backup: sales.json - {i}", noon(10) + i * 60, {"sales.json": f"{i}"})
+    fast_import = maintainer._fast_import
+
+    def racing_import(stream):
+        done = fast_import(stream)
+        commit(repo, "Auto-backup: sales.json - late", time.time(), {"sales.json": "late"})
+        return done
+    maintainer._fast_import = racing_import
+
+    # Compare-and-swap on the old head: the late commit is kept, nothing rewritten
+    assert not maintainer.squash(days=5)
+    assert log(repo)[0] == "Auto-backup: sales.json - late" and len(log(repo)) == 4
+    assert maintainer.rewrites == []
+    assert not run_git(repo)(["git", "rev-parse", "--verify", "-q", REWRITE_REF])[0]
+
+
+def test_run_gcs_and_records_history(repo, maintainer):
+    commit(repo, "Auto-backup: sales.json - a", time.time(), {"sales.json": "a"})
+    assert maintainer.due(idle_for=120)
+    assert not maintainer.due(idle_for=10)
+
+    stats = maintainer.run()
+    assert stats is not None and stats.action == "gc" and stats.commits == 1
+    assert not maintainer.due(idle_for=120)  # Next run after the interval
+    assert maintainer._load_history() == [stats]
+
+
+def test_not_due_before_start(repo):
+    assert not RepoMaintainer(str(repo), idle_after=0, interval=0).due(idle_for=1e9)
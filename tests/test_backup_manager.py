@@ -0,0 +1,574 @@
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import Future
+
+import pytest
+
+import backup_manager
+from backup_manager import BackupQueue, FileFingerprint, GitBackupManager, GitLock, PushScheduler
+
+needs_git = pytest.mark.skipif(shutil.which("git") is None, reason="git not installed")
+
+
+def git(repo, *args):
+    result = subprocess.run(["git", *args], cwd=repo, capture_output=True, text=True)
+    return result.returncode == 0, result.stdout.strip()
+
+
+def wait_until(predicate, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+@pytest.fixture
+def backup_repo(tmp_path):
+    """Bot directory (initialized by the manager) plus a local bare remote"""
+    remote = tmp_path / "remote.git"
+    subprocess.run(["git", "init", "-q", "--bare", "-b", "main", str(remote)], check=True)
+    bot_dir = tmp_path / "bot"
+    bot_dir.mkdir()
+    return bot_dir, remote
+
+
+@pytest.fixture
+def make_manager(backup_repo):
+    managers = []
+
+    def make(**options):
+        bot_dir, remote = backup_repo
+        manager = GitBackupManager(str(bot_dir), str(remote), "", **options)
+        managers.append(manager)
+        return manager
+
+    yield make
+    for manager in managers:
+        manager.shutdown()
+
+
+def write(bot_dir, name, data):
+    (bot_dir / name).write_text(data)
+    return name
+
+
+# Flush thresholds ------------------------------------------------------------
+
+def test_batch_waits_for_max_delay():
+    queue = BackupQueue(max_delay=0.2, max_files=10)
+    queue.add_file("sales.json", 10)
+    assert not queue.should_backup()
+
+    started = time.monotonic()
+    assert queue.wait_for_batch(lambda: True) == ({"sales.json": None}, [])
+    assert time.monotonic() - started >= 0.15
+
+
+def test_file_and_byte_thresholds_flush_immediately():
+    queue = BackupQueue(max_delay=60, max_files=2, max_bytes=100)
+    queue.add_file("a.json", 10)
+    assert not queue.should_backup()
+    queue.add_file("a.json", 20)  # Same file again: still one file, size replaced
+    assert not queue.should_backup() and queue.queued_bytes == 20
+    queue.add_file("b.json", 10)
+    assert queue.should_backup()
+    assert sorted(queue.get_pending_files()) == ["a.json", "b.json"]
+
+    queue.add_file("big.json", 100)
+    assert queue.should_backup()
+
+
+def test_slow_pushes_scale_thresholds_up():
+    queue = BackupQueue(max_delay=5, max_files=4, max_bytes=1000, target_push_latency=2.0, max_scale=3.0)
+    queue.record_push_latency(1.0)
+    assert queue.scale == 1.0 and queue.max_files == 4
+
+    queue.record_push_latency(20.0)  # EWMA: 0.7 * 1 + 0.3 * 20 = 6.7s
+    assert queue.scale == 3.0  # Capped
+    assert (queue.max_delay, queue.max_files, queue.max_bytes) == (15, 12, 3000)
+
+
+def test_worker_sleeps_until_woken():
+    queue = BackupQueue(max_delay=60, max_files=1)
+    running = [True]
+    result = []
+    worker = threading.Thread(target=lambda: result.append(queue.wait_for_batch(lambda: running[0])))
+    worker.start()
+
+    time.sleep(0.1)
+    assert worker.is_alive()  # Nothing queued: blocked, not polling a timeout
+    queue.add_file("sales.json", 1)
+    worker.join(timeout=2)
+    assert result == [({"sales.json": None}, [])]
+
+    worker = threading.Thread(target=lambda: result.append(queue.wait_for_batch(lambda: running[0])))
+    worker.start()
+    running[0] = False
+    queue.wake()
+    worker.join(timeout=2)
+    assert result[-1] == ({}, [])
+
+
+def test_requeued_batch_waits_and_keeps_newer_files():
+    queue = BackupQueue(max_delay=0.0)
+    queue.add_file("sales.json", 3)
+    queue.requeue({"sales.json": None, "tickets.json": None}, delay=60)
+
+    assert not queue.should_backup()
+    assert 0 < queue._due_in() <= 60
+    assert queue.files_to_backup == {"sales.json": 3, "tickets.json": 0}
+
+
+# Push scheduler ----------------------------------------------------------------
+
+class FlakyPush:
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            return False, "remote hung up"
+        return True, ""
+
+
+def test_requests_collapse_into_one_push():
+    push = FlakyPush(0)
+    pusher = PushScheduler(push, settle_delay=0.1)
+    pusher.start()
+    for _ in range(5):
+        pusher.request_push()
+    assert wait_until(lambda: pusher.state().ahead == 0)
+    pusher.stop()
+    assert push.calls == 1
+
+
+def test_failed_push_is_retried_with_backoff():
+    push = FlakyPush(2)
+    pusher = PushScheduler(push, settle_delay=0.0, base_backoff=0.05, jitter=0.0)
+    pusher.start()
+    pusher.request_push()
+    assert wait_until(lambda: pusher.state().ahead == 0)
+    pusher.stop()
+
+    state = pusher.state()
+    assert push.calls == 3
+    assert state.failures == 0 and state.last_error == "remote hung up" and state.last_success
+
+
+def test_flush_stops_waiting_once_a_push_fails():
+    pusher = PushScheduler(FlakyPush(99), settle_delay=60, base_backoff=60)
+    pusher.start()
+    pusher.request_push()
+
+    started = time.monotonic()
+    assert not pusher.flush(timeout=5)
+    assert time.monotonic() - started < 2  # Does not sit through the backoff
+    state = pusher.state()
+    assert state.ahead == 1 and state.failures == 1 and state.next_attempt_in > 30
+    pusher.stop()
+
+
+# Worker against a real repository --------------------------------------------
+
+@needs_git
+def test_worker_commits_and_pushes_when_file_threshold_is_hit(backup_repo, make_manager):
+    bot_dir, remote = backup_repo
+    manager = make_manager(max_delay=60, max_files=2)
+    manager.queue_backup(write(bot_dir, "sales.json", "{}"))
+    manager.queue_backup(write(bot_dir, "tickets.json", "[]"))
+
+    assert wait_until(lambda: git(remote, "rev-parse", "main")[0])
+    assert git(remote, "show", "main:tickets.json") == (True, "[]")
+    assert git(remote, "rev-list", "--count", "main") == (True, "1")  # One commit for the batch
+    assert manager.backup_queue.push_latency > 0
+
+
+@needs_git
+def test_shutdown_flushes_pending_files(backup_repo, make_manager):
+    bot_dir, remote = backup_repo
+    manager = make_manager(max_delay=60, max_files=10)
+    manager.queue_backup(write(bot_dir, "warns.json", "{}"))
+    time.sleep(0.1)
+    assert not git(remote, "rev-parse", "main")[0]  # Below every threshold
+
+    manager.shutdown()
+    assert git(remote, "show", "main:warns.json") == (True, "{}")
+    assert not manager.worker_thread.is_alive()
+
+
+@needs_git
+def test_failed_batch_is_requeued_with_backoff(backup_repo, make_manager):
+    bot_dir, remote = backup_repo
+    manager = make_manager(max_delay=60, max_files=10)
+    manager._commit_batch = lambda files: False
+
+    assert not manager.backup_now([write(bot_dir, "sales.json", "{}")])
+    assert not manager.backup_now(["sales.json"])
+    assert manager.batch_failures == 2
+    assert manager.RETRY_DELAY < manager.backup_queue._due_in() <= 2 * manager.RETRY_DELAY
+    assert list(manager.backup_queue.files_to_backup) == ["sales.json"]
+
+
+@needs_git
+def test_commits_stay_local_until_the_remote_is_back(backup_repo, make_manager):
+    bot_dir, remote = backup_repo
+    shutil.rmtree(remote)
+    manager = make_manager(max_delay=60, max_files=10)
+
+    assert not manager.backup_now([write(bot_dir, "sales.json", "{}")], push_timeout=5)
+    assert manager.push_state().ahead == 1 and manager.push_state().failures >= 1
+    assert git(bot_dir, "rev-parse", "main")[0]  # Committed locally
+
+    subprocess.run(["git", "init", "-q", "--bare", "-b", "main", str(remote)], check=True)
+    assert manager.flush_targets(timeout=10)
+    assert git(remote, "show", "main:sales.json") == (True, "{}")
+
+
+
+@needs_git
+def test_shutdown_keeps_to_its_budget_and_is_idempotent(backup_repo, make_manager):
+    bot_dir, remote = backup_repo
+    manager = make_manager(max_delay=60, max_files=10)
+    assert manager.ready.wait(10)
+    shutil.rmtree(remote)  # Every push fails from now on
+    manager.queue_backup(write(bot_dir, "sales.json", "{}"))
+
+    started = time.monotonic()
+    assert not manager.shutdown(timeout=3)
+    assert time.monotonic() - started < 5
+    assert git(bot_dir, "show", "main:sales.json") == (True, "{}")  # Committed, kept locally
+    assert not manager.shutdown(timeout=1)  # Second call: nothing left to commit, still unpushed
+
+
+@needs_git
+def test_idle_timeout_is_armed_only_after_a_commit(backup_repo, make_manager):
+    bot_dir, remote = backup_repo
+    manager = make_manager(max_delay=60, max_files=10)
+    assert manager.ready.wait(10)
+    assert manager._idle_timeout() is None  # Sleeps until something is queued
+
+    assert manager.backup_now([write(bot_dir, "sales.json", "{}")])
+    assert manager._idle_timeout() >= manager.maintenance.idle_after
+
+# Content fingerprints ----------------------------------------------------------
+
+def test_fingerprint_distrusts_mtimes_inside_the_racy_window():
+    now = time.time_ns()
+    old = FileFingerprint(5, now - 10 * 10**9, b"x", now)
+    racy = FileFingerprint(5, now - 10**9, b"x", now)
+
+    class Stat:
+        st_size = 5
+        st_mtime_ns = old.mtime_ns
+    assert old.matches_stat(Stat)
+    Stat.st_size = 6
+    assert not old.matches_stat(Stat)
+
+    Stat.st_size, Stat.st_mtime_ns = 5, racy.mtime_ns
+    assert not racy.matches_stat(Stat)  # Same-mtime rewrite possible: read the file
+
+
+@needs_git
+def test_unchanged_files_are_not_committed(backup_repo, make_manager):
+    bot_dir, remote = backup_repo
+    manager = make_manager(max_delay=60, max_files=10)
+    assert manager.backup_now([write(bot_dir, "sales.json", "{}")])
+    _, head = git(bot_dir, "rev-parse", "main")
+
+    # Same content: hashed, matched and skipped; touched-but-identical too
+    assert manager._collect_changes(["sales.json"]) == {}
+    os.utime(bot_dir / "sales.json", ns=(time.time_ns(), time.time_ns() + 10**9))
+    assert manager.backup_now(["sales.json"])
+    assert git(bot_dir, "rev-parse", "main") == (True, head)
+
+    # Old mtime outside the racy window: trusted without reading
+    past = time.time_ns() - 60 * 10**9
+    os.utime(bot_dir / "sales.json", ns=(past, past))
+    assert manager._collect_changes(["sales.json"]) == {}
+    assert manager._collect_changes(["sales.json"]) == {}
+    assert manager._fingerprints["sales.json"].matches_stat((bot_dir / "sales.json").stat())
+
+
+@needs_git
+def test_same_size_rewrite_in_the_racy_window_is_committed(backup_repo, make_manager):
+    bot_dir, remote = backup_repo
+    manager = make_manager(max_delay=60, max_files=10)
+    assert manager.backup_now([write(bot_dir, "sales.json", '{"a":1}')])
+    mtime = (bot_dir / "sales.json").stat().st_mtime_ns
+
+    # Rewritten within the same timestamp granularity: size and mtime match
+    write(bot_dir, "sales.json", '{"a":2}')
+    os.utime(bot_dir / "sales.json", ns=(mtime, mtime))
+    assert manager.backup_now(["sales.json"])
+    assert git(bot_dir, "show", "main:sales.json") == (True, '{"a":2}')
+    assert git(bot_dir, "rev-list", "--count", "main") == (True, "2")
+
+
+# In-memory snapshots -------------------------------------------------------------
+
+def test_requeued_snapshot_yields_to_a_newer_one():
+    queue = BackupQueue(max_delay=0.0)
+    queue.add_file("sales.json", 5, b"newer")
+    queue.requeue({"sales.json": b"older", "claims.json": b"{}"}, delay=60)
+
+    assert queue.snapshots == {"sales.json": b"newer", "claims.json": b"{}"}
+    assert queue.queued_bytes == 5 + 2
+
+
+@needs_git
+def test_snapshot_is_committed_instead_of_the_file(backup_repo, make_manager):
+    bot_dir, remote = backup_repo
+    manager = make_manager(max_delay=60, max_files=10)
+    write(bot_dir, "sales.json", '{"half": ')  # Torn write on disk
+
+    manager.queue_backup("sales.json", b'{"a": 1}')
+    manager.queue_backup("claims.json", lambda: b'{"b": 2}')  # Serialized at commit time
+    manager.shutdown()
+    assert git(remote, "show", "main:sales.json") == (True, '{"a": 1}')
+    assert git(remote, "show", "main:claims.json") == (True, '{"b": 2}')
+
+
+@needs_git
+def test_unchanged_snapshot_is_not_committed_again(backup_repo, make_manager):
+    bot_dir, remote = backup_repo
+    manager = make_manager(max_delay=60, max_files=10)
+    assert manager.backup_now({"sales.json": b"{}"})
+    _, head = git(bot_dir, "rev-parse", "main")
+
+    assert manager.backup_now({"sales.json": b"{}"})
+    assert git(bot_dir, "rev-parse", "main") == (True, head)
+    assert manager.backup_now({"sales.json": b"[]"})
+    assert git(bot_dir, "rev-list", "--count", "main") == (True, "2")
+
+
+# Background initialization -------------------------------------------------------
+
+@needs_git
+def test_files_queued_during_init_are_committed_once_ready(backup_repo, make_manager, monkeypatch):
+    bot_dir, remote = backup_repo
+    release = threading.Event()
+    init_git = GitBackupManager._init_git
+
+    def slow_init(self):
+        release.wait(10)
+        init_git(self)
+    monkeypatch.setattr(GitBackupManager, "_init_git", slow_init)
+
+    started = time.monotonic()
+    manager = make_manager(max_delay=60, max_files=1)
+    assert time.monotonic() - started < 0.5  # No git on the caller's thread
+    manager.queue_backup(write(bot_dir, "sales.json", "{}"))
+    assert not manager.ready.is_set()
+
+    release.set()
+    assert wait_until(lambda: git(remote, "show", "main:sales.json") == (True, "{}"))
+
+
+@needs_git
+def test_failed_init_disables_backups_without_raising(backup_repo, make_manager, monkeypatch):
+    bot_dir, remote = backup_repo
+
+    def broken_init(self):
+        raise RuntimeError("Failed to initialize Git repository")
+    monkeypatch.setattr(GitBackupManager, "_init_git", broken_init)
+
+    manager = make_manager(max_delay=60, max_files=1)
+    assert manager.ready.wait(5)
+    assert manager.init_error == "Failed to initialize Git repository"
+    manager.queue_backup(write(bot_dir, "sales.json", "{}"))
+    assert manager.backup_queue.files_to_backup == {}
+    assert not manager.backup_now(["sales.json"], push_timeout=1)
+    manager.shutdown()
+    assert not manager.worker_thread.is_alive()
+
+
+# Async API -----------------------------------------------------------------------
+
+def test_waiter_flushes_right_away_even_after_a_failure():
+    queue = BackupQueue(max_delay=60)
+    queue.add_file("sales.json", 1)
+    queue.requeue({"tickets.json": None}, delay=60)
+    assert not queue.should_backup()
+
+    future = Future()
+    queue.add_waiter(future)
+    assert queue.should_backup()
+    files, waiters = queue.drain_batch()
+    assert sorted(files) == ["sales.json", "tickets.json"] and waiters == [(future, False)]
+
+
+@pytest.fixture
+def global_manager(make_manager, monkeypatch):
+    manager = make_manager(max_delay=60, max_files=10)
+    monkeypatch.setattr(backup_manager, "_backup_manager", manager)
+    return manager
+
+
+@needs_git
+def test_backup_now_async_commits_and_pushes(backup_repo, global_manager):
+    bot_dir, remote = backup_repo
+    write(bot_dir, "sales.json", "{}")
+
+    assert asyncio.run(backup_manager.backup_now_async(["sales.json"], timeout=10))
+    assert git(remote, "show", "main:sales.json") == (True, "{}")
+    assert asyncio.run(backup_manager.flush_async())  # Nothing left to do
+
+
+@needs_git
+def test_flush_on_exit_flushes_the_queue(backup_repo, global_manager):
+    bot_dir, remote = backup_repo
+
+    async def run_bot():
+        async with backup_manager.flush_on_exit(timeout=10) as manager:
+            manager.queue_backup(write(bot_dir, "warns.json", "{}"))
+            await asyncio.sleep(0.1)
+            assert not git(remote, "rev-parse", "main")[0]  # Below every threshold
+
+    asyncio.run(run_bot())
+    assert git(remote, "show", "main:warns.json") == (True, "{}")
+
+
+@needs_git
+def test_timed_out_async_caller_does_not_break_the_worker(backup_repo, global_manager, monkeypatch):
+    bot_dir, remote = backup_repo
+    commit_batch = global_manager._commit_batch
+
+    def slow_commit(files):
+        time.sleep(0.3)
+        return commit_batch(files)
+    monkeypatch.setattr(global_manager, "_commit_batch", slow_commit)
+
+    write(bot_dir, "sales.json", "{}")
+    assert not asyncio.run(backup_manager.backup_now_async(["sales.json"], timeout=0.05))
+    # The cancelled future is skipped; the next batch goes through
+    assert global_manager.backup_now([write(bot_dir, "claims.json", "{}")], push_timeout=10)
+    assert git(remote, "show", "main:claims.json") == (True, "{}")
+
+
+# Metrics -------------------------------------------------------------------------
+
+@needs_git
+def test_stats_count_batches_commits_and_phase_latencies(backup_repo, make_manager):
+    bot_dir, remote = backup_repo
+    manager = make_manager(max_delay=60, max_files=10)
+    assert manager.backup_now([write(bot_dir, "sales.json", "{}")])
+    assert manager.backup_now(["sales.json"])  # Unchanged: nothing to commit
+    manager.queue_backup(write(bot_dir, "tickets.json", "[]"))
+
+    stats = manager.get_stats()
+    assert stats["state"] == "ready"
+    assert (stats["batches"], stats["commits"], stats["noop_batches"], stats["files_committed"]) == (2, 1, 1, 1)
+    assert stats["latency"]["stage"]["count"] == 2 and stats["latency"]["commit"]["count"] == 1
+    assert wait_until(lambda: manager.get_stats()["latency"]["push"]["count"] >= 1)
+    assert stats["queue"]["pending_files"] == 1 and stats["queue"]["pending_bytes"] == 2
+    assert stats["failures"] == 0 and stats["last_success"]
+
+
+@needs_git
+def test_exported_metrics_are_flat_numbers(backup_repo, make_manager, monkeypatch):
+    bot_dir, remote = backup_repo
+    assert backup_manager.export_backup_metrics() == {}  # No manager yet
+
+    manager = make_manager(max_delay=60, max_files=10)
+    monkeypatch.setattr(backup_manager, "_backup_manager", manager)
+    assert manager.backup_now([write(bot_dir, "sales.json", "{}")])
+    manager.queue_backup(write(bot_dir, "tickets.json", "[]"))
+
+    metrics = backup_manager.export_backup_metrics()
+    assert all(isinstance(value, float) for value in metrics.values())
+    assert metrics["backup_up"] == 1.0
+    assert metrics["backup_pending_files"] == 1.0
+    assert metrics["backup_commits_total"] == 1.0
+    assert metrics["backup_target_github_ahead"] == 0.0
+    assert metrics["backup_commit_seconds_p95"] > 0
+
+
+# Git lock ------------------------------------------------------------------------
+
+@pytest.fixture
+def lock_file(tmp_path):
+    return str(tmp_path / "backup.lock")
+
+
+def open_fds():
+    return len(os.listdir("/proc/self/fd"))
+
+
+def test_acquire_records_holder(lock_file):
+    lock = GitLock(lock_file, purpose="maintenance")
+    assert lock.acquire(timeout=1)
+    with open(lock_file) as f:
+        holder = json.load(f)
+    assert holder["pid"] == os.getpid() and holder["purpose"] == "maintenance"
+    lock.release()
+    assert os.path.getsize(lock_file) == 0
+
+
+def test_timed_out_waits_share_one_blocked_waiter(lock_file):
+    fds, threads = open_fds(), threading.active_count()
+    holder = GitLock(lock_file)
+    assert holder.acquire()
+
+    for _ in range(5):
+        started = time.monotonic()
+        assert not GitLock(lock_file).acquire(timeout=0.1)
+        assert 0.1 <= time.monotonic() - started < 1.0
+    # One thread blocked in flock() for all of them, not one per timeout
+    assert threading.active_count() <= threads + 1
+    assert open_fds() <= fds + 2  # The holder's and the waiter's
+
+    # Nobody is waiting any more: the waiter hands the lock straight back
+    holder.release()
+    assert wait_until(lambda: threading.active_count() == threads and open_fds() == fds)
+    lock = GitLock(lock_file)
+    assert lock.acquire(timeout=0)
+    lock.release()
+
+
+def test_waiter_gets_lock_as_soon_as_it_is_released(lock_file):
+    holder = GitLock(lock_file)
+    assert holder.acquire()
+    released = []
+    threading.Timer(0.2, lambda: (released.append(time.monotonic()), holder.release())).start()
+
+    waiter = GitLock(lock_file)
+    assert waiter.acquire(timeout=5)
+    assert time.monotonic() - released[0] < 0.1  # Woken by the kernel, not a poll
+    waiter.release()
+
+
+def test_lock_excludes_other_processes(lock_file):
+    script = (
+        "import sys, time; sys.path.insert(0, sys.argv[1]);"
+        "from backup_manager import GitLock;"
+        "lock = GitLock(sys.argv[2]); lock.acquire(); print('held', flush=True); time.sleep(30)"
+    )
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    child = subprocess.Popen([sys.executable, "-c", script, repo_root, lock_file], stdout=subprocess.PIPE, text=True)
+    try:
+        assert child.stdout.readline().strip() == "held"
+        assert not GitLock(lock_file).acquire(timeout=0.1)
+    finally:
+        child.kill()
+        child.wait()
+    # The kernel drops the lock with the process: no stale-lock cleanup needed
+    lock = GitLock(lock_file)
+    assert lock.acquire(timeout=1)
+    lock.release()
+
+
+def test_unusable_lock_file_fails_cleanly(tmp_path):
+    fds = open_fds()
+    assert not GitLock(str(tmp_path / "missing" / "backup.lock")).acquire(timeout=0.1)
+    assert not GitLock(str(tmp_path / "missing" / "backup.lock")).acquire(timeout=None)
+    assert open_fds() == fds
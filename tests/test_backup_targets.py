@@ -0,0 +1,109 @@
+import shutil
+import subprocess
+import time
+
+import pytest
+
+from backup_targets import SnapshotTarget
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git not installed")
+
+
+def run_git(repo):
+    def runner(command, timeout=30):
+        result = subprocess.run(command, cwd=repo, capture_output=True, text=True, timeout=timeout)
+        return result.returncode == 0, result.stdout.strip()
+    return runner
+
+
+@pytest.fixture
+def repo(tmp_path):
+    path = tmp_path / "repo"
+    subprocess.run(["git", "init", "-q", "-b", "main", str(path)], check=True)
+    return path
+
+
+def commit(repo, files):
+    for name, data in files.items():
+        target = repo / name
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(data)
+    subprocess.run(["git", "add", "-A"], cwd=repo, check=True)
+    subprocess.run(["git", "-c", "user.name=T", "-c", "user.email=t@t", "commit", "-q", "-m", "c"], cwd=repo, check=True)
+
+
+def start(target, repo):
+    target.start(run_git(repo), repo)
+    return target
+
+
+def snapshots(target):
+    return [target._read_snapshot(path) for path in target._existing()]
+
+
+@pytest.mark.parametrize("fmt", ["dir", "tar"])
+def test_first_snapshot_includes_files_from_head(tmp_path, repo, fmt):
+    commit(repo, {"sales.json": b"{}", "ledger/1/open.jsonl": b"x\n"})
+    target = start(SnapshotTarget(str(tmp_path / "snaps"), fmt=fmt, min_interval=3600), repo)
+    try:
+        target.on_commit("abc", {"tickets.json": b"[]"})
+        assert target.sync_future().result(5)
+        assert snapshots(target)[-1] == {"sales.json": b"{}", "ledger/1/open.jsonl": b"x\n", "tickets.json": b"[]"}
+    finally:
+        target.stop()
+
+
+def test_on_commit_does_not_write_before_interval(tmp_path, repo):
+    target = start(SnapshotTarget(str(tmp_path / "snaps"), min_interval=3600), repo)
+    try:
+        target.on_commit("a", {"a.json": b"1"})
+        assert target.sync_future().result(5)
+        target.on_commit("b", {"a.json": b"2"})
+        time.sleep(0.1)
+        assert len(snapshots(target)) == 1 and target.state()["pending"]
+
+        assert target.sync_future().result(5)
+        assert [snap["a.json"] for snap in snapshots(target)] == [b"1", b"2"]
+    finally:
+        target.stop()
+
+
+def test_unchanged_files_are_hard_linked(tmp_path, repo):
+    target = start(SnapshotTarget(str(tmp_path / "snaps"), min_interval=3600), repo)
+    try:
+        target.on_commit("a", {"a.json": b"1", "b.json": b"1"})
+        target.sync_future().result(5)
+        target.on_commit("b", {"a.json": b"2"})
+        target.sync_future().result(5)
+    finally:
+        target.stop()
+    first, second = target._existing()
+    assert (second / "b.json").stat().st_ino == (first / "b.json").stat().st_ino
+    assert (second / "a.json").stat().st_ino != (first / "a.json").stat().st_ino
+
+
+def test_rotation_keeps_newest(tmp_path, repo):
+    target = start(SnapshotTarget(str(tmp_path / "snaps"), keep=2, min_interval=3600), repo)
+    try:
+        for n in range(4):
+            target.on_commit(str(n), {"a.json": str(n).encode()})
+            target.sync_future().result(5)
+    finally:
+        target.stop()
+    assert [snap["a.json"] for snap in snapshots(target)] == [b"2", b"3"]
+
+
+def test_restart_continues_from_newest_snapshot(tmp_path, repo):
+    root = str(tmp_path / "snaps")
+    target = start(SnapshotTarget(root, min_interval=3600), repo)
+    target.on_commit("a", {"a.json": b"1"})
+    target.sync_future().result(5)
+    target.stop()
+
+    restarted = start(SnapshotTarget(root, min_interval=3600), repo)
+    try:
+        restarted.on_commit("b", {"b.json": b"2"})
+        restarted.sync_future().result(5)
+        assert snapshots(restarted)[-1] == {"a.json": b"1", "b.json": b"2"}
+    finally:
+        restarted.stop()
@@ -0,0 +1,45 @@
+import json
+
+from canonical_json import dumps, dumps_line
+
+
+def test_records_stay_on_one_line_with_sorted_keys():
+    data = {"day": {"2026-01-05": {"1001": [40000, 2], "*": [40000, 2]}}, "applied": 7}
+    assert dumps(data).decode() == (
+        '{\n'
+        '  "applied": 7,\n'
+        '  "day": {\n'
+        '    "2026-01-05": {\n'
+        '      "*": [40000,2],\n'
+        '      "1001": [40000,2]\n'
+        '    }\n'
+        '  }\n'
+        '}\n'
+    )
+    assert json.loads(dumps(data)) == data
+
+
+def test_same_state_gives_the_same_bytes():
+    first = {"b": {"x": 1, "y": [1, 2]}, "a": []}
+    second = {"a": [], "b": {"y": [1, 2], "x": 1}}
+    assert dumps(first) == dumps(second)
+
+
+def test_lists_keep_their_order_and_top_level_is_expanded():
+    data = [{"id": 2, "name": "Budi"}, {"id": 1, "name": "Ani"}]
+    assert dumps(data).decode() == '[\n  {"id":2,"name":"Budi"},\n  {"id":1,"name":"Ani"}\n]\n'
+    assert dumps({}).decode() == "{}\n"
+    assert dumps([]).decode() == "[]\n"
+
+
+def test_changing_one_record_changes_one_line():
+    before = {str(channel): str(staff) for channel, staff in [(1, 10), (2, 20), (3, 30)]}
+    after = {**before, "2": "21"}
+    changed = [pair for pair in zip(dumps(before).splitlines(), dumps(after).splitlines()) if pair[0] != pair[1]]
+    assert changed == [(b'  "2": "20",', b'  "2": "21",')]
+
+
+def test_dumps_line_is_compact_sorted_and_keeps_unicode():
+    line = dumps_line({"type": "sale", "amount": 50, "description": "Kopi ☕"})
+    assert line == '{"amount":50,"description":"Kopi ☕","type":"sale"}'
+    assert "\n" not in dumps_line({"a": {"b": [1, {"c": 2}]}})
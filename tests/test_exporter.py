@@ -0,0 +1,73 @@
+import csv
+import gzip
+import json
+
+import pytest
+
+from exporter import SALES_FIELDS, TICKET_FIELDS, iter_event_log, iter_ledger_rows, write_export
+from sales_store import SalesLedger
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    ledger = SalesLedger(str(tmp_path / "ledger"))
+    ledger.append_sale(1, {"amount": 100, "description": "Gamepass", "timestamp": "2027-01-15T10:00:00"})
+    ledger.close_period(1, {"amount": 100, "timestamp": "2027-01-16T10:00:00", "paid_by": 9})
+    ledger.append_sale(1, {"amount": 200, "description": "Robux", "timestamp": "2027-01-17T10:00:00"})
+    ledger.append_sale(2, {"amount": 50, "description": "Robux", "timestamp": "2027-01-17T11:00:00"})
+    return ledger
+
+
+def test_ledger_rows_filter_by_staff_and_date(ledger):
+    rows = list(iter_ledger_rows(ledger, staff_id=1, start="2027-01-16", end="2027-01-18"))
+    assert [(r["staff_id"], r["type"], r["amount"]) for r in rows] == [(1, "payout", 100), (1, "sale", 200)]
+    assert len(list(iter_ledger_rows(ledger))) == 4
+
+
+def test_csv_export_is_gzipped_with_header(ledger, tmp_path):
+    path = str(tmp_path / "sales.csv.gz")
+    assert write_export(iter_ledger_rows(ledger), path, "csv", SALES_FIELDS) == 4
+
+    with gzip.open(path, "rt", encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert list(rows[0]) == SALES_FIELDS
+    assert [r["amount"] for r in rows] == ["100", "100", "200", "50"]
+    assert rows[1]["paid_by"] == "9"
+
+
+def test_jsonl_export_keeps_every_key(ledger, tmp_path):
+    path = str(tmp_path / "sales.jsonl.gz")
+    assert write_export(iter_ledger_rows(ledger, staff_id=2), path, "jsonl", SALES_FIELDS) == 1
+
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f]
+    assert rows == [{"staff_id": 2, "type": "sale", "amount": 50, "description": "Robux",
+                     "timestamp": "2027-01-17T11:00:00"}]
+
+
+def test_unknown_format_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        write_export(iter([]), str(tmp_path / "out.gz"), "xml", SALES_FIELDS)
+
+
+def test_event_log_skips_bad_lines_and_matches_user_or_staff(tmp_path):
+    path = tmp_path / "ticket_events.jsonl"
+    events = [
+        {"timestamp": "2027-01-15T10:00:00", "event": "opened", "user_id": 5, "staff_id": None},
+        {"timestamp": "2027-01-15T10:05:00", "event": "claimed", "user_id": None, "staff_id": 7,
+         "response_seconds": 300.0},
+        {"timestamp": "2027-01-16T10:00:00", "event": "closed", "user_id": None, "staff_id": 8},
+    ]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(json.dumps(events[0]) + "\n\n{\"torn\": \n")
+        f.writelines(json.dumps(e) + "\n" for e in events[1:])
+
+    assert [e["event"] for e in iter_event_log(str(path))] == ["opened", "claimed", "closed"]
+    assert [e["event"] for e in iter_event_log(str(path), staff_id=7)] == ["claimed"]
+    assert [e["event"] for e in iter_event_log(str(path), end="2027-01-16")] == ["opened", "claimed"]
+    assert list(iter_event_log(str(tmp_path / "missing.jsonl"))) == []
+
+    out = str(tmp_path / "tickets.csv.gz")
+    write_export(iter_event_log(str(path), staff_id=7), out, "csv", TICKET_FIELDS)
+    with gzip.open(out, "rt", encoding="utf-8", newline="") as f:
+        assert next(csv.DictReader(f))["response_seconds"] == "300.0"
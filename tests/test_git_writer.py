@@ -0,0 +1,81 @@
+import shutil
+import subprocess
+
+import pytest
+
+from git_writer import CliWriter, LooseObjectWriter
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git not installed")
+
+
+def git(repo, *args):
+    result = subprocess.run(["git", *args], cwd=repo, capture_output=True, text=True)
+    return result.returncode == 0, result.stdout.strip()
+
+
+@pytest.fixture
+def repo(tmp_path):
+    subprocess.run(["git", "init", "-q", "-b", "main", str(tmp_path)], check=True)
+    git(tmp_path, "config", "user.name", "Test")
+    git(tmp_path, "config", "user.email", "test@example.com")
+    return tmp_path
+
+
+def make_writer(repo, cls=LooseObjectWriter):
+    return cls(repo, "VoraHub Bot", "bot@vorahub.local", lambda command, timeout=30: git(repo, *command[1:]))
+
+
+def commit_files(repo, writer, contents):
+    # The bot saves the file before queueing it: keep the working tree in step
+    for path, data in contents.items():
+        target = repo / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(data)
+    return writer.commit(contents, "Auto-backup")
+
+
+@pytest.mark.parametrize("cls", [LooseObjectWriter, CliWriter])
+def test_commit_is_readable_by_git(repo, cls):
+    writer = make_writer(repo, cls)
+    sha = commit_files(repo, writer, {"sales.json": b'{"a":1}\n', "ledger/1/open.jsonl": b"{}\n"})
+
+    assert git(repo, "rev-parse", "HEAD") == (True, sha)
+    assert git(repo, "show", "HEAD:ledger/1/open.jsonl") == (True, "{}")
+    assert git(repo, "fsck", "--strict")[0]
+    assert git(repo, "status", "--porcelain") == (True, "")
+
+
+def test_unchanged_content_is_not_committed(repo):
+    writer = make_writer(repo)
+    first = commit_files(repo, writer, {"a.json": b"1"})
+    assert commit_files(repo, writer, {"a.json": b"1"}) is None
+    assert git(repo, "rev-parse", "HEAD") == (True, first)
+
+
+def test_only_changed_directories_get_new_trees(repo):
+    writer = make_writer(repo)
+    commit_files(repo, writer, {"x/a.json": b"1", "y/b.json": b"2"})
+    _, y_before = git(repo, "rev-parse", "HEAD:y")
+    commit_files(repo, writer, {"x/a.json": b"3"})
+
+    assert git(repo, "rev-parse", "HEAD:y") == (True, y_before)
+    assert git(repo, "show", "HEAD:x/a.json") == (True, "3")
+    assert git(repo, "rev-list", "--count", "HEAD") == (True, "2")
+
+
+def test_reseeds_after_external_commit(repo):
+    writer = make_writer(repo)
+    commit_files(repo, writer, {"a.json": b"1"})
+    (repo / "manual.txt").write_text("by hand\n")
+    git(repo, "add", "manual.txt")
+    git(repo, "commit", "-q", "-m", "manual")
+
+    commit_files(repo, writer, {"a.json": b"2"})
+    _, files = git(repo, "ls-tree", "--name-only", "HEAD")
+    assert files.splitlines() == ["a.json", "manual.txt"]
+    assert git(repo, "status", "--porcelain") == (True, "")
+
+
+def test_blob_sha_matches_git(repo):
+    (repo / "f").write_bytes(b"hello\n")
+    assert git(repo, "hash-object", "f") == (True, LooseObjectWriter._blob_sha(b"hello\n"))
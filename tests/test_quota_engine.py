@@ -0,0 +1,105 @@
+import pytest
+
+from quota_engine import (
+    FixedWindowPolicy, HybridPolicy, PolicyEngine, SlidingWindowPolicy, TokenBucketPolicy, UnlimitedPolicy
+)
+
+NOW = 1_800_000_000  # Multiple of 3600: fixed windows start here
+
+
+def make_engine():
+    return PolicyEngine(
+        policies=[
+            HybridPolicy("staff", limit=2, reset_seconds=3600, cooldown_seconds=600),
+            FixedWindowPolicy("fixed", limit=2, window_seconds=3600),
+            SlidingWindowPolicy("sliding", limit=2, window_seconds=600),
+            TokenBucketPolicy("bucket", capacity=2, refill_seconds=300),
+            UnlimitedPolicy("admin"),
+        ],
+        rules={
+            ("admin", None): "admin",
+            ("staff", "premium"): "sliding",
+            ("staff", None): "staff",
+            (None, "bulk"): "bucket",
+        },
+        role_order=["admin", "staff"],
+        default="fixed",
+    )
+
+
+def test_rules_resolve_by_role_order_and_kind():
+    engine = make_engine()
+    assert engine.resolve(["staff", "admin"]).name == "admin"
+    assert engine.resolve(["staff"], "premium").name == "sliding"
+    assert engine.resolve(["staff"], "basic").name == "staff"
+    assert engine.resolve([], "bulk").name == "bucket"
+    assert engine.resolve([]).name == "fixed"
+
+
+def test_status_is_read_only():
+    engine = make_engine()
+    for _ in range(5):
+        assert engine.status(1, ["staff"], now=NOW).allowed
+    assert engine.to_json() == {"policies": {}}
+
+
+def test_hybrid_lockout_then_new_cycle():
+    engine = make_engine()
+    first = engine.record_claim(1, ["staff"], now=NOW)
+    assert (first.used, first.resets_in) == (1, 3600)
+
+    locked = engine.record_claim(1, ["staff"], now=NOW + 10)
+    assert not locked.allowed and locked.retry_after == 600
+
+    after = engine.status(1, ["staff"], now=NOW + 610)
+    assert after.allowed and after.used == 0
+
+
+def test_fixed_window_resets_at_boundary():
+    engine = make_engine()
+    engine.record_claim(1, [], now=NOW + 100)
+    status = engine.record_claim(1, [], now=NOW + 200)
+    assert not status.allowed and status.retry_after == 3400
+    assert engine.status(1, [], now=NOW + 3600).used == 0
+
+
+def test_sliding_window_counts_trailing_claims():
+    engine = make_engine()
+    engine.record_claim(1, ["staff"], "premium", now=NOW)
+    status = engine.record_claim(1, ["staff"], "premium", now=NOW + 300)
+    assert not status.allowed and status.retry_after == 300
+
+    status = engine.status(1, ["staff"], "premium", now=NOW + 601)
+    assert status.allowed and status.used == 1 and status.resets_in == 299
+
+
+def test_token_bucket_refills():
+    engine = make_engine()
+    engine.record_claim(1, [], "bulk", now=NOW)
+    status = engine.record_claim(1, [], "bulk", now=NOW)
+    assert not status.allowed and status.retry_after == 300
+    assert engine.status(1, [], "bulk", now=NOW + 300).allowed
+
+
+def test_unlimited_never_tracks():
+    engine = make_engine()
+    for _ in range(10):
+        assert engine.record_claim(1, ["admin"], now=NOW).allowed
+    assert engine.to_json() == {"policies": {}}
+
+
+@pytest.mark.parametrize("roles, kind", [(["staff"], None), ([], None), (["staff"], "premium"), ([], "bulk")])
+def test_state_round_trips(roles, kind):
+    engine = make_engine()
+    engine.record_claim(7, roles, kind, now=NOW)
+    before = engine.status(7, roles, kind, now=NOW + 5)
+
+    restored = make_engine()
+    restored.load(engine.to_json())
+    assert restored.status(7, roles, kind, now=NOW + 5) == before
+
+
+def test_legacy_cooldowns_load_into_default_policy():
+    engine = PolicyEngine([HybridPolicy("staff", 2, 3600, 600)], {}, [], "staff")
+    engine.load({"7": {"cycle_start": "2027-01-15T08:00:00", "claims_in_cycle": 1}})
+    assert engine.states["staff"][7].claims == 1
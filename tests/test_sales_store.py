@@ -0,0 +1,221 @@
+import datetime
+import gzip
+import json
+import os
+
+import pytest
+
+from sales_store import SalesBook, SalesLedger, SalesRollups, period_key
+
+BASE = datetime.datetime(2027, 1, 15, 10, 0, 0)
+
+
+def sale(amount, minutes, description="item"):
+    return {"amount": amount, "description": description,
+            "timestamp": (BASE + datetime.timedelta(minutes=minutes)).isoformat()}
+
+
+def payout(amount, minutes):
+    return {"amount": amount, "timestamp": (BASE + datetime.timedelta(minutes=minutes)).isoformat()}
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    return SalesLedger(str(tmp_path / "ledger"))
+
+
+# In-memory book ----------------------------------------------------------
+
+def test_book_interns_descriptions_and_returns_recent_first():
+    book = SalesBook()
+    for minutes in range(3):
+        entry = sale(100 + minutes, minutes, "Gamepass")
+        book.add(1, entry["amount"], entry["description"], datetime.datetime.fromisoformat(entry["timestamp"]))
+    book.add(2, 50, "Gamepass", BASE)
+
+    assert book.table.values == ["Gamepass"]
+    assert book.get(1).total == 303
+    assert [r.amount for r in book.get(1).recent(2)] == [102, 101]
+    assert book.get(1).record(0).timestamp == BASE
+
+    book.reset(1)
+    assert len(book.get(1)) == 0 and 1 in book
+    assert len(book.get(3)) == 0 and 3 not in book
+
+
+# Ledger ------------------------------------------------------------------
+
+def test_append_writes_one_line_per_event(ledger):
+    ledger.append_sale(1, sale(40000, 0, "Gamepass"))
+    with open(ledger.open_path(1), encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    assert [json.loads(line) for line in lines] == [{"type": "sale", **sale(40000, 0, "Gamepass")}]
+
+
+def test_close_period_archives_and_starts_fresh_segment(ledger):
+    ledger.append_sale(1, sale(100, 0))
+    ledger.append_sale(1, sale(200, 1))
+    path = ledger.close_period(1, payout(300, 2))
+
+    assert os.path.basename(path) == "paid-20270115-100200.jsonl.gz"
+    assert os.path.getsize(ledger.open_path(1)) == 0
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        assert [json.loads(line)["type"] for line in f] == ["sale", "sale", "payout"]
+
+    book = SalesBook()
+    ledger.load_open(book)
+    assert len(book.get(1)) == 0
+    assert [amount for amount in ledger.history(1, book).segment(0).amounts] == [100, 200]
+
+
+def test_same_second_archives_keep_their_order(ledger):
+    for amount in range(12):
+        ledger.append_sale(1, sale(amount, 0))
+        ledger.close_period(1, payout(amount, 0))
+    assert [e["amount"] for _, e in ledger.iter_sales(1)] == list(range(12))
+
+
+def test_load_open_finishes_interrupted_payout(ledger):
+    ledger.append_sale(1, sale(100, 0))
+    ledger.close_period(1, payout(100, 0))
+    # Crash after the payout line, before the archive was written
+    ledger.append_sale(1, sale(200, 0))
+    ledger._append(1, {"type": "payout", **payout(200, 0)})
+
+    book = SalesBook()
+    ledger.load_open(book)
+    assert len(book.get(1)) == 0
+    assert len(ledger.archive_paths(1)) == 2  # Earlier same-second archive kept
+    assert [e["amount"] for _, e in ledger.iter_sales(1)] == [100, 200]
+
+
+def test_load_open_reuses_archive_written_before_crash(ledger):
+    ledger.append_sale(1, sale(100, 0))
+    ledger._append(1, {"type": "payout", **payout(100, 0)})
+    events = ledger._read_open(1)
+    ledger._archive(1, events)
+    # Crash before the open segment was truncated
+    with open(ledger.open_path(1), "w", encoding="utf-8") as f:
+        f.writelines(json.dumps(e) + "\n" for e in events)
+
+    ledger.load_open(SalesBook())
+    assert len(ledger.archive_paths(1)) == 1
+    assert [e["amount"] for _, e in ledger.iter_sales(1)] == [100]
+
+
+def test_torn_tail_line_is_skipped(ledger):
+    ledger.append_sale(1, sale(100, 0))
+    with open(ledger.open_path(1), "a", encoding="utf-8") as f:
+        f.write('{"amount": 5')
+
+    book = SalesBook()
+    ledger.load_open(book)
+    assert book.get(1).total == 100
+
+
+def test_iter_sales_after_skips_older_sales(ledger):
+    ledger.append_sale(1, sale(100, 0))
+    ledger.close_period(1, payout(100, 1))
+    ledger.append_sale(1, sale(200, 2))
+    ledger.append_sale(1, sale(300, 3))
+
+    after = BASE + datetime.timedelta(minutes=2)
+    assert [e["amount"] for e in ledger.iter_sales_after(1, after)] == [300]
+
+
+# History -----------------------------------------------------------------
+
+def pay_periods(ledger, sizes):
+    minutes = 0
+    for size in sizes:
+        for _ in range(size):
+            ledger.append_sale(1, sale(minutes, minutes))
+            minutes += 1
+        ledger.close_period(1, payout(0, minutes))
+        minutes += 1
+    return minutes
+
+
+def test_archive_index_counts_each_period(ledger):
+    pay_periods(ledger, [3, 0, 2])
+    names = [os.path.basename(p) for p in ledger.archive_paths(1)]
+    with open(os.path.join(os.path.dirname(ledger.open_path(1)), "archives.json")) as f:
+        assert json.load(f) == dict(zip(names, [3, 0, 2]))
+
+    # Archives written before the index existed are counted once
+    os.remove(os.path.join(os.path.dirname(ledger.open_path(1)), "archives.json"))
+    fresh = SalesLedger(ledger.root)
+    assert [count for _, count in fresh.archive_counts(1)] == [3, 0, 2]
+    assert os.path.exists(os.path.join(os.path.dirname(ledger.open_path(1)), "archives.json"))
+
+
+def test_history_pages_load_only_the_archives_they_touch(ledger):
+    minutes = pay_periods(ledger, [5, 5, 5])
+    book = SalesBook()
+    ledger.load_open(book)
+    book.add(1, 999, "unpaid", BASE + datetime.timedelta(minutes=minutes))
+
+    loader = SalesLedger(ledger.root)  # Cold cache
+    loads = []
+    original = loader.load_archive
+    loader.load_archive = lambda path: loads.append(os.path.basename(path)) or original(path)
+
+    history = loader.history(1, book)
+    assert len(history) == 16 and history.paid_count == 15 and loads == []
+
+    newest = history.page(0, 4)
+    assert [(s.amount, paid) for s, paid in newest] == [(999, False), (16, True), (15, True), (14, True)]
+    assert len(loads) == 1  # Newest archive only
+
+    oldest = history.page(0, 4, newest_first=False)
+    assert [s.amount for s, _ in oldest] == [0, 1, 2, 3]
+    assert len(loads) == 2
+
+    assert [s.amount for s, _ in history.page(3, 4)] == [3, 2, 1, 0]
+    assert history.page_count(4) == 4
+    assert len(loads) == 2  # Oldest archive already loaded for this history
+
+
+# Rollups -----------------------------------------------------------------
+
+def fill(ledger):
+    ledger.append_sale(1, sale(100, 0))
+    ledger.append_sale(2, sale(50, 1))
+    ledger.close_period(1, payout(100, 2))
+    ledger.append_sale(1, sale(200, 60 * 24 * 40))  # Next month
+
+
+def test_rollups_totals_and_ranking(ledger):
+    fill(ledger)
+    rollups = SalesRollups()
+    rollups.rebuild(ledger.iter_sales())
+
+    day = period_key("day", BASE)
+    assert rollups.totals("day", day) == (150, 2)
+    assert rollups.totals("day", day, 1) == (100, 1)
+    assert rollups.ranked("day", day) == [(1, 100, 1), (2, 50, 1)]
+    assert rollups.totals("month", period_key("month", BASE, 1), 1) == (200, 1)
+
+
+def test_catch_up_replays_sales_after_the_saved_position(ledger):
+    fill(ledger)
+    saved = SalesRollups()
+    saved.rebuild(ledger.iter_sales())
+    data = json.loads(json.dumps(saved.to_json()))
+
+    # Appended to the ledger, but the rollups were not saved before a crash
+    ledger.append_sale(1, sale(25, 60 * 24 * 40 + 1))
+    ledger.append_sale(3, sale(75, 5))
+
+    rollups = SalesRollups()
+    assert rollups.load(data)
+    assert rollups.catch_up(ledger) == 2
+
+    expected = SalesRollups()
+    expected.rebuild(ledger.iter_sales())
+    assert rollups.to_json() == expected.to_json()
+    assert rollups.catch_up(ledger) == 0
+
+
+def test_rollups_without_position_must_be_rebuilt():
+    assert not SalesRollups().load({"day": {}, "week": {}, "month": {}})
@@ -0,0 +1,73 @@
+import asyncio
+import time
+
+from shutdown import ShutdownCoordinator
+
+
+def statuses(report):
+    return [(entry.name, entry.status) for entry in report]
+
+
+def test_steps_run_once_in_order():
+    calls = []
+    coordinator = ShutdownCoordinator(deadline=5)
+    coordinator.add_step("sync", lambda: calls.append("sync"))
+
+    async def async_step():
+        calls.append("async")
+    coordinator.add_step("async", async_step)
+    coordinator.add_step("thread", lambda: calls.append("thread"), blocking=True)
+
+    async def main():
+        assert not coordinator.started
+        # Signal, Client.close and normal exit all land on the same run
+        coordinator.trigger("SIGTERM")
+        first, second = await asyncio.gather(coordinator.run("Client.close"), coordinator.run("exit"))
+        assert first is second
+        return await coordinator.run("exit")
+
+    report = asyncio.run(main())
+    assert calls == ["sync", "async", "thread"]
+    assert statuses(report) == [("sync", "ok"), ("async", "ok"), ("thread", "ok")]
+    assert coordinator.started and coordinator.reason == "SIGTERM"
+
+
+def test_slow_step_times_out_and_later_steps_are_skipped():
+    budgets = []
+    coordinator = ShutdownCoordinator(deadline=0.3)
+    coordinator.add_step("budget", budgets.append, pass_timeout=True)
+    coordinator.add_step("hang", lambda: asyncio.sleep(10))
+    coordinator.add_step("after", lambda: budgets.append("after"))
+
+    started = time.monotonic()
+    report = asyncio.run(coordinator.run("SIGINT"))
+    assert time.monotonic() - started < 1.0
+    assert statuses(report) == [("budget", "ok"), ("hang", "timeout"), ("after", "skipped")]
+    assert 0 < budgets[0] <= 0.3 and "after" not in budgets
+    assert "⏱ hang" in coordinator.format_report()
+
+
+def test_failed_step_does_not_stop_the_rest():
+    calls = []
+    coordinator = ShutdownCoordinator(deadline=5)
+
+    def broken():
+        raise RuntimeError("unpushed commits remain")
+    coordinator.add_step("broken", broken, blocking=True)
+    coordinator.add_step("next", lambda: calls.append("next"))
+
+    report = asyncio.run(coordinator.run("exit"))
+    assert statuses(report) == [("broken", "failed"), ("next", "ok")]
+    assert report[0].detail == "unpushed commits remain" and calls == ["next"]
+
+
+def test_step_calling_run_again_does_not_deadlock():
+    coordinator = ShutdownCoordinator(deadline=5)
+
+    async def close_client():
+        # Client.close routes back into the coordinator
+        await coordinator.run("Client.close")
+    coordinator.add_step("close", close_client)
+
+    report = asyncio.run(asyncio.wait_for(coordinator.run("SIGTERM"), 2))
+    assert statuses(report) == [("close", "ok")]
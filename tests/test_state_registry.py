@@ -0,0 +1,86 @@
+import asyncio
+import json
+
+import pytest
+
+from state_registry import StoreRegistry
+
+
+@pytest.fixture
+def batches():
+    return []
+
+
+@pytest.fixture
+def registry(tmp_path, batches):
+    return StoreRegistry(str(tmp_path), backup_sink=batches.append, flush_delay=0.05)
+
+
+def test_save_without_loop_flushes_right_away(tmp_path, registry, batches):
+    registry.register("tickets", "tickets.json", lambda: {"b": 1, "a": [1, 2]})
+    registry.save("tickets")
+
+    written = (tmp_path / "tickets.json").read_bytes()
+    assert json.loads(written) == {"a": [1, 2], "b": 1}
+    assert batches == [{"tickets.json": written}]
+    assert not (tmp_path / "tickets.json.tmp").exists()
+
+
+def test_saves_within_delay_share_one_batch(registry, batches):
+    registry.register("tickets", "tickets.json", lambda: {})
+    registry.register("cooldowns", "cooldowns.json", lambda: {})
+    registry.register_files("ledger", "ledger")
+
+    async def burst():
+        registry.save("tickets")
+        registry.save("cooldowns")
+        registry.touch("ledger", registry.stores["ledger"].path + "/1/open.jsonl")
+        assert registry.pending() == {"tickets.json", "cooldowns.json", "ledger/1/open.jsonl"}
+        await asyncio.sleep(0.2)
+
+    asyncio.run(burst())
+    assert len(batches) == 1
+    assert set(batches[0]) == {"tickets.json", "cooldowns.json", "ledger/1/open.jsonl"}
+    assert batches[0]["ledger/1/open.jsonl"] is None  # Read from disk by the backup
+    assert registry.flushes == 1
+
+
+def test_save_later_writes_once_per_flush(tmp_path, registry, batches):
+    state = {"n": 0}
+    dumps = []
+
+    def dump():
+        dumps.append(state["n"])
+        return dict(state)
+
+    registry.register("rollups", "rollups.json", dump, backup=False, json_type=None)
+
+    async def burst():
+        for n in range(100):
+            state["n"] = n
+            registry.save_later("rollups")
+        assert registry.pending() == {"rollups.json"}
+        await asyncio.sleep(0.2)
+
+    asyncio.run(burst())
+    assert dumps == [99]
+    assert json.loads((tmp_path / "rollups.json").read_bytes()) == {"n": 99}
+    assert batches == []  # Not backed up
+
+
+def test_json_files_lists_validated_stores(registry):
+    registry.register("tickets", "tickets.json", lambda: [], json_type=list)
+    registry.register("rollups", "rollups.json", lambda: {}, backup=False, json_type=None)
+    registry.register_files("ledger", "ledger")
+    assert registry.json_files() == {"tickets.json": list}
+
+
+def test_failing_sink_does_not_raise(tmp_path):
+    def sink(files):
+        raise RuntimeError("queue closed")
+
+    registry = StoreRegistry(str(tmp_path), backup_sink=sink)
+    registry.register("tickets", "tickets.json", lambda: {})
+    registry.save("tickets")
+    assert registry.flush() == 0
+    assert (tmp_path / "tickets.json").exists()
@@ -0,0 +1,115 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from state_restore import check_json, restore_missing_tree, restore_state_files
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git not installed")
+
+
+def git(repo, *args):
+    return subprocess.run(["git", "-c", "user.name=T", "-c", "user.email=t@t", *args],
+                          cwd=repo, capture_output=True, text=True, check=True).stdout.strip()
+
+
+def commit(repo, files):
+    for name, data in files.items():
+        path = repo / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(data)
+    git(repo, "add", "-A")
+    git(repo, "commit", "-q", "-m", "backup")
+    return git(repo, "rev-parse", "HEAD")
+
+
+@pytest.fixture
+def repo(tmp_path):
+    path = tmp_path / "bot"
+    subprocess.run(["git", "init", "-q", "-b", "main", str(path)], check=True)
+    return path
+
+
+def restore(repo, files, git_dirs=None):
+    return restore_state_files(str(repo), files, git_dirs or [str(repo / ".git")])
+
+
+def test_check_json():
+    assert check_json("/nonexistent/state.json", dict) == "missing"
+
+
+def test_valid_files_are_left_alone(repo):
+    commit(repo, {"tickets.json": "[1]"})
+    (repo / "tickets.json").write_text("[2]")
+    assert restore(repo, {"tickets.json": list}) == []
+    assert (repo / "tickets.json").read_text() == "[2]"
+
+
+def test_missing_file_is_restored_from_head(repo):
+    sha = commit(repo, {"sales.json": '{"a": 1}'})
+    os.remove(repo / "sales.json")
+
+    [result] = restore(repo, {"sales.json": dict})
+    assert (result.problem, result.restored_from) == ("missing", f"bot:{sha[:8]}")
+    assert (repo / "sales.json").read_text() == '{"a": 1}'
+
+
+@pytest.mark.parametrize("content, problem", [('{"a": ', "unreadable"), ("[]", "wrong type"), ("", "wrong type")])
+def test_corrupt_file_is_kept_aside(repo, content, problem):
+    commit(repo, {"sales.json": '{"a": 1}'})
+    (repo / "sales.json").write_text(content)
+
+    [result] = restore(repo, {"sales.json": dict})
+    assert result.problem.startswith(problem)
+    assert (repo / "sales.json").read_text() == '{"a": 1}'
+    [kept] = [name for name in os.listdir(repo) if name.startswith("sales.json.corrupt-")]
+    assert (repo / kept).read_text() == content
+
+
+def test_falls_back_to_older_commit(repo):
+    good = commit(repo, {"sales.json": '{"a": 1}'})
+    commit(repo, {"sales.json": "{broken"})
+
+    [result] = restore(repo, {"sales.json": dict})
+    assert result.restored_from == f"bot:{good[:8]}"
+    assert (repo / "sales.json").read_text() == '{"a": 1}'
+
+
+def test_falls_back_to_bare_repo(tmp_path, repo):
+    commit(repo, {"sales.json": '{"a": 1}'})
+    bare = tmp_path / "backup.git"
+    subprocess.run(["git", "clone", "-q", "--bare", str(repo), str(bare)], check=True)
+    shutil.rmtree(repo / ".git")
+    subprocess.run(["git", "init", "-q", "-b", "main", str(repo)], check=True)
+    (repo / "sales.json").write_text("{broken")
+
+    [result] = restore(repo, {"sales.json": dict}, [str(repo / ".git"), str(bare)])
+    assert result.restored_from.startswith("backup.git:")
+    assert (repo / "sales.json").read_text() == '{"a": 1}'
+
+
+def test_no_backup(repo):
+    # First start: nothing to report
+    assert restore(repo, {"sales.json": dict}) == []
+    (repo / "sales.json").write_text("{broken")
+    [result] = restore(repo, {"sales.json": dict})
+    assert result.restored_from is None
+    assert (repo / "sales.json").read_text() == "{broken"
+
+
+def test_missing_ledger_tree_is_restored(repo):
+    sha = commit(repo, {"ledger/1/open.jsonl": "a\n", "ledger/2/paid-20270115-100000.jsonl.gz": "b"})
+    shutil.rmtree(repo / "ledger")
+
+    [result] = restore_missing_tree(str(repo), "ledger", [str(repo / ".git")])
+    assert result.restored_from == f"bot:{sha[:8]}"
+    assert (repo / "ledger" / "1" / "open.jsonl").read_text() == "a\n"
+    assert (repo / "ledger" / "2" / "paid-20270115-100000.jsonl.gz").read_text() == "b"
+
+
+def test_existing_ledger_tree_is_left_alone(repo):
+    commit(repo, {"ledger/1/open.jsonl": "a\n"})
+    (repo / "ledger" / "1" / "open.jsonl").write_text("newer\n")
+    assert restore_missing_tree(str(repo), "ledger", [str(repo / ".git")]) == []
+    assert (repo / "ledger" / "1" / "open.jsonl").read_text() == "newer\n"
@@ -0,0 +1,77 @@
+import time
+
+from ticket_scheduler import COMPACT_SLACK, AssignmentScheduler, Score
+
+
+def make_scheduler(scores):
+    """Scheduler whose score function reads `scores` (staff_id -> ScoreResult)"""
+    return AssignmentScheduler(lambda slot: scores.get(slot.staff_id))
+
+
+def test_picks_lowest_key():
+    scores = {1: (2, 1), 2: (0, 2), 3: (1, 3)}
+    scheduler = make_scheduler(scores)
+    for staff_id in scores:
+        scheduler.track(staff_id, online=True)
+
+    assert scheduler.pick() == 2
+    assert scheduler.pick(exclude={2}) == 3
+    # Excluded entries go back into the heap
+    assert scheduler.pick() == 2
+
+
+def test_stale_key_is_rescored_before_pick():
+    scores = {1: (0,), 2: (1,)}
+    scheduler = make_scheduler(scores)
+    scheduler.track(1)
+    scheduler.track(2)
+
+    scores[1] = (5,)  # Changed without touch()
+    assert scheduler.pick() == 2
+
+
+def test_ineligible_members_are_skipped():
+    scores = {1: None, 2: time.time() + 3600, 3: (9,)}
+    scheduler = make_scheduler(scores)
+    for staff_id in scores:
+        scheduler.track(staff_id)
+
+    assert scheduler.pick() == 3
+    scheduler.untrack(3)
+    assert scheduler.pick() is None
+
+
+def test_cooldown_ends_on_time():
+    scores = {1: time.time() - 1}
+    scheduler = make_scheduler(scores)
+    scheduler.track(1)
+
+    scores[1] = (0,)
+    assert scheduler.pick() == 1
+
+
+def test_expired_score_is_rescored_on_rollover():
+    now = time.time()
+    scores = {1: Score((0, 5), now - 1), 2: (0, 3)}
+    scheduler = make_scheduler(scores)
+    scheduler.track(1)
+    scheduler.track(2)
+
+    # Member 1's cycle rolled over: the fresh score wins without a touch()
+    scores[1] = Score((0, 0), now + 3600)
+    assert scheduler.pick() == 1
+
+
+def test_heaps_stay_bounded_under_rescoring():
+    now = time.time()
+    scores = {staff_id: Score((staff_id,), now + 3600) for staff_id in range(10)}
+    scheduler = make_scheduler(scores)
+    for staff_id in scores:
+        scheduler.track(staff_id)
+
+    for _ in range(1000):
+        for staff_id in scores:
+            scheduler.touch(staff_id)
+
+    assert len(scheduler._ready) + len(scheduler._parked) <= 2 * len(scores) + COMPACT_SLACK + 2
+    assert scheduler.pick() == 0
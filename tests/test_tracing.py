@@ -0,0 +1,129 @@
+import asyncio
+import random
+import time
+import types
+
+import pytest
+
+from tracing import BUCKET_COUNT, LatencyHistogram, Tracer, span, trace_rest, traced
+
+
+def test_empty_histogram():
+    histogram = LatencyHistogram()
+    assert histogram.percentile(50) is None
+    assert histogram.summary()["avg"] is None
+    assert len(histogram.counts) == BUCKET_COUNT
+
+
+@pytest.mark.parametrize("scale", [1e-5, 1e-3, 1.0])
+def test_percentiles_within_relative_error(scale):
+    rng = random.Random(7)
+    samples = sorted(rng.uniform(0.1, 10) * scale for _ in range(5000))
+    histogram = LatencyHistogram()
+    for value in samples:
+        histogram.record(value)
+
+    for q in (50, 95, 99):
+        exact = samples[-(-len(samples) * q // 100) - 1]
+        assert histogram.percentile(q) == pytest.approx(exact, rel=0.04)
+    assert histogram.percentile(100) == pytest.approx(samples[-1], rel=0.04)
+    assert histogram.count == 5000
+
+
+def test_values_are_clamped():
+    histogram = LatencyHistogram()
+    histogram.record(-1)
+    histogram.record(10_000)
+    assert histogram.percentile(50) == 0
+    assert histogram.max == 10_000
+
+
+def test_spans_count_exclusive_time():
+    tracer = Tracer()
+
+    @traced("/sales", tracer)
+    async def handler():
+        with span("render", "embed"):
+            time.sleep(0.02)
+            async with span("rest", "POST /x"):
+                await asyncio.sleep(0.03)
+        with span("state_io", "sales.json"):
+            time.sleep(0.01)
+
+    asyncio.run(handler())
+    [trace] = tracer.recent
+    assert trace.spans["rest"] == pytest.approx(0.03, abs=0.015)
+    assert trace.spans["render"] == pytest.approx(0.02, abs=0.015)
+    assert trace.total >= sum(trace.spans.values())
+    assert trace.top[0][1:] == ("render", "embed")  # Longest wall time, children included
+
+
+def test_nested_handlers_share_one_trace():
+    tracer = Tracer()
+
+    @traced("create_ticket", tracer)
+    async def inner():
+        with span("state_io", "tickets"):
+            pass
+
+    @traced("panel_button", tracer)
+    async def outer():
+        await inner()
+
+    asyncio.run(outer())
+    assert list(tracer.stats()) == ["panel_button"]
+
+
+def test_errors_are_counted_and_raised():
+    tracer = Tracer()
+
+    @traced("/broken", tracer)
+    async def handler():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        asyncio.run(handler())
+    assert tracer.stats()["/broken"]["errors"] == 1
+    assert tracer.recent[0].error == "ValueError"
+
+
+def test_spans_outside_traces_are_noops():
+    with span("render", "x"):
+        pass
+
+
+def test_slowest_and_ring_buffer():
+    tracer = Tracer(recent=3)
+
+    @traced("h", tracer)
+    async def handler(delay):
+        await asyncio.sleep(delay)
+
+    for delay in (0.03, 0.0, 0.01, 0.02):
+        asyncio.run(handler(delay))
+    assert len(tracer.recent) == 3
+    first, second = tracer.slowest(2)  # The 0.03 s trace fell out of the buffer
+    assert first.total >= 0.02 > second.total >= 0.01
+
+
+def test_trace_rest_wraps_once():
+    tracer = Tracer()
+    client = types.SimpleNamespace()
+
+    async def request(route):
+        await asyncio.sleep(0.01)
+
+    client.request = request
+    trace_rest(client)
+    wrapped = client.request
+    trace_rest(client)
+    assert client.request is wrapped
+
+    @traced("h", tracer)
+    async def handler():
+        await client.request(types.SimpleNamespace(method="GET", path="/channels/1"))
+
+    asyncio.run(handler())
+    [trace] = tracer.recent
+    assert trace.spans["rest"] > 0
+    assert trace.top[0][1:] == ("rest", "GET /channels/1")
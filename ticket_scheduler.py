@@ -0,0 +1,178 @@
+"""
+Ticket Auto-Assignment Scheduler for VoraHub Bot
+Routes new premium tickets to the least-loaded eligible staff member
+
+Key Features:
+- Priority queue (heap) of staff ordered by a caller-supplied score
+- O(log n) pick per ticket with lazy invalidation of stale entries
+- Members on cooldown are parked on a timer heap until they are eligible again
+- Scores that expire (quota cycle rollover) are re-scored on time, and
+  invalidated entries are compacted instead of piling up in the heaps
+- Presence, bypass and quota role flags tracked per member
+"""
+
+import heapq
+import time
+import logging
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+
+class StaffSlot:
+    """Per-member scheduling state"""
+
+    __slots__ = ("staff_id", "online", "bypass", "roles", "version")
+
+    def __init__(self, staff_id: int, online: bool = False, bypass: bool = False, roles: tuple = ()):
+        self.staff_id = staff_id
+        self.online = online
+        self.bypass = bypass
+        self.roles = roles
+        self.version = 0
+
+
+class Score(NamedTuple):
+    """Eligible score that goes stale at `stale_at` (e.g. when a quota cycle rolls over)"""
+    key: Tuple
+    stale_at: float
+
+
+# Score function result:
+#   Score -> eligible now, re-scored at stale_at
+#   tuple -> eligible now, smaller tuple = better candidate
+#   float -> not eligible until this epoch timestamp (cooldown)
+#   None  -> not eligible until touched again (e.g. salary cap)
+ScoreResult = Union[Score, Tuple, float, None]
+
+# Heap entries beyond two per tracked member before dead entries are compacted
+COMPACT_SLACK = 32
+
+
+class AssignmentScheduler:
+    """Heap-based scheduler that picks the best eligible staff member"""
+
+    def __init__(self, score_fn: Callable[[StaffSlot], ScoreResult]):
+        """
+        Initialize scheduler
+
+        Args:
+            score_fn: Callable returning the current score for a staff slot
+        """
+        self.score_fn = score_fn
+        self.slots: Dict[int, StaffSlot] = {}
+        self._ready: List[list] = []   # [key, staff_id, version]
+        self._parked: List[list] = []  # [rescore_at, staff_id, version]
+
+    def _place(self, slot: StaffSlot, result: ScoreResult):
+        """Push a score result for the slot's current version"""
+        if result is None:
+            return
+        if isinstance(result, Score):
+            # Live in the ready heap, and re-scored once the key goes stale
+            heapq.heappush(self._ready, [result.key, slot.staff_id, slot.version])
+            heapq.heappush(self._parked, [result.stale_at, slot.staff_id, slot.version])
+        elif isinstance(result, tuple):
+            heapq.heappush(self._ready, [result, slot.staff_id, slot.version])
+        else:
+            heapq.heappush(self._parked, [result, slot.staff_id, slot.version])
+
+    def _push(self, slot: StaffSlot):
+        """Recompute score for a slot and push it to the right heap"""
+        slot.version += 1
+        self._place(slot, self.score_fn(slot))
+        if len(self._ready) + len(self._parked) > 2 * len(self.slots) + COMPACT_SLACK:
+            self._compact()
+
+    def _live(self, entry: list) -> bool:
+        slot = self.slots.get(entry[1])
+        return slot is not None and slot.version == entry[2]
+
+    def _compact(self):
+        """Drop entries invalidated by re-scoring or untrack"""
+        self._ready = [entry for entry in self._ready if self._live(entry)]
+        self._parked = [entry for entry in self._parked if self._live(entry)]
+        heapq.heapify(self._ready)
+        heapq.heapify(self._parked)
+
+    def _unpark(self, now: float):
+        """Re-score members whose cooldown ended or whose score went stale"""
+        while self._parked and self._parked[0][0] <= now:
+            _, staff_id, version = heapq.heappop(self._parked)
+            slot = self.slots.get(staff_id)
+            if slot is not None and slot.version == version:
+                self._push(slot)
+
+    def track(self, staff_id: int, online: bool = False, bypass: bool = False, roles: tuple = ()):
+        """Add (or refresh) a staff member in the roster"""
+        slot = self.slots.get(staff_id)
+        if slot is None:
+            slot = self.slots[staff_id] = StaffSlot(staff_id, online, bypass, roles)
+        else:
+            slot.online = online
+            slot.bypass = bypass
+            slot.roles = roles
+        self._push(slot)
+
+    def untrack(self, staff_id: int):
+        """Remove a staff member from the roster"""
+        # Heap entries are invalidated lazily via the version check
+        self.slots.pop(staff_id, None)
+
+    def set_online(self, staff_id: int, online: bool):
+        """Update presence for a tracked staff member"""
+        slot = self.slots.get(staff_id)
+        if slot is not None and slot.online != online:
+            slot.online = online
+            self._push(slot)
+
+    def touch(self, staff_id: int):
+        """Re-score a staff member after their claims, quota or sales changed"""
+        slot = self.slots.get(staff_id)
+        if slot is not None:
+            self._push(slot)
+
+    def pick(self, exclude: Optional[set] = None) -> Optional[int]:
+        """
+        Pick the best eligible staff member
+
+        The winner is re-scored by the caller (via touch) once the
+        assignment is recorded, so it is not removed from the roster.
+
+        Args:
+            exclude: Staff IDs that must not be picked
+
+        Returns:
+            Staff ID, or None if nobody is eligible
+        """
+        self._unpark(time.time())
+        skipped = []
+
+        try:
+            while self._ready:
+                key, staff_id, version = heapq.heappop(self._ready)
+                slot = self.slots.get(staff_id)
+                if slot is None or slot.version != version:
+                    continue  # Stale entry
+
+                # Verify before handing out (claims made outside touch() change scores too)
+                fresh = self.score_fn(slot)
+                if (fresh.key if isinstance(fresh, Score) else fresh) != key:
+                    slot.version += 1
+                    self._place(slot, fresh)
+                    continue
+
+                if exclude and staff_id in exclude:
+                    skipped.append([key, staff_id, version])
+                    continue
+
+                heapq.heappush(self._ready, [key, staff_id, version])
+                return staff_id
+
+            return None
+        finally:
+            for entry in skipped:
+                heapq.heappush(self._ready, entry)
+
+    def __len__(self) -> int:
+        return len(self.slots)
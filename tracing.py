@@ -0,0 +1,355 @@
+"""
+Interaction Latency Tracing for VoraHub Bot
+Per-handler wall time, split into state I/O, REST and rendering spans
+
+Key Features:
+- @traced(name) around slash commands and component handlers
+- span(kind, label) for sync and async code; spans count exclusive time
+  (a REST call inside a render span is REST time, not render time)
+- REST spans recorded at discord.py's request entry points (trace_discord_rest),
+  only on tested discord.py versions; otherwise REST time counts as "other"
+- Fixed-memory log-linear histograms (HDR-style, ~3% relative error, 1 us - 134 s)
+- Ring buffer of recent traces for "slowest traces" reports
+"""
+
+import time
+import logging
+import inspect
+import functools
+import contextvars
+from array import array
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Span kinds; whatever is left of a trace's wall time is "other" (Python work)
+SPAN_KINDS = ("state_io", "rest", "render")
+HISTOGRAM_KINDS = ("total",) + SPAN_KINDS + ("other",)
+
+# Histogram layout: 2^SUB_BITS linear sub-buckets per power of two
+SUB_BITS = 5
+SUB_COUNT = 1 << SUB_BITS
+MAX_US = (1 << 27) - 1  # ~134 s, everything slower lands in the last bucket
+
+# discord.py major version whose request entry points trace_discord_rest knows
+REST_TRACING_MAJOR = 2
+
+TOP_SPANS = 5          # Longest individual spans kept per trace
+SLOW_TRACE = 2.5       # Seconds; Discord drops interactions not answered within 3 s
+
+
+def _bucket(us: int) -> int:
+    shift = max(0, us.bit_length() - SUB_BITS - 1)
+    return shift * SUB_COUNT + (us >> shift)
+
+
+def _bucket_upper(index: int) -> int:
+    """Highest microsecond value that lands in a bucket"""
+    shift = max(0, index // SUB_COUNT - 1)
+    return ((index - shift * SUB_COUNT) << shift) + (1 << shift) - 1
+
+
+BUCKET_COUNT = _bucket(MAX_US) + 1
+
+
+class LatencyHistogram:
+    """
+    Fixed-memory latency histogram
+
+    Buckets are linear within each power of two (HDR histogram layout), so
+    every recorded value is reported within ~3% no matter its magnitude.
+    Memory is BUCKET_COUNT 32-bit counters (~3 KB), however many samples.
+    """
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = array("I", bytes(4 * BUCKET_COUNT))
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        """Add one sample (seconds)"""
+        us = min(max(int(seconds * 1_000_000), 0), MAX_US)
+        self.counts[_bucket(us)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        Value at percentile q (0-100), in seconds
+
+        Returns the upper edge of the bucket holding the sample (never more
+        than the largest value recorded), or None without samples.
+        """
+        if not self.count:
+            return None
+        rank = max(1, -(-self.count * q // 100))  # ceil
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(_bucket_upper(index) / 1_000_000, self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        """count, avg, p50, p95, p99, max (seconds)"""
+        return {
+            "count": self.count,
+            "avg": self.total / self.count if self.count else None,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self.max if self.count else None,
+        }
+
+
+class Trace:
+    """One handler invocation: wall time and exclusive time per span kind"""
+
+    __slots__ = ("name", "started", "_start", "total", "spans", "top", "error")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self.total = 0.0
+        self.spans: Dict[str, float] = dict.fromkeys(SPAN_KINDS, 0.0)
+        self.top: List[Tuple[float, str, str]] = []  # (seconds, kind, label), longest first
+        self.error: Optional[str] = None
+
+    @property
+    def other(self) -> float:
+        return max(self.total - sum(self.spans.values()), 0.0)
+
+    def _add(self, kind: str, label: str, exclusive: float, wall: float):
+        self.spans[kind] = self.spans.get(kind, 0.0) + exclusive
+        if len(self.top) < TOP_SPANS or wall > self.top[-1][0]:
+            self.top.append((wall, kind, label))
+            self.top.sort(key=lambda item: item[0], reverse=True)
+            del self.top[TOP_SPANS:]
+
+
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("trace", default=None)
+_current_span: contextvars.ContextVar[Optional["_Span"]] = contextvars.ContextVar("trace_span", default=None)
+
+
+class _Span:
+    """Context manager (sync or async) timing one span of the current trace"""
+
+    __slots__ = ("kind", "label", "trace", "parent", "token", "entered", "resumed", "elapsed")
+
+    def __init__(self, kind: str, label: str):
+        self.kind = kind
+        self.label = label
+        self.trace = None
+
+    def __enter__(self):
+        self.trace = _current_trace.get()
+        if self.trace is None:
+            return self
+        now = time.perf_counter()
+        self.parent = _current_span.get()
+        if self.parent is not None:
+            # Time spent in this span is not the parent's
+            self.parent.elapsed += now - self.parent.resumed
+        self.entered = self.resumed = now
+        self.elapsed = 0.0
+        self.token = _current_span.set(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.trace is None:
+            return False
+        now = time.perf_counter()
+        self.elapsed += now - self.resumed
+        _current_span.reset(self.token)
+        self.trace._add(self.kind, self.label, self.elapsed, now - self.entered)
+        if self.parent is not None:
+            self.parent.resumed = now
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, *exc_info):
+        return self.__exit__(*exc_info)
+
+
+def span(kind: str, label: str = "") -> _Span:
+    """
+    Time a block as part of the current trace (no-op outside traced handlers)
+
+    Args:
+        kind: One of SPAN_KINDS ("state_io", "rest", "render")
+        label: Shown in the slowest-trace report (file, route, view...)
+    """
+    return _Span(kind, label)
+
+
+class HandlerStats:
+    """Histograms for one handler: total wall time and each span kind"""
+
+    __slots__ = ("histograms", "errors")
+
+    def __init__(self):
+        self.histograms = {kind: LatencyHistogram() for kind in HISTOGRAM_KINDS}
+        self.errors = 0
+
+
+class Tracer:
+    """Collects finished traces into per-handler histograms"""
+
+    def __init__(self, recent: int = 256, slow_after: float = SLOW_TRACE):
+        """
+        Args:
+            recent: Finished traces kept for slowest-trace reports
+            slow_after: Traces slower than this (seconds) are logged
+        """
+        self.handlers: Dict[str, HandlerStats] = {}
+        self.recent: Deque[Trace] = deque(maxlen=recent)
+        self.slow_after = slow_after
+        self.rest_traced = False  # REST spans recorded (see trace_discord_rest)
+
+    def finish(self, trace: Trace):
+        """Record a finished trace"""
+        stats = self.handlers.get(trace.name)
+        if stats is None:
+            stats = self.handlers[trace.name] = HandlerStats()
+        stats.histograms["total"].record(trace.total)
+        for kind, seconds in trace.spans.items():
+            if seconds:
+                stats.histograms[kind].record(seconds)
+        stats.histograms["other"].record(trace.other)
+        if trace.error:
+            stats.errors += 1
+        self.recent.append(trace)
+        if trace.total >= self.slow_after:
+            breakdown = ", ".join(f"{kind} {seconds * 1000:.0f}ms" for kind, seconds in trace.spans.items() if seconds)
+            logger.warning(f"Slow {trace.name}: {trace.total * 1000:.0f}ms ({breakdown or 'no spans'})")
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Per-handler latency summaries
+
+        Returns:
+            {handler: {"errors": n, "total": summary, "state_io": summary, ...}}
+            where each summary is LatencyHistogram.summary()
+        """
+        return {
+            name: {"errors": stats.errors,
+                   **{kind: histogram.summary() for kind, histogram in stats.histograms.items()}}
+            for name, stats in self.handlers.items()
+        }
+
+    def slowest(self, n: int = 5, name: Optional[str] = None) -> List[Trace]:
+        """Slowest of the recent traces (optionally for one handler), slowest first"""
+        traces = [t for t in self.recent if name is None or t.name == name]
+        return sorted(traces, key=lambda t: t.total, reverse=True)[:n]
+
+    def reset(self):
+        self.handlers.clear()
+        self.recent.clear()
+
+
+tracer = Tracer()
+
+
+def traced(name: Optional[str] = None, tracer: Tracer = tracer) -> Callable:
+    """
+    Trace an async handler (slash command callback, button, modal submit)
+
+    Apply it directly above `async def`, below discord.py's decorators; the
+    wrapper keeps the signature so parameters are still introspected. A
+    traced handler called from another one (a panel button calling
+    create_ticket) is part of the outer trace.
+
+    Args:
+        name: Handler name in reports (default: the function's qualified name)
+        tracer: Tracer receiving the trace
+    """
+    def decorator(func):
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if _current_trace.get() is not None:
+                return await func(*args, **kwargs)
+            trace = Trace(label)
+            trace_token = _current_trace.set(trace)
+            span_token = _current_span.set(None)
+            try:
+                return await func(*args, **kwargs)
+            except BaseException as e:
+                trace.error = e.__class__.__name__
+                raise
+            finally:
+                trace.total = time.perf_counter() - trace._start
+                _current_span.reset(span_token)
+                _current_trace.reset(trace_token)
+                tracer.finish(trace)
+        return wrapper
+    return decorator
+
+
+def trace_rest(client: Any, attr: str = "request"):
+    """
+    Record every call of `client.<attr>(route, ...)` as a "rest" span
+
+    discord.py sends every REST call through HTTPClient.request, and every
+    interaction response / followup through the webhook adapter's request,
+    so wrapping those two covers all API time (rate-limit waits included).
+
+    Args:
+        client: Object owning the request coroutine method
+        attr: Method name
+    """
+    request = getattr(client, attr)
+    if getattr(request, "__traced__", False):
+        return
+
+    @functools.wraps(request)
+    async def traced_request(route, *args, **kwargs):
+        with span("rest", f"{route.method} {getattr(route, 'path', '')}"):
+            return await request(route, *args, **kwargs)
+
+    traced_request.__traced__ = True
+    setattr(client, attr, traced_request)
+
+
+def trace_discord_rest(client: Any, tracer: Tracer = tracer) -> bool:
+    """
+    Record discord.py REST calls of `client` as "rest" spans, if possible
+
+    The request entry points are internals (Client.http and the webhook
+    adapter behind interaction responses), so they are only wrapped on a
+    known discord.py major version and when they still look as expected.
+    Otherwise nothing is patched and REST time stays in "other".
+
+    Args:
+        client: discord.Client (call from setup_hook)
+        tracer: Tracer whose reports note whether REST is traced
+
+    Returns:
+        True if REST calls are traced
+    """
+    try:
+        import discord
+        if discord.version_info.major != REST_TRACING_MAJOR:
+            raise RuntimeError(f"untested discord.py {discord.__version__}")
+        from discord.webhook.async_ import async_context
+        owners = (client.http, async_context.get())
+    except Exception as e:
+        logger.warning(f"REST tracing disabled ({e}); REST time is reported as other")
+        return False
+
+    if not all(inspect.iscoroutinefunction(getattr(owner, "request", None)) for owner in owners):
+        logger.warning("REST tracing disabled (request entry points changed); REST time is reported as other")
+        return False
+    for owner in owners:
+        trace_rest(owner)
+    tracer.rest_traced = True
+    return True